@@ -0,0 +1,114 @@
+"""notification messages partitioning
+
+Revision ID: 6a9678817360
+Revises: b6dba8f39c4d
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "6a9678817360"
+down_revision = "b6dba8f39c4d"
+branch_labels = None
+depends_on = None
+
+# секции на текущий и следующие месяцы, дальнейшие создаются воркерами
+INITIAL_PARTITIONS = 3
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    # колонка и таблица сообщений отсутствовали в начальной миграции
+    op.add_column(
+        "notifications",
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        schema="notifications",
+    )
+
+    op.create_table(
+        "notification_messages",
+        sa.Column(
+            "id",
+            postgresql.UUID(),
+            server_default=sa.text("uuid_generate_v4()"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("send_to", sa.Text(), nullable=False),
+        sa.Column("notification_id", postgresql.UUID(), nullable=False),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column(
+            "backend",
+            sa.Enum("email", "sms", name="backend", schema="notifications"),
+            nullable=False,
+        ),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column(
+            "read_at",
+            sa.DateTime(),
+            nullable=True,
+            comment="Дата прочтения уведомления",
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("timezone('UTC', now())"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["notification_id"],
+            ["notifications.notifications.id"],
+            name=op.f("fk_notification_messages_notification_id_notifications"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(
+            "id", "created_at", name=op.f("pk_notification_messages")
+        ),
+        schema="notifications",
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        op.f("ix_notifications_notification_messages_notification_id"),
+        "notification_messages",
+        ["notification_id"],
+        unique=False,
+        schema="notifications",
+    )
+    op.create_index(
+        "ix_user_id_backends",
+        "notification_messages",
+        ["user_id", "backend"],
+        unique=False,
+        schema="notifications",
+    )
+
+    # даты сообщений хранятся в UTC
+    first = datetime.utcnow().date().replace(day=1)
+    for month in (add_months(first, i) for i in range(INITIAL_PARTITIONS)):
+        op.execute(
+            f"CREATE TABLE notifications.notification_messages_{month:%Y_%m} "
+            f"PARTITION OF notifications.notification_messages "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        )
+    # сообщения вне созданных секций (если воркеры не успели создать секцию) не теряются
+    op.execute(
+        "CREATE TABLE notifications.notification_messages_default "
+        "PARTITION OF notifications.notification_messages DEFAULT"
+    )
+
+
+def downgrade():
+    # секции удаляются вместе с секционированной таблицей
+    op.drop_table("notification_messages", schema="notifications")
+    op.execute("DROP TYPE notifications.backend")
+    op.drop_column("notifications", "user_id", schema="notifications")
@@ -0,0 +1,115 @@
+"""recurrence schedule
+
+Revision ID: cfc0e0cd357f
+Revises: 6a9678817360
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+from dateutil import rrule
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "cfc0e0cd357f"
+down_revision = "6a9678817360"
+branch_labels = None
+depends_on = None
+
+
+def next_fire_at(recurrence, since: datetime) -> datetime | None:
+    rule_set = rrule.rruleset()
+    rule_set.rrule(
+        rrule.rrule(
+            getattr(rrule, recurrence.frequency),
+            dtstart=recurrence.started_at,
+            interval=recurrence.interval or 1,
+            count=recurrence.count,
+            until=recurrence.until,
+            byweekday=recurrence.week_days or None,
+        )
+    )
+    for date in recurrence.additional_dates or []:
+        rule_set.rdate(date)
+    for date in recurrence.exclude_dates or []:
+        rule_set.exdate(date)
+    return rule_set.after(since, inc=True)
+
+
+def upgrade():
+    op.create_table(
+        "recurrence_schedule",
+        sa.Column("recurrence_id", sa.Integer(), nullable=False),
+        sa.Column("notification_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "next_fire_at",
+            sa.DateTime(),
+            nullable=False,
+            comment="Дата ближайшего срабатывания",
+        ),
+        sa.ForeignKeyConstraint(
+            ["notification_id"],
+            ["notifications.notifications.id"],
+            name=op.f("fk_recurrence_schedule_notification_id_notifications"),
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["recurrence_id"],
+            ["notifications.recurrences.id"],
+            name=op.f("fk_recurrence_schedule_recurrence_id_recurrences"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("recurrence_id", name=op.f("pk_recurrence_schedule")),
+        schema="notifications",
+        comment="ближайшие срабатывания правил повторения (см. internal.notifications.scheduler)",
+    )
+    op.create_index(
+        op.f("ix_notifications_recurrence_schedule_next_fire_at"),
+        "recurrence_schedule",
+        ["next_fire_at"],
+        unique=False,
+        schema="notifications",
+    )
+
+    # расписание для уже существующих правил повторения
+    connection = op.get_bind()
+    recurrences = connection.execute(
+        sa.text(
+            "SELECT r.*, n.id AS notification_id FROM notifications.recurrences r "
+            "JOIN notifications.notifications n ON n.recurrence_id = r.id"
+        )
+    ).all()
+
+    since = datetime.utcnow()
+    rows = []
+    for recurrence in recurrences:
+        fire_at = next_fire_at(recurrence, since)
+        if fire_at is not None:
+            rows.append(
+                {
+                    "recurrence_id": recurrence.id,
+                    "notification_id": recurrence.notification_id,
+                    "next_fire_at": fire_at,
+                }
+            )
+    if rows:
+        connection.execute(
+            sa.text(
+                "INSERT INTO notifications.recurrence_schedule "
+                "(recurrence_id, notification_id, next_fire_at) "
+                "VALUES (:recurrence_id, :notification_id, :next_fire_at) "
+                "ON CONFLICT DO NOTHING"
+            ),
+            rows,
+        )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_notifications_recurrence_schedule_next_fire_at"),
+        table_name="recurrence_schedule",
+        schema="notifications",
+    )
+    op.drop_table("recurrence_schedule", schema="notifications")
@@ -0,0 +1,43 @@
+"""recurrence schedule leases
+
+Revision ID: 8d41b7e2a9c3
+Revises: cfc0e0cd357f
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d41b7e2a9c3"
+down_revision = "cfc0e0cd357f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "recurrence_schedule",
+        sa.Column(
+            "leased_by",
+            sa.String(length=128),
+            nullable=True,
+            comment="Экземпляр планировщика, арендовавший запись",
+        ),
+        schema="notifications",
+    )
+    op.add_column(
+        "recurrence_schedule",
+        sa.Column(
+            "leased_until",
+            sa.DateTime(),
+            nullable=True,
+            comment="Дата окончания аренды",
+        ),
+        schema="notifications",
+    )
+
+
+def downgrade():
+    op.drop_column("recurrence_schedule", "leased_until", schema="notifications")
+    op.drop_column("recurrence_schedule", "leased_by", schema="notifications")
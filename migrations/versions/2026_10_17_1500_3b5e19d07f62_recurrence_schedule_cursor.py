@@ -0,0 +1,44 @@
+"""recurrence schedule cursor
+
+Revision ID: 3b5e19d07f62
+Revises: 8d41b7e2a9c3
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b5e19d07f62"
+down_revision = "8d41b7e2a9c3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "recurrence_schedule",
+        sa.Column(
+            "cursor_at",
+            sa.DateTime(),
+            nullable=True,
+            comment="Последнее пройденное срабатывание правила",
+        ),
+        schema="notifications",
+    )
+    op.add_column(
+        "recurrence_schedule",
+        sa.Column(
+            "cursor_index",
+            sa.Integer(),
+            server_default=sa.text("0"),
+            nullable=False,
+            comment="Номер последнего пройденного срабатывания правила",
+        ),
+        schema="notifications",
+    )
+
+
+def downgrade():
+    op.drop_column("recurrence_schedule", "cursor_index", schema="notifications")
+    op.drop_column("recurrence_schedule", "cursor_at", schema="notifications")
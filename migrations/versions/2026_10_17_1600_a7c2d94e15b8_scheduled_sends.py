@@ -0,0 +1,62 @@
+"""scheduled sends
+
+Revision ID: a7c2d94e15b8
+Revises: 3b5e19d07f62
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "a7c2d94e15b8"
+down_revision = "3b5e19d07f62"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "notifications",
+        sa.Column(
+            "send_at",
+            sa.DateTime(),
+            nullable=True,
+            comment="Дата отложенной отправки уведомления",
+        ),
+        schema="notifications",
+    )
+
+    op.create_table(
+        "scheduled_sends",
+        sa.Column("notification_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("send_at", sa.DateTime(), nullable=False, comment="Дата отправки"),
+        sa.ForeignKeyConstraint(
+            ["notification_id"],
+            ["notifications.notifications.id"],
+            name=op.f("fk_scheduled_sends_notification_id_notifications"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("notification_id", name=op.f("pk_scheduled_sends")),
+        schema="notifications",
+        comment="отправки, отложенные дальше, чем на время хранения в брокере "
+        "(см. internal.notifications.deferred)",
+    )
+    op.create_index(
+        op.f("ix_notifications_scheduled_sends_send_at"),
+        "scheduled_sends",
+        ["send_at"],
+        unique=False,
+        schema="notifications",
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_notifications_scheduled_sends_send_at"),
+        table_name="scheduled_sends",
+        schema="notifications",
+    )
+    op.drop_table("scheduled_sends", schema="notifications")
+    op.drop_column("notifications", "send_at", schema="notifications")
@@ -0,0 +1,37 @@
+"""notification messages nullable user
+
+Revision ID: e4f1a6c83b20
+Revises: a7c2d94e15b8
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4f1a6c83b20"
+down_revision = "a7c2d94e15b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # уведомления с явно указанными контактами отправляются без пользователя
+    op.alter_column(
+        "notification_messages",
+        "user_id",
+        existing_type=sa.Integer(),
+        nullable=True,
+        schema="notifications",
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM notifications.notification_messages WHERE user_id IS NULL")
+    op.alter_column(
+        "notification_messages",
+        "user_id",
+        existing_type=sa.Integer(),
+        nullable=False,
+        schema="notifications",
+    )
@@ -1,3 +1,4 @@
+from typing import Literal
 from urllib import parse
 
 from pydantic import BaseSettings
@@ -30,10 +31,38 @@ class DBConfig(Settings):
     def async_db_conn_str(self) -> str:
         return f"postgresql+asyncpg://{self.user}:{parse.quote(self.password)}@{self.host}:{self.port}/{self.name}"
 
+    @property
+    def sync_db_conn_str(self) -> str:
+        return f"postgresql+psycopg2://{self.user}:{parse.quote(self.password)}@{self.host}:{self.port}/{self.name}"
+
+    @property
+    def dsn(self) -> str:
+        return f"postgresql://{self.user}:{parse.quote(self.password)}@{self.host}:{self.port}/{self.name}"
+
     class Config(Settings.Config):
         env_prefix = "DB_"
 
 
+class DBPoolConfig(Settings):
+    # при отключении пула каждое обращение к БД открывает новое соединение (NullPool)
+    enabled: bool = True
+    size: int = 5
+    max_overflow: int = 10
+    recycle: int = 1800  # seconds
+    pre_ping: bool = True
+    timeout: int = 30  # seconds
+
+
+class APIDBPoolConfig(DBPoolConfig):
+    class Config(Settings.Config):
+        env_prefix = "DB_API_POOL_"
+
+
+class WorkerDBPoolConfig(DBPoolConfig):
+    class Config(Settings.Config):
+        env_prefix = "DB_WORKER_POOL_"
+
+
 class RabbitmqConfig(Settings):
     host: str
     port: int
@@ -46,11 +75,52 @@ class RabbitmqConfig(Settings):
 
 class External(Settings):
     auth: str
+    users: str | None
 
     class Config(Settings.Config):
         env_prefix = "EXTERNAL_"
 
 
+class HTTPClientConfig(Settings):
+    connections_limit: int = 100
+    connections_limit_per_host: int = 20
+    dns_cache_ttl: int = 300  # seconds
+    keepalive_timeout: int = 30  # seconds
+    connect_timeout: float = 5  # seconds
+    timeout: float = 10  # seconds
+    # запросы к хосту сверх этого количества отклоняются сразу, а не ожидают в очереди
+    max_pending_per_host: int = 100
+    retries: int = 2
+    retry_backoff: float = 0.2  # seconds
+    # повторы не превышают этой доли запросов к хосту (с минимальным запасом на редкие запросы)
+    retry_budget_ratio: float = 0.2
+    retry_budget_min: int = 10
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: int = 30  # seconds
+
+    class Config(Settings.Config):
+        env_prefix = "HTTP_"
+
+
+class AuthConfig(Settings):
+    # remote - проверка токенов сервисом авторизации, local - проверка подписи JWT
+    mode: Literal["remote", "local"] = "remote"
+    cache_size: int = 10_000
+    # не превышает срок действия токена (exp)
+    cache_ttl: int = 60  # seconds
+    # публичные ключи для локальной проверки: JWKS сервиса авторизации или ключ в формате PEM
+    jwks_url: str | None
+    public_key: str | None
+    jwks_ttl: int = 3600  # seconds
+    algorithms: list[str] = ["RS256"]
+    audience: str | None
+    issuer: str | None
+    leeway: int = 0  # seconds
+
+    class Config(Settings.Config):
+        env_prefix = "AUTH_"
+
+
 class LoggingConfig(Settings):
     sentry_url: str | None
     level: str = "DEBUG"
@@ -65,18 +135,95 @@ class SMTPConfig(Settings):
     login: str
     password: str
     port: str
+    use_ssl: bool = True
+    # перевод открытого соединения на TLS командой STARTTLS (при use_ssl=False, обычно порт 587)
+    starttls: bool = False
+    pool_size: int = 2
+    pool_idle_timeout: int = 60  # seconds
+    pool_check_after: int = 5  # seconds
+    max_recipients: int = 100
+    # asyncio - конкурентная отправка писем пачки и частей группы получателей через неблокирующие
+    # соединения (см. EmailNotificationHandler)
+    engine: Literal["smtplib", "asyncio"] = "smtplib"
 
     class Config(Settings.Config):
         env_prefix = "SMTP_"
 
 
+class NotificationsConfig(Settings):
+    broadcast_chunk_size: int = 1000
+    # максимальное количество уведомлений (и писем) в одной задаче на отправку
+    send_batch_size: int = 100
+    enrichment_batch_size: int = 500
+    enrichment_cache_size: int = 100_000
+    enrichment_cache_ttl: int = 300  # seconds
+    messages_partitions_ahead: int = 2  # months
+    messages_partitions_check_interval: int = 6 * 60 * 60  # seconds
+    # 0 - сообщения хранятся бессрочно
+    messages_retention_months: int = 12
+    render_cache_size: int = 1024
+    # ограничивает время жизни отрендеренных уведомлений после изменения базового шаблона
+    render_cache_ttl: int = 60  # seconds
+    # отправки, отложенные не дальше, передаются брокеру с задержкой, остальные хранятся в базе данных
+    # до наступления этого интервала перед отправкой (см. internal.notifications.deferred)
+    broker_delay_limit: int = 600  # seconds
+
+    class Config(Settings.Config):
+        env_prefix = "NOTIFICATIONS_"
+
+
+class SchedulerConfig(Settings):
+    batch_size: int = 500
+    # интервал, с которым планировщик сохраняет прогресс, продлевает аренды и арендует новые повторения
+    poll_interval: float = 15.0  # seconds
+    # повторения, наступающие в пределах окна, арендуются планировщиком и срабатывают из памяти
+    lease_window: float = 300.0  # seconds
+    # время, через которое аренда остановившегося экземпляра планировщика переходит к другим экземплярам
+    lease_timeout: float = 60.0  # seconds
+    # количество скомпилированных правил повторения, хранимых в памяти
+    rule_cache_size: int = 100_000
+
+    class Config(Settings.Config):
+        env_prefix = "SCHEDULER_"
+
+
+class TemplatesConfig(Settings):
+    compiled_cache_size: int = 256
+    loader_cache_size: int = 256
+    loader_cache_ttl: int = 3600  # seconds
+    invalidation_channel: str = "notifications_templates"
+    invalidation_reconnect_delay: int = 5  # seconds
+    # каталог для кэша байткода шаблонов, общего для всех процессов (не используется, если не указан)
+    bytecode_cache_dir: str | None
+
+    class Config(Settings.Config):
+        env_prefix = "TEMPLATES_"
+
+
+class CrudConfig(Settings):
+    count_cache_size: int = 1024
+    # ограничивает устаревание количества записей после изменений, сделанных другими процессами
+    count_cache_ttl: int = 30  # seconds
+
+    class Config(Settings.Config):
+        env_prefix = "CRUD_"
+
+
 class Envs(Settings):
     app: App = App()
     database: DBConfig = DBConfig()
+    api_db_pool: APIDBPoolConfig = APIDBPoolConfig()
+    worker_db_pool: WorkerDBPoolConfig = WorkerDBPoolConfig()
     rabbitmq: RabbitmqConfig = RabbitmqConfig()
     external: External = External()
+    http: HTTPClientConfig = HTTPClientConfig()
+    auth: AuthConfig = AuthConfig()
     logging: LoggingConfig = LoggingConfig()
     smtp: SMTPConfig = SMTPConfig()
+    notifications: NotificationsConfig = NotificationsConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    templates: TemplatesConfig = TemplatesConfig()
+    crud: CrudConfig = CrudConfig()
 
 
 envs = Envs()
@@ -6,13 +6,21 @@ import sqlalchemy
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import InstrumentedAttribute
-from sqlalchemy.sql import Select
+from sqlalchemy.sql import ColumnElement, Select
 
+from core.crud.counting import CountStrategy
+from core.crud.cursor import decode_cursor
 from core.crud.exceptions import LogicException
 from core.crud.filters import AbstractFilter
-from core.crud.retrieve import pagination, retrieve_object
+from core.crud.projection import ProjectionSerializer
+from core.crud.retrieve import (
+    keyset_pagination,
+    pagination,
+    retrieve_object,
+    retrieve_serialized,
+)
 from core.crud.types import Count, Entity
-from schemas.base import Model
+from schemas.base import Cursor, Model
 
 # sorting params
 from utils.string_utils import to_snake
@@ -41,10 +49,12 @@ class BaseCrud(Generic[Entity]):
         get_multi_options: list[Any] = None,
         sorting_by: SortingElementsType = None,
         filtering_by: SortingElementsType = None,
+        count_strategy: CountStrategy = CountStrategy.exact,
     ):
         self.get_options = get_options or []
         self.get_multi_options = get_multi_options or []
         self.entity = entity
+        self.count_strategy = count_strategy
 
         self.sort_fields = self._register_sorting(sorting_by) if sorting_by else dict()
         self.filter_fields = (
@@ -66,6 +76,20 @@ class BaseCrud(Generic[Entity]):
 
         return obj
 
+    async def get_serialized(
+        self,
+        session: AsyncSession,
+        id: int | str,
+        serializer: ProjectionSerializer,
+        execution_options: dict[str, Any] = None,
+    ) -> dict[str, Any]:
+        """
+        Получение сущности в виде словаря полей схемы сериализатора (без загрузки ORM объекта)
+        """
+        return await retrieve_serialized(
+            session, serializer, id, execution_options=execution_options
+        )
+
     async def get_multi(
         self,
         session: AsyncSession,
@@ -76,29 +100,82 @@ class BaseCrud(Generic[Entity]):
         sort_by: str = "id",
         descending: bool = False,
         execution_options: dict[str, Any] = None,
+        cursor: str | None = None,
+        use_cursor: bool = False,
+        count_strategy: CountStrategy | None = None,
+        serializer: ProjectionSerializer | None = None,
         **filters,
-    ) -> tuple[list[Entity], Count | None]:
-        query: Select = (
-            select(self.entity)
-            .options(*self.get_multi_options)
-            .execution_options(**(execution_options or {}))
-        )
+    ) -> tuple[list[Entity], Count | None, Cursor | None]:
+        """
+        Получение списка сущностей с фильтрацией, сортировкой и пагинацией.
+
+        Поддерживается два режима пагинации: по номеру страницы (LIMIT/OFFSET) и по курсору
+        (при указании ``use_cursor`` или токена ``cursor``). В режиме курсора параметры сортировки
+        следующих страниц берутся из токена, а номер страницы игнорируется.
+
+        Общее количество сущностей подсчитывается способом ``count_strategy`` (по умолчанию - способом,
+        указанным при создании CRUD'а): точно, оценкой планировщика или с кэшированием для одинаковых фильтров.
+
+        При указании ``serializer`` выбираются только колонки его схемы, а вместо сущностей возвращаются
+        словари полей схемы.
+
+        :return: список сущностей (или словарей), их общее кол-во
+                 и курсоры соседних страниц (только для пагинации по курсору)
+        """
+        if serializer is not None:
+            query: Select = serializer.select()
+        else:
+            query: Select = select(self.entity).options(*self.get_multi_options)
+        query = query.execution_options(**(execution_options or {}))
 
         try:
             query = self._apply_filtering(query, **filters)
         except (ValueError, TypeError):
             raise LogicException("Failed to apply filter")
 
+        if cursor is not None or use_cursor:
+            position = decode_cursor(cursor) if cursor is not None else None
+            if position is not None:
+                sort_by, descending = position.sort_by, position.descending
+
+            try:
+                sort_key = self._sorting_expression(query, sort_by)
+            except (ValueError, TypeError):
+                raise LogicException("Failed to apply sorting")
+
+            return await keyset_pagination(
+                session,
+                query,
+                sort_by,
+                sort_key,
+                self.entity.id,
+                descending,
+                position,
+                per_page,
+                with_count,
+                with_deleted,
+                count_strategy or self.count_strategy,
+                serializer,
+            )
+
         try:
             query = self._apply_sorting(query, sort_by, descending)
         except (ValueError, TypeError):
             raise LogicException("Failed to apply sorting")
 
         objects, count = await pagination(
-            session, self.entity, page, per_page, with_count, with_deleted, query
+            session,
+            self.entity,
+            page,
+            per_page,
+            with_count,
+            with_deleted,
+            query,
+            count_strategy or self.count_strategy,
+            serializer,
         )
 
-        return objects, count
+        return objects, count, None
 
     async def _after_values_extracted(
         self, session: AsyncSession, values: dict, is_create: bool = True
@@ -347,6 +424,21 @@ class BaseCrud(Generic[Entity]):
         """
         Применение функции сортировки к запросу по сконфигурированным функциям сортировки.
 
+        :param query: выполняемый multiple get запрос
+        :param sort_name: название ключа для сортировки (будет приведён к snake_case)
+        :param descending: использовать ли обратный порядок сортировки
+        :return: запрос с применённой сортировкой
+        """
+        order_direction = sqlalchemy.desc if descending else sqlalchemy.asc
+
+        return query.order_by(
+            order_direction(self._sorting_expression(query, sort_name))
+        )
+
+    def _sorting_expression(self, query: Select, sort_name: str) -> ColumnElement:
+        """
+        Получение выражения ключа сортировки по сконфигурированным функциям сортировки.
+
         Поведение зависит от того, были ли указан допустимый перечень параметров сортировки
         при создании объекта CRUD'a. Если для параметра ``sorting_by`` были ключи сортировки,
         то **только** эти ключи и будут использоваться для сортировки. **По умолчанию** в качестве ключа
@@ -354,16 +446,13 @@ class BaseCrud(Generic[Entity]):
 
         :param query: выполняемый multiple get запрос
         :param sort_name: название ключа для сортировки (будет приведён к snake_case)
-        :param descending: использовать ли обратный порядок сортировки
-        :return: запрос с применённой сортировкой
+        :return: выражение, по которому выполняется сортировка
         """
         sort_name = to_snake(sort_name)
 
-        order_direction = sqlalchemy.desc if descending else sqlalchemy.asc
-
         if not self.sort_fields:
             if attr := getattr(self.entity, sort_name, None):
-                return query.order_by(order_direction(attr))
+                return attr
             else:
                 raise ValueError("Sorting field does not exists")
 
@@ -371,12 +460,10 @@ class BaseCrud(Generic[Entity]):
         if sorting_elem is None:
             raise ValueError("Specified sorting param does not exists")
         elif type(sorting_elem) == str:
-            return query.order_by(
-                order_direction(getattr(self.entity, sort_name, None))
-            )
+            return getattr(self.entity, sort_name, None)
         elif callable(sorting_elem):
             try:
-                return query.order_by(order_direction(sorting_elem(query, self.entity)))
+                return sorting_elem(query, self.entity)
             except Exception as e:
                 raise Exception(
                     f'Unexpected exception from sorting function called "{sort_name}"; "{e}"'
@@ -0,0 +1,180 @@
+import enum
+import json
+import threading
+from typing import Hashable
+
+import cachetools
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+from sqlalchemy.sql import ClauseElement, Executable, Select
+from sqlalchemy.sql.util import find_tables
+
+from core.config import envs
+from core.crud.types import Count
+from utils.orm_utils.softdelete import exclude_deleted
+from utils.utils import SingletonMeta
+
+# таблицы, изменённые в текущей транзакции сессии (кэш сбрасывается после фиксации)
+CHANGED_TABLES_KEY = "count_cache_changed_tables"
+
+
+class CountStrategy(str, enum.Enum):
+    # точный подсчёт (SELECT count(*)) при каждом запросе
+    exact = "exact"
+    # оценка планировщика PostgreSQL (EXPLAIN), без выполнения запроса
+    estimate = "estimate"
+    # точный подсчёт с кэшированием результата для одинаковых фильтров
+    cached = "cached"
+
+
+class Explain(Executable, ClauseElement):
+    """
+    Запрос плана выполнения (EXPLAIN) в формате JSON
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+
+async def count_rows(session: AsyncSession, query: Select) -> Count:
+    """
+    Подсчёт общего количества записей запроса (без учёта пагинации)
+    """
+    count_query = select(func.count("*")).select_from(query.order_by(None).subquery())
+    return (await session.execute(count_query)).scalar_one()
+
+
+async def estimate_rows(session: AsyncSession, query: Select) -> Count:
+    """
+    Оценка количества записей запроса планировщиком PostgreSQL.
+
+    Запрос не выполняется: количество берётся из плана и основано на статистике таблиц
+    (``pg_class.reltuples``/``relpages`` и гистограммах колонок для условий фильтрации),
+    поэтому точность зависит от актуальности статистики (ANALYZE/autovacuum).
+    """
+    query = query.order_by(None)
+    if not query.get_execution_options().get("include_deleted", False):
+        # EXPLAIN выполняется не через ORM, поэтому удалённые записи исключаются явно
+        query = exclude_deleted(query)
+
+    plan = (await session.execute(Explain(query))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return Count(int(plan[0]["Plan"]["Plan Rows"]))
+
+
+class CountCache(metaclass=SingletonMeta):
+    """
+    Кэш количества записей запросов списков.
+
+    Ключ кэша - текст и параметры запроса (сигнатура фильтров), а также номера версий таблиц запроса.
+    Фиксация транзакции, изменившей таблицу, увеличивает номер её версии, поэтому подсчёты,
+    сделанные до изменения (в том числе выполняемые параллельно с ним), больше не используются.
+    Изменения, сделанные другими процессами, учитываются по истечении TTL.
+    """
+
+    def __init__(self):
+        config = envs.crud
+        self._cache = cachetools.TTLCache(
+            maxsize=config.count_cache_size, ttl=config.count_cache_ttl
+        )
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get_or_count(self, session: AsyncSession, query: Select) -> Count:
+        """
+        Получение количества записей запроса из кэша, либо подсчёт с сохранением результата
+        """
+        key = self._key(query)
+        with self._lock:
+            count = self._cache.get(key)
+        if count is not None:
+            return count
+
+        count = await count_rows(session, query)
+        with self._lock:
+            self._cache[key] = count
+        return count
+
+    def invalidate(self, tables: set[str]):
+        """
+        Сброс количеств записей запросов, использующих указанные таблицы
+        """
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _key(self, query: Select) -> Hashable:
+        query = query.order_by(None)
+        compiled = query.compile()
+        params = tuple(sorted((k, repr(v)) for k, v in compiled.params.items()))
+        tables = sorted(
+            {
+                i.name
+                for i in find_tables(query, include_aliases=True, include_joins=True)
+            }
+        )
+        with self._lock:
+            versions = tuple((i, self._versions.get(i, 0)) for i in tables)
+
+        include_deleted = query.get_execution_options().get("include_deleted", False)
+        return str(compiled), params, include_deleted, versions
+
+
+async def count_query_rows(
+    session: AsyncSession, query: Select, strategy: CountStrategy = CountStrategy.exact
+) -> Count:
+    """
+    Подсчёт общего количества записей запроса выбранным способом
+
+    :param session: сессия SQLAlchemy.
+    :param query: запрос списка (без пагинации).
+    :param strategy: способ подсчёта.
+    """
+    if strategy == CountStrategy.estimate:
+        return await estimate_rows(session, query)
+    if strategy == CountStrategy.cached:
+        return await CountCache().get_or_count(session, query)
+    return await count_rows(session, query)
+
+
+def _changed_tables(session: Session) -> set[str]:
+    return session.info.setdefault(CHANGED_TABLES_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context: UOWTransaction):
+    changed = _changed_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        changed.update(i.name for i in type(obj).__mapper__.tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed_tables(execute_state: ORMExecuteState):
+    # изменения запросами INSERT/UPDATE/DELETE в обход unit of work
+    if execute_state.is_insert or execute_state.is_update or execute_state.is_delete:
+        _changed_tables(execute_state.session).add(execute_state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tables(session: Session):
+    if changed := session.info.pop(CHANGED_TABLES_KEY, None):
+        CountCache().invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session: Session):
+    session.info.pop(CHANGED_TABLES_KEY, None)
@@ -0,0 +1,85 @@
+import base64
+import binascii
+import datetime
+import enum
+import json
+import uuid
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from core.crud.exceptions import LogicException
+
+
+class CursorPosition(NamedTuple):
+    """
+    Позиция курсора: значения ключа сортировки и идентификатора граничной записи страницы
+    """
+
+    sort_by: str
+    descending: bool
+    values: tuple[Any, Any]
+    # курсор на предыдущую страницу (записи до граничной)
+    backwards: bool
+
+
+def _dump_value(value: Any) -> Any:
+    # значения ключа сортировки сохраняются с типом, чтобы восстановить их для параметров запроса
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, enum.Enum):
+        return _dump_value(value.value)
+    return value
+
+
+def _load_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    if "dt" in value:
+        return datetime.datetime.fromisoformat(value["dt"])
+    if "d" in value:
+        return datetime.date.fromisoformat(value["d"])
+    if "uuid" in value:
+        return uuid.UUID(value["uuid"])
+    if "dec" in value:
+        return Decimal(value["dec"])
+    raise ValueError(f"Unknown cursor value: {value}")
+
+
+def encode_cursor(position: CursorPosition) -> str:
+    """
+    Формирование непрозрачного (для клиента) токена курсора
+    """
+    data = {
+        "s": position.sort_by,
+        "desc": position.descending,
+        "v": [_dump_value(i) for i in position.values],
+        "b": position.backwards,
+    }
+    dumped = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(dumped).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> CursorPosition:
+    """
+    Разбор токена курсора
+
+    :raises LogicException: при некорректном токене
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value, id_value = (_load_value(i) for i in data["v"])
+        return CursorPosition(
+            sort_by=data["s"],
+            descending=bool(data["desc"]),
+            values=(sort_value, id_value),
+            backwards=bool(data["b"]),
+        )
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise LogicException("Некорректный курсор пагинации")
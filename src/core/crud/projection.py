@@ -0,0 +1,148 @@
+import functools
+from typing import Any, Generic, Iterable, NamedTuple, Type
+
+import sqlalchemy
+from pydantic import BaseModel
+from pydantic.fields import ModelField
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import ColumnElement, Select
+
+from core.crud.types import Entity
+from schemas.base import ModelType
+
+# разделитель названий вложенных полей в метках колонок
+NESTED_SEPARATOR = "__"
+
+
+class _NestedField(NamedTuple):
+    name: str
+    # метка первичного ключа связанной сущности (NULL - связанной записи нет)
+    key_label: str
+    projection: "_Projection"
+
+
+class _Projection(NamedTuple):
+    # название поля схемы и метка колонки в запросе
+    fields: list[tuple[str, str]]
+    nested: list[_NestedField]
+
+    def to_dict(self, mapping: Any) -> dict[str, Any]:
+        values = {name: mapping[label] for name, label in self.fields}
+        for field in self.nested:
+            values[field.name] = (
+                field.projection.to_dict(mapping)
+                if mapping[field.key_label] is not None
+                else None
+            )
+        return values
+
+
+class ProjectionSerializer(Generic[ModelType]):
+    """
+    Сериализатор, компилирующий схему ответа в выборку колонок сущности.
+
+    Вместо загрузки ORM объектов и их последующей сериализации (``from_orm``) запрос выбирает только
+    колонки, соответствующие полям схемы, а строки результата преобразуются в словари полей схемы.
+    Вложенные схемы, соответствующие связям "многие к одному" или "один к одному",
+    выбираются из той же строки (LEFT OUTER JOIN).
+
+    Поля схемы, отсутствующие в сущности, должны иметь значение по умолчанию (оно не выбирается из БД).
+    Строковые поля схемы, которым соответствуют колонки иных типов (например, UUID), приводятся к тексту в запросе.
+    """
+
+    def __init__(self, schema: Type[ModelType], entity: Type[Entity]):
+        self.schema = schema
+        self.entity = entity
+
+    @functools.cached_property
+    def _compiled(self) -> tuple[list[ColumnElement], list[Any], _Projection]:
+        # компилируется при первом использовании, когда все mapper'ы уже сконфигурированы
+        columns: list[ColumnElement] = []
+        joins: list[Any] = []
+        projection = self._compile(self.schema, self.entity, "", columns, joins)
+        return columns, joins, projection
+
+    def select(self) -> Select:
+        """
+        Запрос выборки колонок схемы (к нему применяются фильтрация, сортировка и пагинация)
+        """
+        columns, joins, _ = self._compiled
+        query = select(*columns).select_from(self.entity)
+        for relationship in joins:
+            query = query.outerjoin(relationship)
+        return query
+
+    def to_dict(self, row: Row) -> dict[str, Any]:
+        """
+        Значения полей схемы из строки результата запроса (лишние колонки строки игнорируются)
+        """
+        return self._compiled[2].to_dict(row._mapping)
+
+    def to_dicts(self, rows: Iterable[Row]) -> list[dict[str, Any]]:
+        projection = self._compiled[2]
+        return [projection.to_dict(row._mapping) for row in rows]
+
+    def _compile(
+        self,
+        schema: Type[BaseModel],
+        entity: Any,
+        prefix: str,
+        columns: list[ColumnElement],
+        joins: list[Any],
+    ) -> _Projection:
+        mapper = sqlalchemy.inspect(entity).mapper
+        fields: list[tuple[str, str]] = []
+        nested: list[_NestedField] = []
+
+        for name, field in schema.__fields__.items():
+            label = f"{prefix}{name}"
+
+            if name in mapper.column_attrs:
+                column = self._column_expression(getattr(entity, name), field)
+                columns.append(column.label(label))
+                fields.append((name, label))
+            elif name in mapper.relationships:
+                relationship = mapper.relationships[name]
+                if relationship.uselist or not self._is_model(field):
+                    raise TypeError(
+                        f'Field "{name}" of {schema.__name__} can not be projected '
+                        f"(only nested schemas of many-to-one/one-to-one relations are supported)"
+                    )
+
+                target = aliased(relationship.mapper.class_)
+                joins.append(getattr(entity, name).of_type(target))
+
+                nested_prefix = f"{label}{NESTED_SEPARATOR}"
+                key = relationship.mapper.primary_key[0].key
+                key_label = f"{label}{NESTED_SEPARATOR}_key"
+                columns.append(getattr(target, key).label(key_label))
+
+                projection = self._compile(
+                    field.type_, target, nested_prefix, columns, joins
+                )
+                nested.append(_NestedField(name, key_label, projection))
+            elif field.required:
+                raise TypeError(
+                    f'Field "{name}" of {schema.__name__} does not exist in {mapper.class_.__name__}'
+                )
+
+        return _Projection(fields, nested)
+
+    @staticmethod
+    def _column_expression(column: ColumnElement, field: ModelField) -> ColumnElement:
+        if field.type_ is not str:
+            return column
+
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return column
+        if python_type is str:
+            return column
+        return sqlalchemy.cast(column, sqlalchemy.Text)
+
+    @staticmethod
+    def _is_model(field: ModelField) -> bool:
+        return isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
@@ -1,13 +1,17 @@
 from typing import Any, Callable, Collection, Iterable, Type, TypeVar
 
-from sqlalchemy import func, select
+import sqlalchemy
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import Select
+from sqlalchemy.sql import ColumnElement, Select
 
+from core.crud.counting import CountStrategy, count_query_rows
+from core.crud.cursor import CursorPosition, encode_cursor
 from core.crud.exceptions import ObjectNotExists
+from core.crud.projection import ProjectionSerializer
 from core.crud.types import Count, Entity, Id
 from models import Base
-from schemas.base import Model
+from schemas.base import Cursor, Model
 
 
 async def retrieve_object(
@@ -40,6 +44,33 @@ async def retrieve_object(
     return obj
 
 
+async def retrieve_serialized(
+    session: AsyncSession,
+    serializer: ProjectionSerializer,
+    id_: Id,
+    execution_options: dict[str, Any] = None,
+) -> dict[str, Any]:
+    """
+    Получение объекта по идентификатору в виде словаря полей схемы сериализатора (без загрузки ORM объекта).
+
+    :param session: сессия SQLAlchemy.
+    :param serializer: сериализатор схемы объекта.
+    :param id_: идентификатор объекта.
+    :param execution_options: параметры, специфичные для конкретного драйвера базы данных.
+    :raise ObjectNotExists: в случае если объект не найден
+    :return: значения полей схемы.
+    """
+    entity = serializer.entity
+    query = serializer.select().where(entity.id == id_)
+    if execution_options:
+        query = query.execution_options(**execution_options)
+    row = (await session.execute(query)).first()
+    if row is None:
+        raise ObjectNotExists(f"Object {entity.__name__} not found in database", id_)
+
+    return serializer.to_dict(row)
+
+
 async def pagination(
     session: AsyncSession,
     model: Type[Entity],
@@ -48,6 +79,8 @@ async def pagination(
     with_count: bool = True,
     with_deleted: bool = False,
     query: Select = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    serializer: ProjectionSerializer | None = None,
 ) -> tuple[list[Entity], Count]:
     """
     Выполняет запрос с пагинацией.
@@ -59,6 +92,8 @@ async def pagination(
     :param rows_per_page: кол-во элементов на 1 странице выдачи.
     :param with_count: подсчитывать ли общее количество элементов.
     :param with_deleted: игнорирования удалённых записей использующих SoftDeleteMixin.
+    :param count_strategy: способ подсчёта общего количества элементов.
+    :param serializer: сериализатор, которым построен запрос (значения возвращаются словарями полей схемы).
     :return: Список значений и предельное их кол-во.
     """
     if query is None:
@@ -67,22 +102,108 @@ async def pagination(
     if with_deleted:
         query = query.execution_options(include_deleted=True)
 
-    if with_count:
-        rows_number = (
-            await session.execute(select(func.count("*")).select_from(query))
-        ).scalar_one()
-    else:
-        rows_number = None
+    rows_number = (
+        await count_query_rows(session, query, count_strategy) if with_count else None
+    )
 
     if rows_per_page:
         query = query.limit(rows_per_page)
 
     final_query = query.offset((page - 1) * (rows_per_page or 0))
 
-    values = (await session.execute(final_query)).scalars().unique().all()
+    result = await session.execute(final_query)
+    if serializer is not None:
+        return serializer.to_dicts(result), rows_number
+
+    values = result.scalars().unique().all()
     return values, rows_number
 
 
+async def keyset_pagination(
+    session: AsyncSession,
+    query: Select,
+    sort_by: str,
+    sort_key: ColumnElement,
+    id_key: ColumnElement,
+    descending: bool = False,
+    cursor: CursorPosition | None = None,
+    rows_per_page: int | None = 25,
+    with_count: bool = True,
+    with_deleted: bool = False,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    serializer: ProjectionSerializer | None = None,
+) -> tuple[list[Entity], Count | None, Cursor]:
+    """
+    Выполняет запрос с пагинацией по курсору (keyset pagination).
+
+    Вместо пропуска предшествующих записей (OFFSET) страница выбирается условием по значениям ключа
+    сортировки и идентификатора граничной записи предыдущей страницы, поэтому стоимость запроса
+    не зависит от номера страницы. Идентификатор используется для однозначного порядка записей
+    с одинаковым значением ключа сортировки.
+
+    Значения ключа сортировки не должны быть NULL.
+
+    :param session: сессия SQLAlchemy.
+    :param query: запрос по которому будет выполнен запрос (без сортировки).
+    :param sort_by: название ключа сортировки (сохраняется в курсоре).
+    :param sort_key: выражение ключа сортировки.
+    :param id_key: выражение идентификатора сущности.
+    :param descending: использовать ли обратный порядок сортировки.
+    :param cursor: позиция курсора (None - первая страница).
+    :param rows_per_page: кол-во элементов на 1 странице выдачи.
+    :param with_count: подсчитывать ли общее количество элементов.
+    :param with_deleted: игнорирования удалённых записей использующих SoftDeleteMixin.
+    :param count_strategy: способ подсчёта общего количества элементов.
+    :param serializer: сериализатор, которым построен запрос (значения возвращаются словарями полей схемы).
+    :return: Список значений, предельное их кол-во и курсоры соседних страниц.
+    """
+    if with_deleted:
+        query = query.execution_options(include_deleted=True)
+
+    rows_number = (
+        await count_query_rows(session, query, count_strategy) if with_count else None
+    )
+
+    backwards = cursor is not None and cursor.backwards
+    # при движении назад записи выбираются в обратном порядке от граничной записи
+    reverse = descending != backwards
+    order_direction = sqlalchemy.desc if reverse else sqlalchemy.asc
+
+    query = query.add_columns(
+        sort_key.label("cursor_sort_key"), id_key.label("cursor_id")
+    )
+    if cursor is not None:
+        row_key = sqlalchemy.tuple_(sort_key, id_key)
+        bound = sqlalchemy.tuple_(*[sqlalchemy.literal(i) for i in cursor.values])
+        query = query.where(row_key < bound if reverse else row_key > bound)
+
+    query = query.order_by(None).order_by(
+        order_direction(sort_key), order_direction(id_key)
+    )
+    if rows_per_page:
+        query = query.limit(rows_per_page + 1)
+
+    rows = (await session.execute(query)).unique().all()
+    has_more = bool(rows_per_page) and len(rows) > rows_per_page
+    rows = rows[:rows_per_page] if rows_per_page else rows
+    if backwards:
+        rows.reverse()
+
+    def position(row, to_previous: bool) -> str:
+        values = (row.cursor_sort_key, row.cursor_id)
+        return encode_cursor(CursorPosition(sort_by, descending, values, to_previous))
+
+    has_next = has_more if not backwards else cursor is not None
+    has_previous = has_more if backwards else cursor is not None
+    page_cursor = Cursor(
+        next=position(rows[-1], False) if rows and has_next else None,
+        prev=position(rows[0], True) if rows and has_previous else None,
+    )
+
+    values = serializer.to_dicts(rows) if serializer else [row[0] for row in rows]
+    return values, rows_number, page_cursor
+
+
 Existing = TypeVar("Existing", bound=Base)
 Arrived = TypeVar("Arrived", bound=Model)
 
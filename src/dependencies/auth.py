@@ -1,7 +1,8 @@
-from aiohttp import ClientSession
-from fastapi import Depends, security
+from http import HTTPStatus
 
-from core.config import envs
+from fastapi import Depends, HTTPException, security
+
+from internal.auth.verification import AuthUnavailable, InvalidToken, TokenVerifier
 from schemas.auth import UserInfo
 
 
@@ -17,14 +18,14 @@ async def user_authorized(token: str = Depends(jwt_token_dep)) -> UserInfo:
     """
     Зависимость для работы с разрешениями для http endpoint'ов.
     """
-    url = envs.external.auth
-    data = {"token": token}
-    async with ClientSession() as session:
-        async with session.post(url=url, json=data) as response:
-            data = await response.json()
-            result = UserInfo(**data)
-
-            return result
+    try:
+        return await TokenVerifier().verify(token)
+    except InvalidToken as e:
+        raise HTTPException(HTTPStatus.UNAUTHORIZED, detail=e.message)
+    except AuthUnavailable:
+        raise HTTPException(
+            HTTPStatus.SERVICE_UNAVAILABLE, detail="Сервис авторизации недоступен"
+        )
 
 
 user_info_dep = Depends(user_authorized)
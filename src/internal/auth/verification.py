@@ -0,0 +1,216 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import time
+from typing import Any
+
+import cachetools
+import jwt
+import pydantic
+
+from core.config import envs
+from schemas.auth import UserInfo
+from utils.http_client import HttpClient, HttpClientError
+from utils.utils import SingletonMeta
+
+logger = logging.getLogger("auth")
+
+# минимальный интервал повторной загрузки JWKS при неизвестном идентификаторе ключа
+JWKS_REFRESH_INTERVAL = 30  # seconds
+
+
+class InvalidToken(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class AuthUnavailable(Exception):
+    """
+    Сервис авторизации (или его публичные ключи) недоступен
+    """
+
+
+def token_hash(token: str) -> str:
+    # в кэше не хранятся сами токены
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expiration(token: str) -> float | None:
+    """
+    Время истечения JWT токена (exp) без проверки подписи, None - если токен не JWT или exp не указан
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+class TokenVerifier(metaclass=SingletonMeta):
+    """
+    Проверка токенов пользователей с кэшированием результата.
+
+    Проверенные токены хранятся в ограниченном по размеру кэше (по хэшу токена) не дольше TTL
+    и срока действия токена, а параллельные проверки одного токена объединяются в одну.
+    В режиме ``remote`` токены проверяются сервисом авторизации (через общий HTTP клиент),
+    в режиме ``local`` - по подписи JWT публичными ключами (JWKS), загружаемыми с кэшированием.
+
+    Все методы должны вызываться из одного event loop'а (event loop'а приложения).
+    """
+
+    def __init__(self):
+        self.config = envs.auth
+        self.url = envs.external.auth
+
+        if self.config.mode == "local" and not (
+            self.config.jwks_url or self.config.public_key
+        ):
+            raise RuntimeError(
+                "Local token verification requires AUTH_JWKS_URL or AUTH_PUBLIC_KEY"
+            )
+
+        self._cache = cachetools.TLRUCache(
+            maxsize=self.config.cache_size, ttu=lambda key, value, now: value[1]
+        )
+        self._pending: dict[str, asyncio.Future] = {}
+
+        self._keys: dict[str | None, Any] = {}
+        self._keys_loaded_at: float | None = None
+        self._keys_lock: asyncio.Lock | None = None
+
+    async def verify(self, token: str) -> UserInfo:
+        """
+        Проверка токена пользователя
+
+        :param token: токен пользователя.
+        :raises InvalidToken: токен недействителен.
+        :raises AuthUnavailable: не удалось проверить токен.
+        :return: данные пользователя из токена.
+        """
+        key = token_hash(token)
+        if (cached := self._cache.get(key)) is not None:
+            return cached[0]
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            asyncio.get_running_loop().create_task(self._resolve(key, token, future))
+
+        # отмена ожидания одним из вызывающих не должна отменять проверку для остальных
+        return await asyncio.shield(future)
+
+    async def _resolve(self, key: str, token: str, future: asyncio.Future):
+        try:
+            if self.config.mode == "local":
+                user = await self._verify_locally(token)
+            else:
+                user = await self._verify_remotely(token)
+        except Exception as e:
+            future.set_exception(e)
+            # исключение может быть не получено, если все ожидающие отменены
+            future.exception()
+        else:
+            self._cache[key] = (user, self._expires_at(token))
+            future.set_result(user)
+        finally:
+            del self._pending[key]
+
+    def _expires_at(self, token: str) -> float:
+        # кэш использует монотонное время, а exp - абсолютное
+        now = time.monotonic()
+        expires_at = now + self.config.cache_ttl
+        if (expiration := token_expiration(token)) is not None:
+            expires_at = min(expires_at, now + expiration - time.time())
+        return expires_at
+
+    async def _verify_remotely(self, token: str) -> UserInfo:
+        try:
+            response = await HttpClient().request(
+                "POST", self.url, json={"token": token}, idempotent=True
+            )
+            if response.status in (401, 403):
+                raise InvalidToken("Токен недействителен")
+            response.raise_for_status()
+        except HttpClientError as e:
+            logger.error("Failed to verify token: %s", e)
+            raise AuthUnavailable() from e
+
+        try:
+            return UserInfo(**response.data)
+        except (pydantic.ValidationError, TypeError):
+            raise InvalidToken("Токен недействителен")
+
+    async def _verify_locally(self, token: str) -> UserInfo:
+        try:
+            key_id = jwt.get_unverified_header(token).get("kid")
+            key = await self._get_key(key_id)
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=self.config.algorithms,
+                audience=self.config.audience,
+                issuer=self.config.issuer,
+                leeway=self.config.leeway,
+                options={"verify_aud": self.config.audience is not None},
+            )
+            return UserInfo(**claims)
+        except (jwt.InvalidTokenError, pydantic.ValidationError):
+            raise InvalidToken("Токен недействителен")
+
+    async def _get_key(self, key_id: str | None) -> Any:
+        if self.config.public_key:
+            return self.config.public_key
+
+        if self._keys_lock is None:
+            self._keys_lock = asyncio.Lock()
+
+        async with self._keys_lock:
+            age = self._keys_age()
+            # ключ, отсутствующий в загруженных ключах, мог появиться при ротации
+            unknown = key_id not in self._keys and age > JWKS_REFRESH_INTERVAL
+            if age > self.config.jwks_ttl or unknown:
+                self._keys = await self._load_keys()
+                self._keys_loaded_at = time.monotonic()
+
+        if key_id is None and len(self._keys) == 1:
+            return next(iter(self._keys.values()))
+        if key_id not in self._keys:
+            raise InvalidToken("Неизвестный ключ подписи токена")
+        return self._keys[key_id]
+
+    def _keys_age(self) -> float:
+        if self._keys_loaded_at is None:
+            return float("inf")
+        return time.monotonic() - self._keys_loaded_at
+
+    async def _load_keys(self) -> dict[str | None, Any]:
+        try:
+            response = await HttpClient().request("GET", self.config.jwks_url)
+            response.raise_for_status()
+        except HttpClientError as e:
+            logger.error("Failed to load token public keys: %s", e)
+            raise AuthUnavailable() from e
+
+        try:
+            keys = jwt.PyJWKSet.from_dict(response.data).keys
+        except (jwt.PyJWKSetError, jwt.PyJWKError, AttributeError) as e:
+            # некорректный (или пустой) набор ключей не заменяет ранее загруженные ключи
+            logger.error("Failed to parse token public keys: %s", e)
+            if not self._keys:
+                raise AuthUnavailable() from e
+            return self._keys
+
+        return {i.key_id: i.key for i in keys}
+
+    def clear_cache(self):
+        self._cache.clear()
@@ -0,0 +1,50 @@
+from core.config import envs
+from models import Backend, Notification
+from schemas.auth import AudiencePage, UserContacts
+from utils.http_client import HttpClient
+
+
+def is_broadcast(notification: Notification) -> bool:
+    """
+    Является ли уведомление широковещательным (без конкретного получателя и его контактов)
+    """
+    contacts = notification.contacts or {}
+    return notification.user_id is None and not any(contacts.values())
+
+
+def broadcast_backends(notification: Notification) -> list[str]:
+    """
+    Перечень backend'ов, в которых будет отправлено широковещательное уведомление.
+
+    Если backend'ы не указаны явно (ключами словаря контактов), то уведомление отправляется по почте.
+    """
+    return list(notification.contacts or {}) or [Backend.email.value]
+
+
+def user_contact(user: UserContacts, backend: str) -> str | None:
+    """
+    Контакт пользователя для отправки уведомления в указанном backend'е
+    """
+    return getattr(user, backend, None)
+
+
+async def fetch_audience_page(cursor: str | None, limit: int) -> AudiencePage:
+    """
+    Получение одной части аудитории широковещательного уведомления из сервиса пользователей.
+
+    :param cursor: курсор части аудитории (при отсутствии запрашивается первая часть).
+    :param limit: максимальное количество пользователей в части.
+    :raises ValueError: если не указан адрес сервиса пользователей.
+    """
+    url = envs.external.users
+    if url is None:
+        raise ValueError("Не указан адрес сервиса пользователей для рассылок")
+
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+
+    response = await HttpClient().request("GET", url, params=params)
+    response.raise_for_status()
+
+    return AudiencePage(**response.data)
@@ -0,0 +1,106 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import envs
+from models import ScheduledSend
+from utils.time import now
+
+logger = logging.getLogger("deferred-sends")
+
+# идентификатор уведомления и задержка его отправки (в миллисекундах, None - без задержки)
+Delivery = tuple[str, int | None]
+
+
+def broker_delay(send_at: datetime | None, moment: datetime) -> int | None:
+    if send_at is None or send_at <= moment:
+        return None
+    return (send_at - moment) // timedelta(milliseconds=1)
+
+
+async def defer_notifications(
+    session: AsyncSession,
+    notifications: Iterable[tuple[uuid.UUID, datetime | None]],
+    moment: datetime | None = None,
+) -> list[Delivery]:
+    """
+    Распределение отправок уведомлений между брокером и базой данных.
+
+    Брокер хранит отложенные сообщения в памяти воркеров до наступления задержки, поэтому ему передаются
+    только отправки, отложенные не дальше ``broker_delay_limit``. Более дальние отправки сохраняются
+    в базе данных (в той же транзакции, что и уведомления) и передаются брокеру планировщиком
+    незадолго до наступления (см. ``promote_scheduled_sends``).
+
+    :param session: сессия SQLAlchemy.
+    :param notifications: идентификаторы уведомлений с датами отложенной отправки.
+    :param moment: текущая дата (для тестов).
+    :return: отправки, которые необходимо опубликовать в брокер после фиксации транзакции.
+    """
+    moment = moment or now()
+    limit = timedelta(seconds=envs.notifications.broker_delay_limit)
+
+    deliveries, scheduled = [], []
+    for notification_id, send_at in notifications:
+        if send_at is not None and send_at - moment > limit:
+            scheduled.append({"notification_id": notification_id, "send_at": send_at})
+        else:
+            deliveries.append((str(notification_id), broker_delay(send_at, moment)))
+
+    if scheduled:
+        # пачка уведомлений ограничена NOTIFICATIONS_BATCH_MAX_SIZE, поэтому параметров запроса
+        # меньше ограничения asyncpg
+        await session.execute(sa.insert(ScheduledSend).values(scheduled))
+
+    return deliveries
+
+
+def promote_scheduled_sends(
+    session: Session,
+    enqueue: Callable[[list[str], list[int | None]], Any],
+    batch_size: int,
+    moment: datetime | None = None,
+) -> int:
+    """
+    Передача брокеру пачки отложенных отправок, наступающих в пределах ``broker_delay_limit``.
+
+    Отправки блокируются (``FOR UPDATE SKIP LOCKED``) и удаляются после публикации в брокер,
+    поэтому при сбое фиксации транзакции отправка будет опубликована повторно, но не будет потеряна.
+
+    :param session: синхронная сессия SQLAlchemy.
+    :param enqueue: публикация задач на отправку уведомлений с задержками.
+    :param batch_size: максимальное количество обрабатываемых отправок.
+    :param moment: текущая дата (для тестов).
+    :return: количество переданных брокеру отправок.
+    """
+    moment = moment or now()
+    horizon = moment + timedelta(seconds=envs.notifications.broker_delay_limit)
+    query = (
+        sa.select(ScheduledSend)
+        .where(ScheduledSend.send_at <= horizon)
+        .order_by(ScheduledSend.send_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    sends = session.scalars(query).all()
+    if not sends:
+        return 0
+
+    notification_ids = [send.notification_id for send in sends]
+    enqueue(
+        [str(i) for i in notification_ids],
+        [broker_delay(send.send_at, moment) for send in sends],
+    )
+    session.execute(
+        sa.delete(ScheduledSend).where(
+            ScheduledSend.notification_id.in_(notification_ids)
+        )
+    )
+    session.commit()
+
+    logger.debug("Promoted %s scheduled sends", len(sends))
+    return len(sends)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from typing import Iterable
+
+import cachetools
+
+from core.config import envs
+from schemas.auth import UserContacts
+from utils.http_client import HttpClient
+from utils.utils import SingletonMeta
+
+logger = logging.getLogger("contacts-enrichment")
+
+UserId = int
+
+
+class UserContactsBatcher(metaclass=SingletonMeta):
+    """
+    Получение контактов пользователей с объединением запросов.
+
+    Запрос отправляется сразу, если других запросов не выполняется, поэтому одиночное получение контактов
+    не ждёт. Идентификаторы, запрошенные во время выполнения запроса (параллельно выполняемыми задачами
+    или через ``get_many``), накапливаются и запрашиваются одним batch запросом по его завершении
+    (либо сразу при достижении максимального размера пачки).
+    Полученные контакты сохраняются в ограниченный по размеру TTL кэш.
+
+    Все методы должны вызываться из одного event loop'а (event loop'а воркера).
+    """
+
+    def __init__(self):
+        config = envs.notifications
+        self.url = f"{envs.external.auth}/user-info-batch/"
+        self.max_batch_size = config.enrichment_batch_size
+
+        self._cache = cachetools.TTLCache(
+            maxsize=config.enrichment_cache_size, ttl=config.enrichment_cache_ttl
+        )
+        # ожидающие запроса идентификаторы
+        self._pending: dict[UserId, asyncio.Future] = {}
+        # запрашиваемые идентификаторы
+        self._requested: dict[UserId, asyncio.Future] = {}
+        self._requests = 0
+
+    async def get(self, user_id: UserId) -> UserContacts | None:
+        """
+        Получение контактов пользователя
+
+        :param user_id: идентификатор пользователя
+        :return: контакты пользователя, либо None если пользователь не найден
+        """
+        return (await self.get_many([user_id]))[user_id]
+
+    async def get_many(
+        self, user_ids: Iterable[UserId]
+    ) -> dict[UserId, UserContacts | None]:
+        """
+        Получение контактов пользователей
+
+        :param user_ids: идентификаторы пользователей
+        :return: контакты пользователей (None - пользователь не найден)
+        """
+        results, futures = {}, {}
+        for user_id in user_ids:
+            if (contacts := self._cache.get(user_id)) is not None:
+                results[user_id] = contacts
+            else:
+                futures[user_id] = self._future(user_id)
+        self._flush()
+
+        for user_id, future in futures.items():
+            # отмена ожидания одним из вызывающих не должна отменять результат для остальных
+            results[user_id] = await asyncio.shield(future)
+        return results
+
+    def _future(self, user_id: UserId) -> asyncio.Future:
+        future = self._pending.get(user_id) or self._requested.get(user_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[user_id] = future
+        return future
+
+    def _flush(self):
+        # пока выполняется запрос, идентификаторы накапливаются до его завершения либо до размера пачки
+        while self._pending and (
+            not self._requests or len(self._pending) >= self.max_batch_size
+        ):
+            batch = dict(list(self._pending.items())[: self.max_batch_size])
+            for user_id in batch:
+                del self._pending[user_id]
+            self._requested.update(batch)
+            self._requests += 1
+            asyncio.get_running_loop().create_task(self._resolve(batch))
+
+    async def _resolve(self, batch: dict[UserId, asyncio.Future]):
+        try:
+            users = await self._fetch(list(batch))
+        except Exception as e:
+            logger.error("Failed to retrieve users contacts", exc_info=True)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            found = {user.id: user for user in users}
+            for user_id, future in batch.items():
+                contacts = found.get(user_id)
+                if contacts is not None:
+                    self._cache[user_id] = contacts
+                if not future.done():
+                    future.set_result(contacts)
+        finally:
+            for user_id in batch:
+                self._requested.pop(user_id, None)
+            self._requests -= 1
+            self._flush()
+
+    async def _fetch(self, user_ids: list[UserId]) -> list[UserContacts]:
+        response = await HttpClient().request(
+            "POST", self.url, json={"ids": user_ids}, idempotent=True
+        )
+        response.raise_for_status()
+
+        return [UserContacts(**i) for i in response.data]
+
+    def clear_cache(self):
+        self._cache.clear()
@@ -1,15 +1,25 @@
 import abc
+import inspect
 import logging
+import threading
+import uuid
 from datetime import datetime
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
 from core.config import envs
+from internal.notifications.messages import MessageRow, discard_messages, save_messages
+from internal.notifications.notifications import load_notification, load_notifications
+from internal.notifications.render_cache import RenderCache, render_key
 from internal.templates.environment import TemplateEnvironment
-from models import Backend, Notification, NotificationMessage
+from models import Backend, Notification
+from tools.async_email_sender import AsyncEmailSender
 from tools.email_sender import EmailSender
+from utils.event_loop import run_async
 
 Title, Content = str, str
+# идентификатор уведомления и контакт получателя
+Delivery = tuple[str, str]
 
 
 class NotificationHandlerAbstract(abc.ABC):
@@ -20,7 +30,7 @@ class NotificationHandlerAbstract(abc.ABC):
     def __init__(
         self,
         notification_id: str,
-        send_to: str,
+        send_to: str | None = None,
     ) -> None:
         self.notification_id = notification_id
         self.send_to = send_to
@@ -32,14 +42,92 @@ class NotificationHandlerAbstract(abc.ABC):
         self.notification = notification
 
         title, content = self.render()
-        self.create_message(session, notification, title=title, content=content)
+        # сообщение записывается до отправки: ошибка записи не приводит к отправке письма,
+        # а ошибка отправки откатывает запись вместе с транзакцией актора
+        save_messages(
+            session, [self.message_row(notification, title=title, content=content)]
+        )
         self.send_notification(content=content, title=title)
 
+    @classmethod
+    def send_batch(cls, session: Session, deliveries: list[Delivery]) -> list[Delivery]:
+        """
+        Отправка пачки уведомлений (каждого - своему получателю).
+
+        Уведомления пачки загружаются одним запросом и отправляются одним вызовом
+        ``send_notification_batch``. Как и при отправке одного уведомления, сообщения записываются
+        до отправки, а сообщения неотправленных уведомлений удаляются после неё.
+
+        :param session: сессия SQLAlchemy.
+        :param deliveries: идентификаторы уведомлений с контактами получателей.
+        :return: отправки, которые не удалось выполнить.
+        """
+        notifications = load_notifications(session, {i for i, _ in deliveries})
+
+        prepared, rows = [], []
+        for notification_id, send_to in deliveries:
+            handler = cls(notification_id, send_to)
+            handler.notification = notifications.get(notification_id)
+            if handler.notification is None:
+                handler.logger.warning(f"Notification {notification_id} not found")
+                continue
+
+            title, content = handler.render()
+            prepared.append((handler, title, content))
+            rows.append(
+                handler.message_row(handler.notification, title=title, content=content)
+            )
+
+        save_messages(session, rows)
+        failed = cls.send_notification_batch(prepared)
+        discard_messages(session, [rows[number] for number in failed])
+
+        return [
+            (prepared[number][0].notification_id, prepared[number][0].send_to)
+            for number in failed
+        ]
+
+    def send_to_group(
+        self, session: Session, recipients: dict[str, int | None]
+    ) -> list[str]:
+        """
+        Отправка одинакового уведомления группе получателей (например, части аудитории рассылки).
+
+        Уведомление рендерится один раз для всей группы.
+
+        :param session: сессия SQLAlchemy.
+        :param recipients: контакты получателей с идентификаторами соответствующих пользователей.
+        :return: контакты получателей, которым не удалось отправить уведомление.
+        """
+        notification = self.get_notification(session, self.notification_id)
+        self.notification = notification
+
+        title, content = self.render()
+        failed = self.send_group_notification(
+            content=content, title=title, recipients=list(recipients)
+        )
+
+        delivered = recipients.keys() - set(failed)
+        save_messages(
+            session,
+            [
+                self.message_row(
+                    notification,
+                    content=content,
+                    title=title,
+                    send_to=send_to,
+                    user_id=user_id,
+                )
+                for send_to, user_id in recipients.items()
+                if send_to in delivered
+            ],
+        )
+
+        return failed
+
     @staticmethod
     def get_notification(session: Session, _id: str):
-        notification = session.get(
-            Notification, _id, options=[joinedload(Notification.template)]
-        )
+        notification = load_notification(session, _id)
         if notification is None:
             raise ValueError("Notification not found")
 
@@ -53,34 +141,55 @@ class NotificationHandlerAbstract(abc.ABC):
         """
         pass
 
-    def create_message(
-        self, session: Session, notification: Notification, content: str, title: str
-    ) -> NotificationMessage:
+    def message_row(
+        self,
+        notification: Notification,
+        content: str,
+        title: str,
+        send_to: str | None = None,
+        user_id: int | None = None,
+    ) -> MessageRow:
+        """
+        Значения колонок сообщения об отправленном уведомлении (для save_messages).
+
+        У уведомлений с явно указанными контактами пользователь может отсутствовать.
+        """
         now = datetime.utcnow()
-        message = NotificationMessage(
-            user_id=notification.user_id,
-            notification_id=notification.id,
-            send_to=self.send_to,
-            title=title,
-            content=content,
-            backend=self.backend,
-            created_at=now,
-            sent_at=now,
-        )
-        session.add(message)
-        return message
+        return {
+            # идентификатор формируется заранее, чтобы сообщение можно было удалить без RETURNING
+            "id": str(uuid.uuid4()),
+            "user_id": notification.user_id if user_id is None else user_id,
+            "notification_id": notification.id,
+            "send_to": send_to or self.send_to,
+            "title": title,
+            "content": content,
+            "backend": self.backend,
+            "created_at": now,
+            "sent_at": now,
+        }
 
     def render(self, with_base_template: bool = False) -> tuple[Title, Content]:
         notification = self.notification
         if notification is None:
             raise Exception("Notification should be pre-loaded on __call__")
 
+        key = render_key(
+            notification.template, notification.template_data, with_base_template
+        )
+        return RenderCache().get_or_render(
+            key, lambda: self._render(notification, with_base_template)
+        )
+
+    @staticmethod
+    def _render(
+        notification: Notification, with_base_template: bool
+    ) -> tuple[Title, Content]:
         env = TemplateEnvironment()
         content_template = env.get_template(
             notification.template.slug, wrap_by_base_template=with_base_template
         )
 
-        title_template = env.from_string(notification.template.title)
+        title_template = env.get_title_template(notification.template)
 
         rendered_content = content_template.render(**notification.template_data)
         rendered_title = title_template.render(**notification.template_data)
@@ -92,21 +201,107 @@ class NotificationHandlerAbstract(abc.ABC):
         Реализация отправки уведомления
         """
 
+    def send_group_notification(
+        self, content: str, title: str, recipients: list[str]
+    ) -> list[str]:
+        """
+        Реализация отправки одинакового уведомления группе получателей.
+
+        По умолчанию уведомление отправляется каждому получателю по отдельности.
+
+        :return: получатели, которым не удалось отправить уведомление.
+        """
+        failed = []
+        for send_to in recipients:
+            self.send_to = send_to
+            try:
+                self.send_notification(content=content, title=title)
+            except ConnectionError:
+                self.logger.warning(f'Failed to send notification to "{send_to}"')
+                failed.append(send_to)
+
+        return failed
+
+    @classmethod
+    def send_notification_batch(
+        cls, messages: list[tuple["NotificationHandlerAbstract", Title, Content]]
+    ) -> list[int]:
+        """
+        Реализация отправки пачки уведомлений (каждого - своему получателю).
+
+        По умолчанию уведомления отправляются по одному.
+
+        :param messages: обработчики уведомлений с отрендеренными заголовками и содержимым.
+        :return: номера уведомлений, которые не удалось отправить.
+        """
+        failed = []
+        for number, (handler, title, content) in enumerate(messages):
+            try:
+                handler.send_notification(content=content, title=title)
+            except ConnectionError:
+                handler.logger.warning(
+                    f'Failed to send notification to "{handler.send_to}"'
+                )
+                failed.append(number)
+
+        return failed
+
 
 class EmailNotificationHandler(NotificationHandlerAbstract):
-    email_sender: EmailSender | None = None
-
-    def __init__(self, notification_id: str, send_to: str):
-        super().__init__(notification_id, send_to)
-        if self.email_sender is None:
-            self.email_sender = EmailSender(
-                smtp_host=envs.smtp.server,
-                smtp_port=envs.smtp.port,
-                from_email=envs.smtp.from_email,
-                login=envs.smtp.login,
-                password=envs.smtp.password,
-                use_ssl=True,
-            )
+    """
+    Отправка уведомлений по электронной почте.
+
+    Отправитель выбирается настройкой ``SMTP_ENGINE``. Воркеры однопоточные (``--threads 1``), поэтому
+    письма отправляются пачками (см. ``send_notification_batch``): асинхронный движок (``asyncio``)
+    отправляет письма пачки и части группы получателей конкурентно, а smtplib - последовательно.
+    """
+
+    # отправитель (и его пул SMTP соединений) общий для всего процесса
+    email_sender: EmailSender | AsyncEmailSender | None = None
+    _email_sender_lock = threading.Lock()
+
+    @classmethod
+    def get_email_sender(cls) -> EmailSender | AsyncEmailSender:
+        sender_class = (
+            AsyncEmailSender if envs.smtp.engine == "asyncio" else EmailSender
+        )
+        with cls._email_sender_lock:
+            if cls.email_sender is None:
+                cls.email_sender = cls._create_sender(sender_class)
+
+        return cls.email_sender
+
+    @staticmethod
+    def _create_sender(
+        sender_class: type[EmailSender | AsyncEmailSender],
+    ) -> EmailSender | AsyncEmailSender:
+        return sender_class(
+            smtp_host=envs.smtp.server,
+            smtp_port=envs.smtp.port,
+            from_email=envs.smtp.from_email,
+            login=envs.smtp.login,
+            password=envs.smtp.password,
+            use_ssl=envs.smtp.use_ssl,
+            starttls=envs.smtp.starttls,
+            pool_size=envs.smtp.pool_size,
+            pool_idle_timeout=envs.smtp.pool_idle_timeout,
+            pool_check_after=envs.smtp.pool_check_after,
+        )
+
+    @classmethod
+    def close_email_sender(cls):
+        with cls._email_sender_lock:
+            if cls.email_sender is not None:
+                cls.wait_sender(cls.email_sender.close())
+
+    @staticmethod
+    def wait_sender(result):
+        """
+        Ожидание результата отправителя: методы асинхронного отправителя выполняются в event loop'е воркера
+        """
+        if inspect.isawaitable(result):
+            return run_async(result)
+        return result
 
     def render(self, with_base_template: bool = False) -> tuple[Title, Content]:
         return super().render(with_base_template=True)
@@ -120,9 +315,38 @@ class EmailNotificationHandler(NotificationHandlerAbstract):
         if notification is None:
             raise ValueError("Notification should be pre-loaded on __call__")
 
-        self.email_sender.send_message_fast(
-            self.send_to,
-            content,
-            title,
-            content_type="html",
+        self.wait_sender(
+            self.get_email_sender().send_message_fast(
+                self.send_to,
+                content,
+                title,
+                content_type="html",
+            )
+        )
+
+    @classmethod
+    def send_notification_batch(
+        cls, messages: list[tuple[NotificationHandlerAbstract, Title, Content]]
+    ) -> list[int]:
+        return cls.wait_sender(
+            cls.get_email_sender().send_messages(
+                [
+                    (handler.send_to, content, title)
+                    for handler, title, content in messages
+                ],
+                content_type="html",
+            )
+        )
+
+    def send_group_notification(
+        self, content: str, title: str, recipients: list[str]
+    ) -> list[str]:
+        return self.wait_sender(
+            self.get_email_sender().send_message_grouped(
+                recipients,
+                content,
+                title,
+                content_type="html",
+                max_recipients=envs.smtp.max_recipients,
+            )
         )
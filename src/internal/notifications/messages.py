@@ -0,0 +1,46 @@
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from internal.notifications.notifications import BATCH_INSERT_CHUNK_SIZE
+from models import NotificationMessage
+from utils.utils import chunked
+
+MessageRow = dict[str, Any]
+
+
+def save_messages(session: Session, rows: list[MessageRow]):
+    """
+    Сохранение сообщений об отправленных уведомлениях многострочными INSERT'ами.
+
+    Строки записываются в транзакции сессии актора и фиксируются вместе с ней одним commit'ом
+    (без отдельного соединения), а при ошибке отправки откатываются вместе с транзакцией,
+    поэтому отправка, сообщения которой не сохранены, будет повторена.
+
+    :param session: синхронная сессия SQLAlchemy.
+    :param rows: значения колонок таблицы сообщений.
+    """
+    for chunk in chunked(rows, BATCH_INSERT_CHUNK_SIZE):
+        session.execute(sa.insert(NotificationMessage).values(chunk))
+
+
+def discard_messages(session: Session, rows: list[MessageRow]):
+    """
+    Удаление сообщений, сохранённых до отправки уведомлений, которые не удалось отправить.
+
+    Сообщения удаляются по ключу (идентификатор и дата создания), поэтому запрос затрагивает только
+    секции, в которые они были записаны.
+
+    :param session: синхронная сессия SQLAlchemy.
+    :param rows: значения колонок, с которыми сообщения были сохранены (см. ``save_messages``).
+    """
+    for chunk in chunked(rows, BATCH_INSERT_CHUNK_SIZE):
+        keys = [(row["id"], row["created_at"]) for row in chunk]
+        session.execute(
+            sa.delete(NotificationMessage).where(
+                sa.tuple_(NotificationMessage.id, NotificationMessage.created_at).in_(
+                    keys
+                )
+            )
+        )
@@ -1,6 +1,140 @@
+import uuid
+from typing import Any, Iterable, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
 from core.crud.base import BaseCrud
-from models import Notification, NotificationRecurrence
+from core.crud.projection import ProjectionSerializer
+from internal.notifications.scheduler import schedule_rows
+from models import Notification, NotificationRecurrence, RecurrenceSchedule, with_schema
+from schemas.notifications import (
+    NotificationBare,
+    NotificationCreate,
+    NotificationRecurrenceCreate,
+)
+from utils.utils import chunked
 
 notification_crud = BaseCrud(entity=Notification)
 
 notification_recurrence_crud = BaseCrud(entity=NotificationRecurrence)
+
+notification_serializer = ProjectionSerializer(NotificationBare, Notification)
+
+# asyncpg ограничивает количество параметров запроса (32767), поэтому многострочные INSERT'ы
+# выполняются частями
+BATCH_INSERT_CHUNK_SIZE = 1000
+
+
+async def allocate_recurrence_ids(session: AsyncSession, count: int) -> list[int]:
+    """
+    Резервирование идентификаторов правил повторения за один запрос к последовательности.
+
+    :param session: сессия SQLAlchemy.
+    :param count: количество резервируемых идентификаторов.
+    :return: список зарезервированных идентификаторов.
+    """
+    if count == 0:
+        return []
+
+    sequence = with_schema("recurrences_id_seq")
+    query = sa.text(f"SELECT nextval('{sequence}') FROM generate_series(1, :count)")
+    return list((await session.execute(query, {"count": count})).scalars())
+
+
+def load_notification(
+    session: Session, notification_id: uuid.UUID | str
+) -> Notification | None:
+    """
+    Загрузка уведомления вместе с шаблоном и правилом повторения за один запрос (для воркеров).
+
+    :param session: синхронная сессия SQLAlchemy.
+    :param notification_id: идентификатор уведомления.
+    """
+    query = (
+        sa.select(Notification)
+        .options(joinedload(Notification.template), joinedload(Notification.recurrence))
+        .where(Notification.id == notification_id)
+    )
+    return session.scalar(query)
+
+
+def load_notifications(
+    session: Session, notification_ids: Iterable[uuid.UUID | str]
+) -> dict[str, Notification]:
+    """
+    Загрузка пачки уведомлений вместе с шаблонами и правилами повторения за один запрос (для воркеров).
+
+    :param session: синхронная сессия SQLAlchemy.
+    :param notification_ids: идентификаторы уведомлений.
+    :return: найденные уведомления по строковым идентификаторам.
+    """
+    query = (
+        sa.select(Notification)
+        .options(joinedload(Notification.template), joinedload(Notification.recurrence))
+        .where(Notification.id.in_(list(notification_ids)))
+    )
+    return {str(i.id): i for i in session.scalars(query).unique()}
+
+
+def recurrence_values(data: NotificationRecurrenceCreate) -> dict[str, Any]:
+    """
+    Приведение правила повторения к значениям колонок таблицы
+    """
+    values = data.dict()
+    values["week_days"] = [day.value for day in data.week_days]
+    return values
+
+
+async def bulk_create_notifications(
+    session: AsyncSession,
+    notifications: Sequence[NotificationCreate],
+    template_id: int,
+    created_by: uuid.UUID | None = None,
+) -> list[uuid.UUID]:
+    """
+    Создание пачки уведомлений многострочными INSERT'ами без создания ORM объектов.
+
+    Идентификаторы уведомлений и правил повторения формируются заранее, поэтому запросы
+    не требуют RETURNING и refresh для каждой записи.
+
+    :param session: сессия SQLAlchemy.
+    :param notifications: данные создаваемых уведомлений.
+    :param template_id: идентификатор шаблона, по которому создаются уведомления.
+    :param created_by: идентификатор автора уведомлений.
+    :return: идентификаторы созданных уведомлений в порядке переданных данных.
+    """
+    recurrences_count = sum(1 for i in notifications if i.recurrence)
+    recurrence_ids = iter(await allocate_recurrence_ids(session, recurrences_count))
+
+    recurrence_rows, notification_rows, scheduled = [], [], []
+    for data in notifications:
+        notification_id, recurrence_id = uuid.uuid4(), None
+        if data.recurrence:
+            recurrence_id = next(recurrence_ids)
+            values = recurrence_values(data.recurrence)
+            recurrence_rows.append({"id": recurrence_id, **values})
+            scheduled.append((recurrence_id, notification_id, values))
+
+        notification_rows.append(
+            {
+                **data.dict(exclude={"recurrence"}),
+                "id": notification_id,
+                "template_id": template_id,
+                "recurrence_id": recurrence_id,
+                "created_by": created_by,
+            }
+        )
+
+    for chunk in chunked(recurrence_rows, BATCH_INSERT_CHUNK_SIZE):
+        await session.execute(sa.insert(NotificationRecurrence).values(chunk))
+
+    for chunk in chunked(notification_rows, BATCH_INSERT_CHUNK_SIZE):
+        await session.execute(sa.insert(Notification).values(chunk))
+
+    # первые срабатывания правил повторения (см. internal.notifications.scheduler)
+    for chunk in chunked(schedule_rows(scheduled), BATCH_INSERT_CHUNK_SIZE):
+        await session.execute(sa.insert(RecurrenceSchedule).values(chunk))
+
+    return [row["id"] for row in notification_rows]
@@ -0,0 +1,201 @@
+import logging
+import re
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+from core.config import envs
+from models import DB_SCHEMA, NotificationMessage
+from utils.db_session import sync_db_engine
+
+logger = logging.getLogger("messages-partitions")
+
+MESSAGES_TABLE = NotificationMessage.__tablename__
+PARTITION_NAME_RE = re.compile(rf"^{MESSAGES_TABLE}_(\d{{4}})_(\d{{2}})$")
+DEFAULT_PARTITION = f"{MESSAGES_TABLE}_default"
+
+# обслуживание секций выполняется только одним процессом одновременно
+PARTITIONS_LOCK_ID = 7_230_514
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{MESSAGES_TABLE}_{month:%Y_%m}"
+
+
+def partition_month(name: str) -> date | None:
+    """
+    Месяц секции по её названию (None для секций, созданных не по соглашению, например DEFAULT)
+    """
+    if match := PARTITION_NAME_RE.match(name):
+        return date(int(match[1]), int(match[2]), 1)
+    return None
+
+
+def lock_partitions(connection: Connection) -> bool:
+    """
+    Блокировка обслуживания секций до конца транзакции
+
+    :return: удалось ли получить блокировку (False, если секции уже обслуживает другой процесс).
+    """
+    return connection.scalar(
+        sa.select(sa.func.pg_try_advisory_xact_lock(PARTITIONS_LOCK_ID))
+    )
+
+
+def create_message_partitions(
+    connection: Connection, since: date, months: int
+) -> list[str]:
+    """
+    Создание месячных секций таблицы сообщений (уже существующие секции пропускаются).
+
+    Сообщения месяца, попавшие в секцию DEFAULT (если секция не была создана вовремя), переносятся
+    в созданную секцию: PostgreSQL не создаёт секцию, пока в DEFAULT есть строки из её диапазона.
+
+    :param connection: соединение с БД.
+    :param since: день, с месяца которого создаются секции.
+    :param months: количество создаваемых месячных секций.
+    :return: названия созданных секций.
+    """
+    existing = set(list_message_partitions(connection))
+
+    created = []
+    first = month_start(since)
+    for month in (add_months(first, i) for i in range(months)):
+        name = partition_name(month)
+        if name in existing:
+            continue
+
+        moved = DEFAULT_PARTITION in existing and _detach_default_rows(
+            connection, month
+        )
+        connection.execute(
+            sa.text(
+                f'CREATE TABLE "{DB_SCHEMA}"."{name}" '
+                f'PARTITION OF "{DB_SCHEMA}"."{MESSAGES_TABLE}" '
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+        )
+        if moved:
+            connection.execute(
+                sa.text(
+                    f'INSERT INTO "{DB_SCHEMA}"."{MESSAGES_TABLE}" SELECT * FROM moved_messages'
+                )
+            )
+            connection.execute(sa.text("DROP TABLE moved_messages"))
+            logger.warning("Moved messages from the default partition to %s", name)
+        created.append(name)
+
+    if created:
+        logger.info("Created messages partitions: %s", ", ".join(created))
+    return created
+
+
+def _detach_default_rows(connection: Connection, month: date) -> bool:
+    """
+    Перенос сообщений месяца из секции DEFAULT во временную таблицу ``moved_messages``
+
+    :return: были ли перенесены сообщения.
+    """
+    bounds = {"since": month, "till": add_months(month, 1)}
+    default = f'"{DB_SCHEMA}"."{DEFAULT_PARTITION}"'
+    condition = "created_at >= :since AND created_at < :till"
+
+    exists = connection.scalar(
+        sa.text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {condition})"), bounds
+    )
+    if not exists:
+        return False
+
+    connection.execute(
+        sa.text(
+            f"CREATE TEMPORARY TABLE moved_messages (LIKE {default}) ON COMMIT DROP"
+        )
+    )
+    connection.execute(
+        sa.text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {condition} RETURNING *) "
+            "INSERT INTO moved_messages SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    return True
+
+
+def drop_expired_message_partitions(connection: Connection, before: date) -> list[str]:
+    """
+    Удаление секций таблицы сообщений, целиком находящихся до указанной даты.
+
+    Секция сначала отсоединяется от таблицы, а затем удаляется, поэтому старые сообщения удаляются
+    без DELETE'ов (и без последующей очистки таблицы и индексов).
+
+    :param connection: соединение с БД.
+    :param before: сообщения, созданные раньше месяца этой даты, удаляются.
+    :return: названия удалённых секций.
+    """
+    border = month_start(before)
+
+    dropped = []
+    for name in list_message_partitions(connection):
+        month = partition_month(name)
+        if month is None or month >= border:
+            continue
+
+        connection.execute(
+            sa.text(
+                f'ALTER TABLE "{DB_SCHEMA}"."{MESSAGES_TABLE}" '
+                f'DETACH PARTITION "{DB_SCHEMA}"."{name}"'
+            )
+        )
+        connection.execute(sa.text(f'DROP TABLE "{DB_SCHEMA}"."{name}"'))
+        dropped.append(name)
+
+    if dropped:
+        logger.info("Dropped expired messages partitions: %s", ", ".join(dropped))
+    return dropped
+
+
+def list_message_partitions(connection: Connection) -> list[str]:
+    query = sa.text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            JOIN pg_namespace ON parent.relnamespace = pg_namespace.oid
+        WHERE pg_namespace.nspname = :schema AND parent.relname = :table
+        """
+    )
+    return list(
+        connection.scalars(query, {"schema": DB_SCHEMA, "table": MESSAGES_TABLE})
+    )
+
+
+def maintain_message_partitions(today: date | None = None):
+    """
+    Обслуживание секций таблицы сообщений: создание секций на будущие месяцы
+    и удаление секций старше срока хранения (при его наличии)
+    """
+    config = envs.notifications
+    today = today or datetime.utcnow().date()
+
+    with sync_db_engine.begin() as connection:
+        if not lock_partitions(connection):
+            logger.debug("Messages partitions are maintained by another process")
+            return
+
+        create_message_partitions(
+            connection, today, months=config.messages_partitions_ahead + 1
+        )
+        if config.messages_retention_months:
+            before = add_months(month_start(today), -config.messages_retention_months)
+            drop_expired_message_partitions(connection, before)
@@ -0,0 +1,329 @@
+import bisect
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, Sequence
+
+import cachetools
+from dateutil import rrule
+
+from core.config import envs
+from models import (
+    NotificationRecurrence,
+    NotificationRecurrenceFrequency,
+    NotificationRecurrenceWeekday,
+)
+from utils.utils import SingletonMeta
+
+# значения колонок правила повторения (строка таблицы или ORM объект)
+RecurrenceValues = NotificationRecurrence | dict[str, Any]
+
+
+def _value(recurrence: RecurrenceValues, name: str) -> Any:
+    if isinstance(recurrence, dict):
+        return recurrence.get(name)
+    return getattr(recurrence, name)
+
+
+def _week_day(day: NotificationRecurrenceWeekday | int) -> int:
+    if isinstance(day, NotificationRecurrenceWeekday):
+        return day.value
+    return int(day)
+
+
+def _frequency(frequency: NotificationRecurrenceFrequency | str | int) -> int:
+    if isinstance(frequency, NotificationRecurrenceFrequency):
+        return frequency.value
+    if isinstance(frequency, str):
+        return NotificationRecurrenceFrequency[frequency].value
+    return int(frequency)
+
+
+def rule_fingerprint(recurrence: RecurrenceValues) -> tuple:
+    """
+    Приведённые значения правила повторения: правила с одинаковыми значениями порождают одинаковые серии
+    """
+    week_days = _value(recurrence, "week_days")
+    return (
+        _frequency(_value(recurrence, "frequency")),
+        _value(recurrence, "started_at"),
+        _value(recurrence, "interval") or 1,
+        _value(recurrence, "count"),
+        _value(recurrence, "until"),
+        tuple(_week_day(i) for i in week_days or ()),
+        tuple(sorted(_value(recurrence, "additional_dates") or ())),
+        tuple(sorted(_value(recurrence, "exclude_dates") or ())),
+    )
+
+
+class CompiledRule:
+    """
+    Правило повторения dateutil с дополнительными и исключёнными датами и курсором.
+
+    Курсор - последнее пройденное срабатывание основного правила и его номер в серии.
+    dateutil перебирает серию от начала при каждом поиске, поэтому основное правило строится
+    от курсора (с уменьшенным на номер курсора ``count``), а курсор сдвигается вслед за поиском:
+    последовательный поиск срабатываний стоит O(1) в среднем, а не O(номера срабатывания).
+    """
+
+    def __init__(
+        self,
+        recurrence: RecurrenceValues,
+        cursor_at: datetime | None = None,
+        cursor_index: int = 0,
+    ):
+        self.fingerprint = rule_fingerprint(recurrence)
+        (
+            self.frequency,
+            self.started_at,
+            self.interval,
+            self.count,
+            self.until,
+            week_days,
+            additional_dates,
+            exclude_dates,
+        ) = self.fingerprint
+        self.week_days = list(week_days) or None
+        self.additional_dates = list(additional_dates)
+        self.exclude_dates = list(exclude_dates)
+
+        self.seek(cursor_at or self.started_at, cursor_index if cursor_at else 0)
+
+    def seek(self, cursor_at: datetime, cursor_index: int):
+        """
+        Перенос курсора на срабатывание основного правила
+
+        :param cursor_at: срабатывание основного правила (либо его начало).
+        :param cursor_index: номер срабатывания в серии основного правила (начиная с 0).
+        """
+        self.cursor_at = cursor_at
+        self.cursor_index = cursor_index
+
+        # с начала правила, сдвинутого на его срабатывание, серия продолжается так же, как исходная
+        self._base = None
+        remaining = None if self.count is None else self.count - cursor_index
+        if remaining is None or remaining > 0:
+            self._base = rrule.rrule(
+                self.frequency,
+                dtstart=cursor_at,
+                interval=self.interval,
+                count=remaining,
+                until=self.until,
+                byweekday=self.week_days,
+            )
+
+        self._rule_set = rrule.rruleset()
+        if self._base is not None:
+            self._rule_set.rrule(self._base)
+        for date in self.additional_dates:
+            if date >= cursor_at:
+                self._rule_set.rdate(date)
+        for date in self.exclude_dates:
+            self._rule_set.exdate(date)
+
+    def after(self, moment: datetime, inclusive: bool = False) -> datetime | None:
+        """
+        Ближайшее срабатывание после указанной даты
+
+        :param moment: дата, после которой ищется срабатывание.
+        :param inclusive: учитывать ли срабатывание, совпадающее с датой.
+        :return: дата срабатывания, либо None, если правило исчерпано.
+        """
+        if moment < self.cursor_at:
+            # курсор уже прошёл дату (например, поиск в прошлом) - серия перебирается с начала
+            self.seek(self.started_at, 0)
+        self._advance(moment)
+        return self._rule_set.after(moment, inc=inclusive)
+
+    def _advance(self, moment: datetime):
+        # курсор переносится на последнее срабатывание основного правила, не позже даты
+        if self._base is None:
+            return
+
+        last = None
+        for index, occurrence in enumerate(self._base):
+            if occurrence >= moment:
+                break
+            last = index, occurrence
+        if last is not None and last[0] > 0:
+            self.seek(last[1], self.cursor_index + last[0])
+
+
+class RuleCache(metaclass=SingletonMeta):
+    """
+    Кэш скомпилированных правил повторения (по идентификатору правила).
+
+    Закэшированное правило используется, пока значения правила не изменились, а курсор
+    берётся наиболее продвинувшийся из закэшированного и сохранённого в расписании.
+    """
+
+    def __init__(self):
+        self._rules = cachetools.LRUCache(maxsize=envs.scheduler.rule_cache_size)
+
+    def get(
+        self,
+        recurrence_id: int,
+        recurrence: RecurrenceValues,
+        cursor_at: datetime | None = None,
+        cursor_index: int = 0,
+    ) -> CompiledRule:
+        # значения правила сравниваются без его компиляции, поэтому попадание в кэш не разбирает правило заново
+        cached: CompiledRule | None = self._rules.get(recurrence_id)
+        if cached is not None and cached.fingerprint == rule_fingerprint(recurrence):
+            if cursor_at is None or cached.cursor_at >= cursor_at:
+                return cached
+            cached.seek(cursor_at, cursor_index)
+            return cached
+
+        compiled = CompiledRule(recurrence, cursor_at, cursor_index)
+        self._rules[recurrence_id] = compiled
+        return compiled
+
+    def clear(self):
+        self._rules.clear()
+
+
+class Occurrence(NamedTuple):
+    fire_at: datetime
+    # курсор правила (см. CompiledRule)
+    cursor_at: datetime | None
+    cursor_index: int
+
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+DAY = 24 * 3600 * 10**6  # microseconds
+# длительность периода простых правил (в микросекундах)
+FREQUENCY_UNITS = {
+    rrule.WEEKLY: 7 * DAY,
+    rrule.DAILY: DAY,
+    rrule.HOURLY: 3600 * 10**6,
+    rrule.MINUTELY: 60 * 10**6,
+    rrule.SECONDLY: 10**6,
+}
+
+
+def _timestamp(moment: datetime) -> int:
+    return (moment - EPOCH) // MICROSECOND
+
+
+def _datetime(timestamp: int) -> datetime:
+    return EPOCH + timedelta(microseconds=timestamp)
+
+
+class SimpleRule:
+    """
+    Правило повторения без дополнительных и исключённых дат с частотой от недели до секунды
+    (дни недели - только для недельных и ежедневных правил).
+
+    Срабатывания такого правила - это ``base + period * q + offset`` (q >= 0) для смещений внутри периода,
+    не раньше начала правила, поэтому ближайшее срабатывание и его номер в серии вычисляются
+    арифметикой над временными метками, а не перебором серии.
+    """
+
+    def __init__(self, rule: CompiledRule):
+        # dateutil отбрасывает микросекунды начала правила
+        start = _timestamp(rule.started_at.replace(microsecond=0))
+        unit = FREQUENCY_UNITS[rule.frequency]
+        week_days = rule.week_days
+        if rule.frequency == rrule.WEEKLY and not week_days:
+            week_days = [rule.started_at.weekday()]
+
+        self.start = start
+        self.count = rule.count
+        self.until = None if rule.until is None else _timestamp(rule.until)
+        self.period = unit * rule.interval
+        self.base = start
+        self.offsets = [0]
+
+        if rule.frequency == rrule.WEEKLY:
+            # периоды отсчитываются от начала недели (понедельника), в которую попадает начало правила
+            self.base = start - rule.started_at.weekday() * DAY
+            self.offsets = sorted(day * DAY for day in set(week_days))
+        elif week_days:
+            # дни недели ежедневного правила повторяются с периодом в interval недель
+            self.period = 7 * self.period
+            self.offsets = [
+                day * unit * rule.interval
+                for day in range(7)
+                if (rule.started_at.weekday() + day * rule.interval) % 7 in week_days
+            ]
+
+        # смещения первого периода, приходящиеся на даты до начала правила
+        self.skipped = bisect.bisect_left(self.offsets, self.start - self.base)
+
+    @classmethod
+    def supports(cls, rule: CompiledRule) -> bool:
+        if rule.frequency not in FREQUENCY_UNITS:
+            return False
+        if rule.additional_dates or rule.exclude_dates:
+            return False
+        return not rule.week_days or rule.frequency in (rrule.WEEKLY, rrule.DAILY)
+
+    def after(self, moment: datetime, inclusive: bool = False) -> Occurrence | None:
+        target = _timestamp(moment) + (0 if inclusive else 1)
+        if not self.offsets:
+            return None
+
+        quotient, remainder = divmod(max(target, self.start) - self.base, self.period)
+        position = bisect.bisect_left(self.offsets, remainder)
+        if position == len(self.offsets):
+            quotient, position = quotient + 1, 0
+
+        index = quotient * len(self.offsets) + position - self.skipped
+        fire_at = self._at(quotient, position)
+        if self.count is not None and index >= self.count:
+            return None
+        if self.until is not None and fire_at > self.until:
+            return None
+
+        if index == 0:
+            return Occurrence(_datetime(fire_at), None, 0)
+        previous = self._at(
+            *divmod(quotient * len(self.offsets) + position - 1, len(self.offsets))
+        )
+        return Occurrence(_datetime(fire_at), _datetime(previous), index - 1)
+
+    def _at(self, quotient: int, position: int) -> int:
+        return self.base + quotient * self.period + self.offsets[position]
+
+
+def next_occurrences(
+    recurrences: Sequence[RecurrenceValues], after: datetime, inclusive: bool = False
+) -> list[Occurrence | None]:
+    """
+    Ближайшие срабатывания пачки правил повторения после указанной даты.
+
+    Простые правила (см. SimpleRule) вычисляются без перебора серии, остальные - через dateutil.
+
+    :param recurrences: правила повторения.
+    :param after: дата, после которой ищутся срабатывания.
+    :param inclusive: учитывать ли срабатывания, совпадающие с датой.
+    :return: срабатывания с курсорами правил в порядке правил (None - правило исчерпано).
+    """
+    occurrences = []
+    for recurrence in recurrences:
+        rule = CompiledRule(recurrence)
+        if SimpleRule.supports(rule):
+            occurrences.append(SimpleRule(rule).after(after, inclusive))
+            continue
+
+        fire_at = rule.after(after, inclusive)
+        occurrences.append(
+            None
+            if fire_at is None
+            else Occurrence(fire_at, rule.cursor_at, rule.cursor_index)
+        )
+    return occurrences
+
+
+def next_occurrence(
+    recurrence: RecurrenceValues, after: datetime, inclusive: bool = False
+) -> datetime | None:
+    """
+    Ближайшее срабатывание правила повторения после указанной даты
+
+    :param recurrence: правило повторения.
+    :param after: дата, после которой ищется срабатывание.
+    :param inclusive: учитывать ли срабатывание, совпадающее с датой.
+    :return: дата срабатывания, либо None, если правило исчерпано.
+    """
+    return CompiledRule(recurrence).after(after, inclusive=inclusive)
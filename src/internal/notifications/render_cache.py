@@ -0,0 +1,75 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Any, Callable, Hashable
+
+import cachetools
+
+from core.config import envs
+from models import Template
+from utils.utils import SingletonMeta
+
+Rendered = tuple[str, str]  # заголовок и содержимое
+
+
+def template_data_hash(template_data: dict[str, Any] | None) -> str:
+    """
+    Стабильный (не зависящий от порядка ключей) хэш данных для шаблонизации
+    """
+    dumped = json.dumps(
+        template_data or {}, sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(dumped.encode()).hexdigest()
+
+
+def render_key(
+    template: Template, template_data: dict[str, Any] | None, with_base_template: bool
+) -> Hashable:
+    """
+    Ключ отрендеренного уведомления: версия шаблона, данные для шаблонизации и режим обёртки
+    """
+    updated_at: datetime | None = template.updated_at
+    return (
+        template.id,
+        updated_at and updated_at.isoformat(),
+        template_data_hash(template_data),
+        with_base_template,
+    )
+
+
+class RenderCache(metaclass=SingletonMeta):
+    """
+    Ограниченный по размеру кэш отрендеренных уведомлений (заголовок и содержимое).
+
+    Уведомления с одинаковыми шаблоном и данными (повторы отправки, рассылки) рендерятся один раз на процесс.
+    Изменение шаблона меняет ключ кэша, а изменения базового шаблона учитываются по истечении TTL.
+    """
+
+    def __init__(self):
+        config = envs.notifications
+        self._cache = cachetools.TTLCache(
+            maxsize=config.render_cache_size, ttl=config.render_cache_ttl
+        )
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Rendered]) -> Rendered:
+        """
+        Получение отрендеренного уведомления из кэша, либо рендер с сохранением результата
+
+        :param key: ключ уведомления (см. ``render_key``).
+        :param render: функция рендера уведомления.
+        """
+        with self._lock:
+            rendered = self._cache.get(key)
+        if rendered is not None:
+            return rendered
+
+        rendered = render()
+        with self._lock:
+            self._cache[key] = rendered
+        return rendered
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,319 @@
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from core.config import envs
+from internal.notifications.deferred import promote_scheduled_sends
+from internal.notifications.recurrences import (
+    CompiledRule,
+    RecurrenceValues,
+    RuleCache,
+    next_occurrences,
+)
+from models import NotificationRecurrence, RecurrenceSchedule
+from utils.db_session import sync_db_session_manager
+from utils.time import now
+
+logger = logging.getLogger("recurrence-scheduler")
+
+# публикация задач на отправку уведомлений (по идентификаторам уведомлений и, при необходимости,
+# задержкам отправки в миллисекундах)
+Enqueue = Callable[..., Any]
+
+
+def schedule_rows(
+    recurrences: Iterable[tuple[int, uuid.UUID, RecurrenceValues]],
+    since: datetime | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Строки расписания для новых правил повторения (правила без будущих срабатываний пропускаются)
+
+    :param recurrences: идентификатор правила, идентификатор уведомления и значения правила.
+    :param since: дата, начиная с которой ищется первое срабатывание (по умолчанию - текущая).
+    """
+    since = since or now()
+    recurrences = list(recurrences)
+    occurrences = next_occurrences(
+        [recurrence for _, _, recurrence in recurrences], since, inclusive=True
+    )
+
+    rows = []
+    for (recurrence_id, notification_id, _), occurrence in zip(
+        recurrences, occurrences
+    ):
+        if occurrence is not None:
+            rows.append(
+                {
+                    "recurrence_id": recurrence_id,
+                    "notification_id": notification_id,
+                    "next_fire_at": occurrence.fire_at,
+                    "cursor_at": occurrence.cursor_at,
+                    "cursor_index": occurrence.cursor_index,
+                }
+            )
+    return rows
+
+
+class LeasedRecurrence:
+    """
+    Арендованное планировщиком правило повторения
+    """
+
+    __slots__ = ("recurrence_id", "notification_id", "next_fire_at", "rule")
+
+    def __init__(
+        self,
+        recurrence_id: int,
+        notification_id: uuid.UUID,
+        next_fire_at: datetime,
+        rule: CompiledRule,
+    ):
+        self.recurrence_id = recurrence_id
+        self.notification_id = notification_id
+        # None - правило исчерпано
+        self.next_fire_at: datetime | None = next_fire_at
+        self.rule = rule
+
+
+class RecurrenceScheduler:
+    """
+    Планировщик регулярных уведомлений.
+
+    Раз в ``poll_interval`` планировщик одним запросом арендует (``FOR UPDATE SKIP LOCKED``) повторения,
+    наступающие в пределах окна ``lease_window``, и дальше срабатывает их из памяти (по куче дат срабатывания)
+    без обращений к базе данных. Тем же циклом сохраняется прогресс арендованных правил, продлеваются их
+    аренды, а правила, следующее срабатывание которых вышло за окно, возвращаются в расписание.
+    При остановке все аренды освобождаются.
+
+    Можно запускать несколько экземпляров планировщика одновременно: аренды остановившегося экземпляра
+    переходят к остальным через ``lease_timeout``, а повторения, сработавшие после последнего сохранения
+    прогресса, будут отправлены повторно (но не будут потеряны).
+    Пропущенные повторения (например, при простое планировщика) не досылаются: уведомление отправляется
+    один раз, а правило переносится на ближайшее будущее повторение.
+
+    Тем же циклом брокеру передаются наступающие отложенные отправки (см. internal.notifications.deferred).
+    """
+
+    def __init__(self, enqueue: Enqueue):
+        config = envs.scheduler
+        self.enqueue = enqueue
+        self.batch_size = config.batch_size
+        self.poll_interval = config.poll_interval
+        self.lease_window = timedelta(seconds=config.lease_window)
+        self.lease_timeout = timedelta(seconds=config.lease_timeout)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._leased: dict[int, LeasedRecurrence] = {}
+        # (дата срабатывания, идентификатор правила), устаревшие элементы пропускаются при извлечении
+        self._queue: list[tuple[datetime, int]] = []
+        self._lease_expires_at: datetime | None = None
+        self._stopped = threading.Event()
+
+    def run(self):
+        logger.info("Recurrence scheduler %s started", self.owner)
+        next_poll = time.monotonic()
+        try:
+            while not self._stopped.is_set():
+                if time.monotonic() >= next_poll:
+                    try:
+                        self.poll()
+                    except Exception:
+                        logger.error("Failed to lease recurrences", exc_info=True)
+                    next_poll = time.monotonic() + self.poll_interval
+
+                try:
+                    self.fire_due()
+                except Exception:
+                    logger.error("Failed to fire due recurrences", exc_info=True)
+
+                self._stopped.wait(self._delay(next_poll))
+        finally:
+            self.release()
+        logger.info("Recurrence scheduler %s stopped", self.owner)
+
+    def stop(self):
+        self._stopped.set()
+
+    def poll(self):
+        """
+        Сохранение прогресса арендованных правил, аренда наступающих в пределах окна повторений
+        и передача брокеру наступающих отложенных отправок
+        """
+        moment = now()
+        horizon = moment + self.lease_window
+        with sync_db_session_manager() as session:
+            self._save(session, moment, horizon)
+            session.commit()
+            self._lease_expires_at = moment + self.lease_timeout
+
+            while self._lease(session, moment, horizon) == self.batch_size:
+                pass
+
+            # отложенные отправки передаются брокеру тем же циклом
+            promoted = self.batch_size
+            while promoted == self.batch_size:
+                promoted = promote_scheduled_sends(
+                    session, self.enqueue, self.batch_size, moment
+                )
+
+    def release(self):
+        """
+        Сохранение прогресса и освобождение всех аренд
+        """
+        if not self._leased:
+            return
+        try:
+            with sync_db_session_manager() as session:
+                self._save(session, now())
+        except Exception:
+            logger.error("Failed to release leased recurrences", exc_info=True)
+        self._forget()
+
+    def fire_due(self, moment: datetime | None = None) -> int:
+        """
+        Срабатывание наступивших арендованных повторений
+
+        :param moment: текущая дата (для тестов).
+        :return: количество сработавших повторений.
+        """
+        moment = moment or now()
+        if self._lease_expires_at is not None and moment >= self._lease_expires_at:
+            # аренды не удалось продлить, и они могли перейти к другим экземплярам планировщика
+            logger.warning("Leases of %s expired", self.owner)
+            self._forget()
+            return 0
+
+        due = []
+        while self._queue and self._queue[0][0] <= moment:
+            fire_at, recurrence_id = heapq.heappop(self._queue)
+            item = self._leased.get(recurrence_id)
+            if item is not None and item.next_fire_at == fire_at:
+                due.append(item)
+        if not due:
+            return 0
+
+        try:
+            self.enqueue([str(item.notification_id) for item in due])
+        except Exception:
+            for item in due:
+                heapq.heappush(self._queue, (item.next_fire_at, item.recurrence_id))
+            raise
+
+        for item in due:
+            item.next_fire_at = item.rule.after(max(item.next_fire_at, moment))
+            if item.next_fire_at is not None:
+                heapq.heappush(self._queue, (item.next_fire_at, item.recurrence_id))
+
+        logger.debug("Fired %s recurrences", len(due))
+        return len(due)
+
+    def _lease(self, session: Session, moment: datetime, horizon: datetime) -> int:
+        query = (
+            sa.select(RecurrenceSchedule, NotificationRecurrence)
+            .join(
+                NotificationRecurrence,
+                NotificationRecurrence.id == RecurrenceSchedule.recurrence_id,
+            )
+            .where(
+                RecurrenceSchedule.next_fire_at <= horizon,
+                sa.or_(
+                    RecurrenceSchedule.leased_until.is_(None),
+                    RecurrenceSchedule.leased_until < moment,
+                ),
+            )
+            .order_by(RecurrenceSchedule.next_fire_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True, of=RecurrenceSchedule)
+        )
+        rows = session.execute(query).all()
+
+        for schedule, recurrence in rows:
+            schedule.leased_by = self.owner
+            schedule.leased_until = self._lease_expires_at
+            self._leased[schedule.recurrence_id] = LeasedRecurrence(
+                schedule.recurrence_id,
+                schedule.notification_id,
+                schedule.next_fire_at,
+                RuleCache().get(
+                    schedule.recurrence_id,
+                    recurrence,
+                    schedule.cursor_at,
+                    schedule.cursor_index,
+                ),
+            )
+            heapq.heappush(self._queue, (schedule.next_fire_at, schedule.recurrence_id))
+        session.commit()
+
+        if rows:
+            logger.debug("Leased %s recurrences", len(rows))
+        return len(rows)
+
+    def _save(
+        self, session: Session, moment: datetime, horizon: datetime | None = None
+    ):
+        """
+        Сохранение прогресса арендованных правил: аренды правил, следующее срабатывание которых наступает
+        в пределах горизонта, продлеваются, остальные освобождаются, а исчерпанные правила удаляются
+        из расписания (без горизонта освобождаются все аренды)
+        """
+        updates, exhausted = [], []
+        for recurrence_id, item in list(self._leased.items()):
+            if item.next_fire_at is None:
+                exhausted.append(recurrence_id)
+                del self._leased[recurrence_id]
+                continue
+
+            keep = horizon is not None and item.next_fire_at <= horizon
+            updates.append(
+                {
+                    "b_recurrence_id": recurrence_id,
+                    "b_next_fire_at": item.next_fire_at,
+                    "b_cursor_at": item.rule.cursor_at,
+                    "b_cursor_index": item.rule.cursor_index,
+                    "b_leased_by": self.owner if keep else None,
+                    "b_leased_until": moment + self.lease_timeout if keep else None,
+                }
+            )
+            if not keep:
+                del self._leased[recurrence_id]
+
+        # запись, аренда которой перешла к другому экземпляру, не изменяется
+        table = RecurrenceSchedule.__table__
+        owned = table.c.leased_by == self.owner
+        if updates:
+            session.connection().execute(
+                table.update()
+                .where(table.c.recurrence_id == sa.bindparam("b_recurrence_id"), owned)
+                .values(
+                    next_fire_at=sa.bindparam("b_next_fire_at"),
+                    cursor_at=sa.bindparam("b_cursor_at"),
+                    cursor_index=sa.bindparam("b_cursor_index"),
+                    leased_by=sa.bindparam("b_leased_by"),
+                    leased_until=sa.bindparam("b_leased_until"),
+                ),
+                updates,
+            )
+        if exhausted:
+            session.connection().execute(
+                table.delete().where(table.c.recurrence_id.in_(exhausted), owned)
+            )
+
+    def _forget(self):
+        self._leased.clear()
+        self._queue.clear()
+        self._lease_expires_at = None
+
+    def _delay(self, next_poll: float) -> float:
+        delay = next_poll - time.monotonic()
+        if self._queue:
+            delay = min(delay, (self._queue[0][0] - now()).total_seconds())
+        return max(delay, 0)
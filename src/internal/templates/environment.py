@@ -1,4 +1,7 @@
 import contextvars
+import os
+import threading
+from datetime import datetime
 from typing import Any, Callable, Mapping
 
 import cachetools
@@ -6,12 +9,22 @@ import jinja2
 import sqlalchemy as sa
 from cachetools import keys as cache_keys
 
+from core.config import envs
 from internal.templates import wrapping
 from internal.templates.wrapping import BASE_TEMPLATE_NAME
 from models import Template
-from utils.db_session import db_session_manager
+from utils.db_session import sync_db_session_manager
 from utils.utils import SingletonMeta
 
+TemplateVersion = tuple[int, datetime | None]
+
+
+def template_version(template: Template) -> TemplateVersion:
+    """
+    Версия шаблона: меняется при пересоздании и при каждом обновлении шаблона
+    """
+    return template.id, template.updated_at
+
 
 class DbLoader(jinja2.BaseLoader):
     """
@@ -21,19 +34,32 @@ class DbLoader(jinja2.BaseLoader):
     with_base_template = contextvars.ContextVar("with_base_template", default=True)
 
     def __init__(self):
-        self._cache = cachetools.TTLCache(maxsize=32, ttl=60)
+        config = envs.templates
+        # кэш инвалидируется событиями об изменении шаблонов (см. TemplateInvalidationListener),
+        # поэтому время жизни записей может быть большим
+        self._cache = cachetools.TTLCache(
+            maxsize=config.loader_cache_size, ttl=config.loader_cache_ttl
+        )
+        self._lock = threading.Lock()
 
     def get_template(self, slug: str) -> Template:
         key = cache_keys.hashkey(slug)
-        if templ := self._cache.get(key):
+        with self._lock:
+            templ = self._cache.get(key)
+        if templ:
             return templ
-        return self._get_template(slug)
+
+        templ = self._get_template(slug)
+        if templ:
+            with self._lock:
+                self._cache[key] = templ
+        return templ
 
     def _get_template(self, slug: str) -> Template | None:
         """
         Получение объекта шаблона из БД.
         """
-        with db_session_manager() as session:
+        with sync_db_session_manager() as session:
             templ_obj: Template = session.scalar(
                 sa.select(Template).where(Template.slug == slug)
             )
@@ -45,10 +71,9 @@ class DbLoader(jinja2.BaseLoader):
         """
         Предварительная загрузка шаблона в кэш
         """
-        key = cache_keys.hashkey(
-            self, template.slug
-        )  # те же аргументы, что и в функции get_template
-        self._cache[key] = template
+        key = cache_keys.hashkey(template.slug)  # те же аргументы, что и в get_template
+        with self._lock:
+            self._cache[key] = template
 
     def get_source(
         self, environment: jinja2.Environment, template: str
@@ -64,12 +89,20 @@ class DbLoader(jinja2.BaseLoader):
                 f'Template "{template}" not found in database'
             )
         content, name = templ_obj.content, templ_obj.slug
+        version = template_version(templ_obj)
 
         if not self.with_base_template.get():
             if name != BASE_TEMPLATE_NAME:
                 content = wrapping.unwrap_template(content)
 
-        return content, name, lambda: False
+        return content, name, lambda: self.get_version(template) == version
+
+    def get_version(self, slug: str) -> TemplateVersion | None:
+        """
+        Текущая версия шаблона (None, если шаблон не найден)
+        """
+        templ_obj = self.get_template(slug)
+        return templ_obj and template_version(templ_obj)
 
     def _enable_base_template(self):
         self.with_base_template.set(True)
@@ -77,26 +110,74 @@ class DbLoader(jinja2.BaseLoader):
     def _disable_base_template(self):
         self.with_base_template.set(False)
 
+    def evict(self, slug: str, version: TemplateVersion | None = None):
+        """
+        Удаление шаблона из кэша (например, после его изменения)
+
+        :param slug: slug шаблона.
+        :param version: актуальная версия шаблона: если в кэше уже эта версия, шаблон не удаляется.
+        """
+        key = cache_keys.hashkey(slug)
+        with self._lock:
+            templ = self._cache.get(key)
+            if templ is not None and (
+                version is None or template_version(templ) != version
+            ):
+                del self._cache[key]
+
     def clear_cache(self):
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+
+
+def bytecode_cache(directory: str | None) -> jinja2.BytecodeCache | None:
+    """
+    Кэш байткода скомпилированных шаблонов на диске.
+
+    Ключом служит хэш исходного кода шаблона, поэтому изменённые шаблоны перекомпилируются автоматически.
+    """
+    if not directory:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(directory)
 
 
 class TemplateEnvironment(jinja2.Environment, metaclass=SingletonMeta):
+    """
+    Окружение jinja для шаблонов из БД.
+
+    Скомпилированные шаблоны кэшируются по slug'у, версии шаблона и режиму обёртки в базовый шаблон:
+    обновлённый шаблон получает новую версию и компилируется заново, а устаревшие записи вытесняются из LRU кэша.
+    Встроенный кэш jinja не используется, т.к. не различает режимы обёртки одного и того же шаблона.
+    """
+
     loader: DbLoader
 
     def __init__(self):
         loader = DbLoader()
+        config = envs.templates
+
+        super().__init__(
+            cache_size=0,
+            loader=loader,
+            bytecode_cache=bytecode_cache(config.bytecode_cache_dir),
+        )
 
-        super().__init__(cache_size=0, loader=loader)
+        self._compiled = cachetools.LRUCache(maxsize=config.compiled_cache_size)
+        self._compiled_lock = threading.Lock()
 
     # noinspection PyMethodOverriding
     def get_template(
         self,
-        name: str | "Template",
+        name: str | jinja2.Template,
         parent: str | None = None,
         globals: Mapping[str, Any] | None = None,
         wrap_by_base_template: bool = True,
     ) -> jinja2.Template:
+        if isinstance(name, jinja2.Template):
+            return name
+
         if wrap_by_base_template:
             # noinspection PyProtectedMember
             self.loader._enable_base_template()
@@ -104,5 +185,43 @@ class TemplateEnvironment(jinja2.Environment, metaclass=SingletonMeta):
             # noinspection PyProtectedMember
             self.loader._disable_base_template()
 
+        version = self.loader.get_version(name)
+        if version is None or globals:
+            # при отсутствии шаблона в БД jinja выбросит TemplateNotFound,
+            # а шаблоны с дополнительными глобальными переменными не кэшируются
+            return super().get_template(name, parent, globals)
+
+        key = (name, version, wrap_by_base_template)
+        with self._compiled_lock:
+            template = self._compiled.get(key)
+        if template is not None:
+            return template
+
         template = super().get_template(name, parent, globals)
+        with self._compiled_lock:
+            self._compiled[key] = template
         return template
+
+    def get_title_template(self, template: Template) -> jinja2.Template:
+        """
+        Получение скомпилированного шаблона заголовка уведомления.
+
+        Заголовок компилируется один раз для каждой версии шаблона.
+
+        :param template: шаблон уведомления.
+        """
+        key = ("title", template_version(template), template.title)
+        with self._compiled_lock:
+            title_template = self._compiled.get(key)
+        if title_template is not None:
+            return title_template
+
+        title_template = self.from_string(template.title)
+        with self._compiled_lock:
+            self._compiled[key] = title_template
+        return title_template
+
+    def clear_cache(self):
+        with self._compiled_lock:
+            self._compiled.clear()
+        self.loader.clear_cache()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+import asyncpg
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import envs
+from internal.templates.environment import (
+    TemplateEnvironment,
+    TemplateVersion,
+    template_version,
+)
+from models import Template
+from utils.utils import SingletonMeta
+
+logger = logging.getLogger("templates-invalidation")
+
+# периодическая проверка соединения, чтобы не пропустить его "тихий" разрыв
+KEEPALIVE_INTERVAL = 60  # seconds
+
+
+def dump_event(slug: str, version: TemplateVersion | None) -> str:
+    if version is None:
+        return json.dumps({"slug": slug, "version": None})
+
+    template_id, updated_at = version
+    return json.dumps(
+        {
+            "slug": slug,
+            "version": [template_id, updated_at and updated_at.isoformat()],
+        }
+    )
+
+
+def load_event(payload: str) -> tuple[str, TemplateVersion | None]:
+    event = json.loads(payload)
+    if event["version"] is None:
+        return event["slug"], None
+
+    template_id, updated_at = event["version"]
+    return event["slug"], (
+        template_id,
+        updated_at and datetime.fromisoformat(updated_at),
+    )
+
+
+async def publish_template_changed(
+    session: AsyncSession, slug: str, template: Template | None = None
+):
+    """
+    Публикация события об изменении шаблона для всех процессов API и воркеров.
+
+    Событие отправляется через NOTIFY в транзакции сессии, поэтому доставляется только после её фиксации.
+
+    :param session: сессия SQLAlchemy.
+    :param slug: slug изменённого шаблона.
+    :param template: актуальное состояние шаблона (None, если шаблон удалён).
+    """
+    version = template and template_version(template)
+    await session.execute(
+        sa.select(
+            sa.func.pg_notify(
+                envs.templates.invalidation_channel, dump_event(slug, version)
+            )
+        )
+    )
+
+
+class TemplateInvalidationListener(metaclass=SingletonMeta):
+    """
+    Подписка процесса на события об изменении шаблонов (LISTEN).
+
+    При получении события из кэша процесса удаляется только изменённый шаблон (и только если в кэше его
+    устаревшая версия). События, пропущенные во время переподключения к БД, не восстановить,
+    поэтому после разрыва соединения кэш шаблонов очищается полностью.
+    """
+
+    def __init__(self):
+        self.channel = envs.templates.invalidation_channel
+        self.reconnect_delay = envs.templates.invalidation_reconnect_delay
+
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _listen_forever(self):
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                logger.warning(
+                    "Templates invalidation listener disconnected", exc_info=True
+                )
+
+            TemplateEnvironment().loader.clear_cache()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self):
+        connection: asyncpg.Connection = await asyncpg.connect(envs.database.dsn)
+        disconnected = asyncio.Event()
+        connection.add_termination_listener(lambda _: disconnected.set())
+
+        try:
+            await connection.add_listener(self.channel, self._on_event)
+            # события, произошедшие до подписки, могли быть пропущены
+            TemplateEnvironment().loader.clear_cache()
+            logger.debug("Listening for templates changes on %s", self.channel)
+
+            while not disconnected.is_set():
+                try:
+                    await asyncio.wait_for(disconnected.wait(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    await connection.execute("SELECT 1")
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    @staticmethod
+    def _on_event(connection: asyncpg.Connection, pid: int, channel: str, payload: str):
+        try:
+            slug, version = load_event(payload)
+        except (ValueError, KeyError, TypeError):
+            logger.error("Invalid templates invalidation event: %s", payload)
+            return
+
+        logger.debug("Template %s changed", slug)
+        TemplateEnvironment().loader.evict(slug, version)
@@ -7,10 +7,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.crud.base import BaseCrud
 from core.crud.exceptions import ObjectNotExists
+from core.crud.projection import ProjectionSerializer
 from models import Template
+from schemas.templates import TemplateBare
 
 template_crud = BaseCrud(entity=Template)
 
+template_serializer = ProjectionSerializer(TemplateBare, Template)
+
 
 async def get_template(session: AsyncSession, template_slug: str) -> Template:
     query = select(Template).where(Template.slug == template_slug)
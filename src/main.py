@@ -3,9 +3,13 @@ from starlette.middleware.cors import CORSMiddleware
 
 from core.config import envs
 from core.log_config import set_logging
+from internal.auth.verification import TokenVerifier
+from internal.templates.invalidation import TemplateInvalidationListener
 from routes.exceptions import apply_exception_handlers
 from routes.v1.notifications import notifications
+from routes.v1.service import service
 from routes.v1.templates import templates
+from utils.http_client import HttpClient
 
 app = fastapi.FastAPI(
     title="Notification Service",
@@ -33,5 +37,34 @@ if not envs.app.cors_policy_enabled:
         allow_credentials=True,
     )
 
+
+@app.on_event("startup")
+async def check_token_verification():
+    # ошибки настройки проверки токенов (например, local режим без ключей) обнаруживаются при запуске,
+    # а не при первом запросе
+    TokenVerifier()
+
+
+@app.on_event("startup")
+async def start_templates_invalidation():
+    await TemplateInvalidationListener().start()
+
+
+@app.on_event("shutdown")
+async def stop_templates_invalidation():
+    await TemplateInvalidationListener().stop()
+
+
+@app.on_event("startup")
+async def start_http_client():
+    await HttpClient().start()
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await HttpClient().close()
+
+
 app.include_router(templates, prefix="/v1/templates", tags=["Templates"])
 app.include_router(notifications, prefix="/v1/notifications", tags=["Notifications"])
+app.include_router(service, prefix="/v1/service", tags=["Service"])
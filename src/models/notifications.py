@@ -91,6 +91,9 @@ class Notification(Base):
         nullable=True,
         comment="Правила повторения для регулярных оповещений",
     )
+    send_at = Column(
+        DateTime, nullable=True, comment="Дата отложенной отправки уведомления"
+    )
 
     created_at = Column(DateTime, default=fresh_timestamp())
     created_by = Column(UUID(as_uuid=True), nullable=True)
@@ -113,13 +116,15 @@ BackendEnum = sqlalchemy.Enum(Backend, schema=DB_SCHEMA)
 class NotificationMessage(Base):
     __repr_name__ = "Сообщение"
     __tablename__ = "notification_messages"
+    # таблица секционирована по месяцам created_at (см. internal.notifications.partitions)
     __table_args__ = (
         Index("ix_user_id_backends", "user_id", "backend"),
-        {"schema": DB_SCHEMA},
+        {"schema": DB_SCHEMA, "postgresql_partition_by": "RANGE (created_at)"},
     )
 
     id = Column(UUID, primary_key=True, server_default=text("uuid_generate_v4()"))
-    user_id = Column(Integer, nullable=False)  # осознанная денормализация
+    # осознанная денормализация (отсутствует у уведомлений с явно указанными контактами)
+    user_id = Column(Integer, nullable=True)
     send_to = Column(Text, nullable=False)
     notification_id = Column(
         UUID,
@@ -133,7 +138,13 @@ class NotificationMessage(Base):
 
     sent_at = Column(DateTime)
     read_at = Column(DateTime, comment="Дата прочтения уведомления")
-    created_at = Column(DateTime, default=fresh_timestamp())
+    # ключ секционирования должен входить в первичный ключ
+    created_at = Column(
+        DateTime,
+        primary_key=True,
+        default=fresh_timestamp(),
+        server_default=fresh_timestamp(),
+    )
 
 
 class NotificationRecurrenceFrequency(enum.Enum):
@@ -199,3 +210,65 @@ class NotificationRecurrence(Base):
         nullable=True,
         comment="Даты, которые нужно исключить из основного правила",
     )
+
+
+class RecurrenceSchedule(Base):
+    __repr_name__ = "Расписание повторения оповещения"
+    __tablename__ = "recurrence_schedule"
+    __table_args__ = {
+        "schema": DB_SCHEMA,
+        "comment": "ближайшие срабатывания правил повторения (см. internal.notifications.scheduler)",
+    }
+
+    recurrence_id: int = Column(
+        Integer,
+        ForeignKey(with_schema("recurrences.id"), ondelete="CASCADE"),
+        primary_key=True,
+    )
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey(with_schema("notifications.id"), ondelete="CASCADE"),
+        nullable=False,
+    )
+    # запись удаляется после последнего срабатывания правила
+    next_fire_at: datetime = Column(
+        DateTime, nullable=False, index=True, comment="Дата ближайшего срабатывания"
+    )
+    # курсор правила повторения (см. internal.notifications.recurrences.CompiledRule)
+    cursor_at: datetime = Column(
+        DateTime, nullable=True, comment="Последнее пройденное срабатывание правила"
+    )
+    cursor_index: int = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        comment="Номер последнего пройденного срабатывания правила",
+    )
+    leased_by: str = Column(
+        String(128),
+        nullable=True,
+        comment="Экземпляр планировщика, арендовавший запись",
+    )
+    leased_until: datetime = Column(
+        DateTime, nullable=True, comment="Дата окончания аренды"
+    )
+
+
+class ScheduledSend(Base):
+    __repr_name__ = "Отложенная отправка оповещения"
+    __tablename__ = "scheduled_sends"
+    __table_args__ = {
+        "schema": DB_SCHEMA,
+        "comment": "отправки, отложенные дальше, чем на время хранения в брокере "
+        "(см. internal.notifications.deferred)",
+    }
+
+    notification_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey(with_schema("notifications.id"), ondelete="CASCADE"),
+        primary_key=True,
+    )
+    send_at: datetime = Column(
+        DateTime, nullable=False, index=True, comment="Дата отправки"
+    )
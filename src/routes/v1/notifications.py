@@ -1,14 +1,16 @@
 from http import HTTPStatus
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.crud.exceptions import ObjectNotExists
 from dependencies.auth import user_info_dep
+from internal.notifications.deferred import defer_notifications
 from internal.notifications.notifications import (
+    bulk_create_notifications,
     notification_crud,
-    notification_recurrence_crud,
+    notification_serializer,
 )
 from internal.templates.templates import (
     base_template_installed,
@@ -16,8 +18,13 @@ from internal.templates.templates import (
     get_template,
 )
 from schemas.auth import UserInfo
-from schemas.notifications import NotificationBare, NotificationCreate
-from tasks.notifications import send_notification
+from schemas.notifications import (
+    NotificationBare,
+    NotificationBatchCreated,
+    NotificationCreate,
+    NotificationCreateBatch,
+)
+from tasks.notifications import batch_notifications, send_notifications
 from utils.db_session import get_db_session
 
 notifications = APIRouter()
@@ -33,8 +40,10 @@ async def get_notification(
     notification_id: str = Path(..., example=str(uuid4()), max_length=36),
     session: AsyncSession = Depends(get_db_session),
 ) -> NotificationBare:
-    notification = await notification_crud.get(session, notification_id)
-    return await NotificationBare.from_orm_async(notification, session)
+    notification = await notification_crud.get_serialized(
+        session, notification_id, notification_serializer
+    )
+    return NotificationBare.parse_obj(notification)
 
 
 @notifications.post(
@@ -61,20 +70,86 @@ async def create_notification(
             detail=f'Тип уведомлений "{notification_slug}" не найден.',
         )
 
-    notification = await notification_crud.create(
-        session=session, data=data, template_id=template.id, exclude={"recurrence"}
+    # правило повторения, уведомление и его расписание создаются так же, как при массовом создании
+    [notification_id] = await bulk_create_notifications(
+        session, [data], template_id=template.id, created_by=author.id
+    )
+
+    # регулярные уведомления отправляются планировщиком
+    deliveries = await defer_notifications(
+        session, [] if data.recurrence else [(notification_id, data.send_at)]
     )
 
-    if data.recurrence:
-        await notification_recurrence_crud.create(
-            session=session, data=data.recurrence, notification_id=notification.id
+    # без commit'a мы не можем гарантировать, что уведомление будет доступно в базе данных
+    # в момент выполнения задачи
+    await session.commit()
+    await send_notifications.send_many_async(
+        *batch_notifications(
+            [i for i, _ in deliveries], [delay for _, delay in deliveries]
         )
-    else:
-        # без commit'a мы не можем гарантировать, что уведомление будет доступно в базе данных
-        # в момент выполнения задачи
-        await session.commit()
-        await send_notification.send_async()
+    )
+
+    packed = await notification_crud.get_serialized(
+        session, notification_id, notification_serializer
+    )
+
+    return NotificationBare.parse_obj(packed)
 
-    packed = await NotificationBare.from_orm_async(notification, session)
 
-    return packed
+@notifications.post(
+    "/batch",
+    description="Создание пачки уведомлений по одному шаблону. "
+    "Уведомления сохраняются многострочными запросами, а задачи на отправку публикуются в брокер одной пачкой",
+    summary="Массовое создание уведомлений",
+    response_model=NotificationBatchCreated,
+    status_code=HTTPStatus.CREATED,
+)
+async def create_notifications_batch(
+    data: NotificationCreateBatch,
+    notification_slug: str = Query(
+        ..., alias="notificationSlug", example="send-invite"
+    ),
+    session: AsyncSession = Depends(get_db_session),
+    author: UserInfo = user_info_dep,
+) -> NotificationBatchCreated:
+    try:
+        async with base_template_installed(session):
+            template = await get_template(session, notification_slug)
+    except ObjectNotExists:
+        raise HTTPException(
+            HTTPStatus.NOT_FOUND,
+            detail=f'Тип уведомлений "{notification_slug}" не найден.',
+        )
+
+    for number, notification in enumerate(data.data, start=1):
+        if notification.user_id:
+            try:
+                ensure_all_variables_specified(template, notification.template_data)
+            except HTTPException as e:
+                raise HTTPException(
+                    e.status_code, detail=f"Уведомление №{number}: {e.detail}"
+                )
+
+    ids = await bulk_create_notifications(
+        session, data.data, template_id=template.id, created_by=author.id
+    )
+
+    deliveries = await defer_notifications(
+        session,
+        [
+            (notification_id, notification.send_at)
+            for notification_id, notification in zip(ids, data.data)
+            if not notification.recurrence
+        ],
+    )
+
+    # без commit'a мы не можем гарантировать, что уведомления будут доступны в базе данных
+    # в момент выполнения задач
+    await session.commit()
+    await send_notifications.send_many_async(
+        *batch_notifications(
+            [i for i, _ in deliveries], [delay for _, delay in deliveries]
+        )
+    )
+
+    return NotificationBatchCreated(data=[str(i) for i in ids], total=len(ids))
@@ -0,0 +1,26 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from fastapi.routing import APIRouter
+
+from dependencies.auth import user_info_dep
+from schemas.auth import UserInfo
+from schemas.service import DBPoolStats
+from utils.db_pool import pool_stats
+from utils.db_session import db_engine
+
+service = APIRouter()
+
+
+@service.get(
+    "/db-pool",
+    description="Статистика пула соединений с БД текущего процесса API",
+    summary="Статистика пула соединений",
+    response_model=DBPoolStats,
+)
+async def get_db_pool_stats(author: UserInfo = user_info_dep) -> DBPoolStats:
+    stats = pool_stats(db_engine.pool)
+    if stats is None:
+        raise HTTPException(HTTPStatus.NOT_FOUND, detail="Пул соединений с БД отключен")
+
+    return stats
@@ -7,12 +7,15 @@ from fastapi.routing import APIRouter
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import HTMLResponse
 
+from core.crud.counting import CountStrategy
 from dependencies.auth import user_info_dep
-from internal.templates.environment import DbLoader, TemplateEnvironment
+from internal.templates.environment import TemplateEnvironment
+from internal.templates.invalidation import publish_template_changed
 from internal.templates.templates import (
     base_template_installed,
     get_base_template,
     template_crud,
+    template_serializer,
 )
 from internal.templates.variables import search_variables_async
 from models import Template, fresh_timestamp
@@ -32,12 +35,37 @@ templates = APIRouter()
 async def get_templates(
     page: int = Query(1),
     rows_per_page: int = Query(None, alias="rowsPerPage", le=101),
+    cursor: str = Query(
+        None, description="Курсор страницы (из ответа на предыдущий запрос)"
+    ),
+    use_cursor: bool = Query(
+        False, alias="useCursor", description="Использовать пагинацию по курсору"
+    ),
+    count_strategy: CountStrategy = Query(
+        None,
+        alias="countStrategy",
+        description="Способ подсчёта общего количества: точно, оценка или с кэшированием",
+    ),
     session: AsyncSession = Depends(get_db_session),
     author: UserInfo = user_info_dep,
 ) -> TemplateList:
-    results, count = await template_crud.get_multi(session, page, rows_per_page)
+    results, count, page_cursor = await template_crud.get_multi(
+        session,
+        page,
+        rows_per_page,
+        cursor=cursor,
+        use_cursor=use_cursor,
+        count_strategy=count_strategy,
+        serializer=template_serializer,
+    )
 
-    return TemplateList(data=results, rows_per_page=rows_per_page, page=page)
+    return TemplateList(
+        data=results,
+        rows_per_page=rows_per_page,
+        page=None if page_cursor else page,
+        total=count,
+        cursor=page_cursor,
+    )
 
 
 @templates.get(
@@ -51,9 +79,11 @@ async def get_template(
     session: AsyncSession = Depends(get_db_session),
     author: UserInfo = user_info_dep,
 ) -> TemplateBare:
-    result = await template_crud.get(session, template_id)
+    result = await template_crud.get_serialized(
+        session, template_id, template_serializer
+    )
 
-    return TemplateBare.from_orm(result)
+    return TemplateBare.parse_obj(result)
 
 
 @templates.post(
@@ -84,7 +114,7 @@ async def create_template(
         variables=list(await search_variables_async(data.content)),
     )
 
-    DbLoader().clear_cache()
+    await publish_template_changed(session, result.slug, result)
 
     return TemplateBare.from_orm(result)
 
@@ -102,6 +132,7 @@ async def update_template(
     session: AsyncSession = Depends(get_db_session),
 ) -> TemplateBare:
     db_object = await template_crud.get(session, template_id)
+    previous_slug = db_object.slug
     result = await template_crud.update(
         session,
         db_object,
@@ -112,7 +143,10 @@ async def update_template(
         exclude={"is_base"},
     )
 
-    DbLoader().clear_cache()
+    # скомпилированные шаблоны привязаны к версии шаблона, поэтому достаточно обновить сам шаблон
+    if previous_slug != result.slug:
+        await publish_template_changed(session, previous_slug)
+    await publish_template_changed(session, result.slug, result)
 
     return TemplateBare.from_orm(result)
 
@@ -140,7 +174,7 @@ async def delete_template(
         await session.delete(result)
         await session.flush()
 
-        DbLoader().clear_cache()
+        await publish_template_changed(session, result.slug)
     except Exception:
         raise HTTPException(
             HTTPStatus.BAD_REQUEST,
@@ -0,0 +1,19 @@
+import signal
+
+from internal.notifications.scheduler import RecurrenceScheduler
+from tasks.notifications import batch_notifications, send_notifications
+
+
+def enqueue_notifications(
+    notification_ids: list[str], delays: list[int | None] | None = None
+):
+    send_notifications.send_many(*batch_notifications(notification_ids, delays))
+
+
+if __name__ == "__main__":
+    scheduler = RecurrenceScheduler(enqueue_notifications)
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *args: scheduler.stop())
+
+    scheduler.run()
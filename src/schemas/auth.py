@@ -1,5 +1,7 @@
 from uuid import UUID
 
+from pydantic import Field
+
 from schemas.base import Model
 
 
@@ -11,3 +13,23 @@ class UserInfo(Model):
     id: UUID
     role_id: UUID | None
     role_name: str | None
+
+
+class UserContacts(Model):
+    """
+    Контактные данные пользователя для отправки уведомлений
+    """
+
+    id: int
+    email: str | None
+
+
+class AudiencePage(Model):
+    """
+    Часть аудитории широковещательной рассылки
+    """
+
+    data: list[UserContacts]
+    next_cursor: str | None = Field(
+        None, description="Курсор следующей части аудитории (отсутствует для последней)"
+    )
@@ -38,13 +38,25 @@ class UidMixin(Model):
     id: str = pydantic.Field(..., example=str(uuid.uuid4()))
 
 
+class Cursor(Model):
+    next: str | None = pydantic.Field(
+        None, description="cursor of the next page (absent for the last page)"
+    )
+    prev: str | None = pydantic.Field(
+        None, description="cursor of the previous page (absent for the first page)"
+    )
+
+
 class ListModel(Model):
     data: list[IdMixin]
-    page: int
+    page: int | None
     per_page: int | None
     total: int = pydantic.Field(
         None, description="total count of objects with specified filters/params"
     )
+    cursor: Cursor | None = pydantic.Field(
+        None, description="cursors of the neighbouring pages (for cursor pagination)"
+    )
 
 
 class StatusResponse(Model):
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any
 
 from pydantic import Field, root_validator, validator
@@ -123,6 +123,24 @@ class NotificationCreate(Model):
     recurrence: NotificationRecurrenceCreate | None = Field(
         None, description="Правила повторения уведомления для регулярных уведомлений"
     )
+    send_at: datetime | None = Field(
+        None,
+        description="Дата отложенной отправки уведомления (без повторения). "
+        "Если не указана или уже наступила, уведомление отправляется сразу",
+    )
+
+    @validator("send_at")
+    def convert_send_at(cls, value, values):
+        if value and values.get("recurrence"):
+            raise ValueError(
+                "Дата отложенной отправки не указывается для регулярных уведомлений "
+                "(используйте дату начала повторения)"
+            )
+
+        if value is not None and value.tzinfo is not None:
+            # даты хранятся в UTC без часового пояса
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
 
     @validator("user_id")
     def check_contacts_on_user_id(cls, value, values):
@@ -138,8 +156,23 @@ class NotificationCreate(Model):
         use_enum_values = True
 
 
+NOTIFICATIONS_BATCH_MAX_SIZE = 10_000
+
+
 class NotificationCreateBatch(Model):
-    data: list[NotificationCreate]
+    data: list[NotificationCreate] = Field(
+        ...,
+        min_items=1,
+        max_items=NOTIFICATIONS_BATCH_MAX_SIZE,
+        description="Перечень уведомлений, создаваемых по одному шаблону",
+    )
+
+
+class NotificationBatchCreated(Model):
+    data: list[str] = Field(
+        ..., description="Идентификаторы созданных уведомлений (в порядке передачи)"
+    )
+    total: int = Field(..., description="Количество созданных уведомлений")
 
 
 class NotificationBare(NotificationCreate, UidMixin):
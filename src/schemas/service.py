@@ -0,0 +1,21 @@
+from pydantic import Field
+
+from schemas.base import Model
+
+
+class DBPoolStats(Model):
+    """
+    Статистика пула соединений с БД
+    """
+
+    size: int = Field(..., description="Размер пула")
+    checked_out: int = Field(..., description="Количество выданных соединений")
+    overflow: int = Field(..., description="Количество соединений сверх размера пула")
+    waiting: int = Field(..., description="Количество ожидающих получения соединения")
+    connects: int = Field(..., description="Количество установленных соединений")
+    connect_time_avg: float = Field(
+        ..., description="Среднее время установки соединения (в секундах)"
+    )
+    connect_time_max: float = Field(
+        ..., description="Максимальное время установки соединения (в секундах)"
+    )
@@ -1,5 +1,6 @@
 import functools
 import logging
+from typing import Any, Iterable
 
 import aiomisc
 import dramatiq as dramatiq_lib
@@ -8,6 +9,13 @@ from dramatiq.brokers.rabbitmq import RabbitmqBroker
 
 from core.config import envs
 from core.log_config import set_logging
+from tasks.middlewares import (
+    EmailSenderMiddleware,
+    HttpClientMiddleware,
+    MessagePartitionsMiddleware,
+    TemplateInvalidationMiddleware,
+    WorkerEventLoopMiddleware,
+)
 
 # RabbitmqConfig.ensure_configured()
 rabbitmq_broker = RabbitmqBroker(
@@ -17,11 +25,18 @@ rabbitmq_broker = RabbitmqBroker(
         username=envs.rabbitmq.user, password=envs.rabbitmq.password
     ),
 )
+# отправитель, подписка на изменения шаблонов и HTTP клиент используют event loop воркера,
+# поэтому завершаются до его остановки
+rabbitmq_broker.add_middleware(EmailSenderMiddleware())
+rabbitmq_broker.add_middleware(TemplateInvalidationMiddleware())
+rabbitmq_broker.add_middleware(HttpClientMiddleware())
+rabbitmq_broker.add_middleware(WorkerEventLoopMiddleware())
+rabbitmq_broker.add_middleware(MessagePartitionsMiddleware())
 dramatiq_lib.set_broker(rabbitmq_broker)
 
 set_logging(
     level=envs.logging.level,
-    sentry_url=envs.loggin.sentry_url,
+    sentry_url=envs.logging.sentry_url,
     environment=envs.app.environment,
 )
 
@@ -55,6 +70,42 @@ class AsyncActor(dramatiq_lib.Actor):
     def send_async(self, *args, **kwargs):
         return super().send(*args, **kwargs)
 
+    @aiomisc.threaded
+    def send_many_async(
+        self,
+        messages_args: Iterable[tuple[Any, ...]],
+        delays: Iterable[int | None] | None = None,
+    ) -> list[dramatiq_lib.Message]:
+        """
+        Публикация пачки сообщений в брокер за один переход в поток.
+
+        Все сообщения отправляются через один и тот же канал брокера, поэтому на каждое сообщение
+        не тратится отдельный переход в поток и открытие канала.
+
+        :param messages_args: позиционные аргументы для каждого из сообщений.
+        :param delays: задержки выполнения для каждого из сообщений (в миллисекундах, None - без задержки).
+        :return: список опубликованных сообщений.
+        """
+        return self.send_many(messages_args, delays)
+
+    def send_many(
+        self,
+        messages_args: Iterable[tuple[Any, ...]],
+        delays: Iterable[int | None] | None = None,
+    ) -> list[dramatiq_lib.Message]:
+        """
+        Публикация пачки сообщений в брокер из синхронного кода (см. ``send_many_async``)
+        """
+        messages_args = list(messages_args)
+        delays = [None] * len(messages_args) if delays is None else list(delays)
+
+        messages = []
+        for args, delay in zip(messages_args, delays):
+            message = self.message_with_options(args=args)
+            messages.append(self.broker.enqueue(message, delay=delay))
+
+        return messages
+
 
 dramatiq_lib.actor = functools.partial(
     dramatiq_lib.actor,
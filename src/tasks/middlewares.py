@@ -0,0 +1,86 @@
+import logging
+import threading
+
+import dramatiq
+
+from core.config import envs
+from internal.notifications.handlers import EmailNotificationHandler
+from internal.notifications.partitions import maintain_message_partitions
+from internal.templates.invalidation import TemplateInvalidationListener
+from utils.event_loop import WorkerEventLoop, run_async
+from utils.http_client import HttpClient
+
+logger = logging.getLogger("worker-middlewares")
+
+
+class EmailSenderMiddleware(dramatiq.Middleware):
+    """
+    Закрытие SMTP соединений процесса при завершении работы воркера
+    """
+
+    def after_worker_shutdown(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        logger.debug("Closing SMTP connections")
+        EmailNotificationHandler.close_email_sender()
+
+
+class TemplateInvalidationMiddleware(dramatiq.Middleware):
+    """
+    Подписка воркера на события об изменении шаблонов на время его работы
+    """
+
+    def after_worker_boot(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        run_async(TemplateInvalidationListener().start())
+
+    def after_worker_shutdown(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        logger.debug("Stopping templates invalidation listener")
+        run_async(TemplateInvalidationListener().stop())
+
+
+class HttpClientMiddleware(dramatiq.Middleware):
+    """
+    Общий HTTP клиент воркера (в event loop'е воркера) на время его работы
+    """
+
+    def after_worker_boot(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        run_async(HttpClient().start())
+
+    def after_worker_shutdown(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        logger.debug("Closing HTTP client")
+        run_async(HttpClient().close())
+
+
+class MessagePartitionsMiddleware(dramatiq.Middleware):
+    """
+    Периодическое обслуживание секций таблицы сообщений (создание будущих и удаление устаревших секций)
+    """
+
+    def __init__(self):
+        self._stopped = threading.Event()
+
+    def after_worker_boot(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        threading.Thread(
+            target=self._run, name="messages-partitions", daemon=True
+        ).start()
+
+    def after_worker_shutdown(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        self._stopped.set()
+
+    def _run(self):
+        interval = envs.notifications.messages_partitions_check_interval
+        while not self._stopped.is_set():
+            try:
+                maintain_message_partitions()
+            except Exception:
+                logger.error("Failed to maintain messages partitions", exc_info=True)
+
+            self._stopped.wait(interval)
+
+
+class WorkerEventLoopMiddleware(dramatiq.Middleware):
+    """
+    Остановка event loop'а воркера при завершении его работы
+    """
+
+    def after_worker_shutdown(self, broker: dramatiq.Broker, worker: dramatiq.Worker):
+        logger.debug("Stopping worker event loop")
+        WorkerEventLoop().stop()
@@ -1,48 +1,232 @@
-from aiohttp import ClientSession
-from sqlalchemy.orm import joinedload
+import logging
 
 from core.config import envs
-from internal.notifications.handlers import EmailNotificationHandler
-from models import Backend, Notification
-from utils.db_session import db_session_manager
+from internal.notifications.audience import (
+    broadcast_backends,
+    fetch_audience_page,
+    is_broadcast,
+    user_contact,
+)
+from internal.notifications.enrichment import UserContactsBatcher
+from internal.notifications.handlers import (
+    Delivery,
+    EmailNotificationHandler,
+    NotificationHandlerAbstract,
+)
+from internal.notifications.notifications import load_notifications
+from models import Backend
+from schemas.auth import UserContacts
+from utils.db_session import sync_db_session_manager
+from utils.event_loop import run_async
+from utils.utils import chunked
 
 # dramatiq нужно корректно инициализировать, поэтому мы достаём пропатченный вариант из своего файла
-from .core import dramatiq
+from .core import AsyncActor, dramatiq
+
+logger = logging.getLogger("notifications-tasks")
+
+chunk_handlers: dict[str, type[NotificationHandlerAbstract]] = {
+    Backend.email.value: EmailNotificationHandler
+}
+
+
+def batch_notifications(
+    notification_ids: list[str], delays: list[int | None] | None = None
+) -> tuple[list[tuple[list[str]]], list[int | None]]:
+    """
+    Объединение отправок уведомлений с одинаковой задержкой в пачки для ``send_notifications``.
+
+    :param notification_ids: идентификаторы уведомлений.
+    :param delays: задержки отправок (в миллисекундах, None - без задержки).
+    :return: аргументы сообщений и их задержки (для ``send_many``/``send_many_async``).
+    """
+    delays = [None] * len(notification_ids) if delays is None else delays
+
+    grouped: dict[int | None, list[str]] = {}
+    for notification_id, delay in zip(notification_ids, delays):
+        grouped.setdefault(delay, []).append(notification_id)
+
+    messages_args, batch_delays = [], []
+    for delay, ids in grouped.items():
+        for chunk in chunked(ids, envs.notifications.send_batch_size):
+            messages_args.append((chunk,))
+            batch_delays.append(delay)
+
+    return messages_args, batch_delays
 
 
 @dramatiq.actor
-def send_notification(notification_id: str):
-    backend_handlers = {Backend.email.value: send_email, Backend.sms.value: send_sms}
+def send_notifications(notification_ids: list[str]):
+    """
+    Отправка пачки уведомлений.
+
+    Уведомления загружаются одним запросом, а недостающие контакты пользователей запрашиваются
+    одним batch запросом к сервису авторизации. Письма публикуются пачками ``send_emails``,
+    поэтому однопоточный воркер отправляет их через асинхронный движок конкурентно.
+    """
+    backend_handlers = {Backend.sms.value: send_sms}
+
+    with sync_db_session_manager() as session:
+        notifications = load_notifications(session, notification_ids)
+
+    for notification_id in set(notification_ids) - notifications.keys():
+        logger.warning(f"Notification {notification_id} not found")
+
+    # пользователи, контакты которых указаны не для всех backend'ов
+    incomplete = {
+        notification.user_id
+        for notification in notifications.values()
+        if not all((notification.contacts or {}).values())
+    }
+    users = enrich_contacts(incomplete - {None})
+
+    emails = []
+    for notification_id, notification in notifications.items():
+        if is_broadcast(notification):
+            expand_broadcast.send(notification_id, broadcast_backends(notification))
+            continue
 
-    with db_session_manager() as session:
-        notification: Notification = session.get(
-            Notification, notification_id, options=[joinedload(Notification.template)]
-        )
         for backend, send_to in notification.contacts.items():
+            if not send_to and (user := users.get(notification.user_id)):
+                send_to = user_contact(user, backend)
             if not send_to:
-                send_to = enrichment_notification.send([notification.user_id])
+                logger.warning(
+                    f'User {notification.user_id} has no contact for backend "{backend}"'
+                )
+                continue
 
-            handler = backend_handlers.get(backend)
+            if backend == Backend.email.value:
+                emails.append((notification_id, send_to))
+            else:
+                backend_handlers[backend].send(
+                    notification_id=notification_id, send_to=send_to
+                )
 
-            handler.send(notification_id=notification_id, send_to=send_to)
+    send_emails.send_many(
+        [(chunk,) for chunk in chunked(emails, envs.notifications.send_batch_size)]
+    )
 
 
 @dramatiq.actor
-def send_email(notification_id: str, send_to: str):
-    with db_session_manager() as session:
-        email_handler = EmailNotificationHandler(notification_id, send_to)
-        email_handler(session)
+def send_notification(notification_id: str):
+    """
+    Отправка одного уведомления (для задач, опубликованных до появления ``send_notifications``)
+    """
+    send_notifications([notification_id])
+
+
+def enrich_contacts(user_ids: set[int]) -> dict[int, UserContacts | None]:
+    """
+    Получение контактов пользователей для backend'ов.
+
+    Запросы из параллельно выполняемых задач объединяются в один batch запрос к сервису авторизации.
+    """
+    if not user_ids:
+        return {}
+    return run_async(UserContactsBatcher().get_many(user_ids))
+
+
+@dramatiq.actor
+def expand_broadcast(notification_id: str, backends: list[str], cursor: str = None):
+    """
+    Постраничное развёртывание аудитории широковещательного уведомления.
+
+    За одно выполнение обрабатывается только одна часть аудитории: для неё публикуются задачи на отправку,
+    а для оставшейся аудитории публикуется продолжение с курсором следующей части. Таким образом,
+    ни API, ни воркеры не держат в памяти всю аудиторию рассылки.
+    """
+    page = run_async(
+        fetch_audience_page(cursor, limit=envs.notifications.broadcast_chunk_size)
+    )
+
+    for backend in backends:
+        recipients = {
+            contact: user.id
+            for user in page.data
+            if (contact := user_contact(user, backend))
+        }
+        if recipients:
+            send_notification_chunk.send(notification_id, backend, recipients)
+
+    if page.next_cursor:
+        expand_broadcast.send(notification_id, backends, page.next_cursor)
 
 
 @dramatiq.actor
-def enrichment_notification(user_ids: list[str]):
-    async with ClientSession() as session:
-        url = f"{envs.external.auth}/user-info-batch/"
-        async with session.post(url=url, data={"ids": user_ids}) as response:
-            data = await response.json()
-            result = [i.email for i in data]
-
-            return result
+def send_notification_chunk(
+    notification_id: str, backend: str, recipients: dict[str, int], attempt: int = 1
+):
+    """
+    Отправка уведомления части аудитории в одном backend'е.
+
+    Содержимое уведомления одинаково для всех получателей, поэтому оно рендерится один раз,
+    а отправка выполняется группами получателей (для почты – одна SMTP транзакция на группу).
+    Повторно отправляется только тем получателям, которым не удалось доставить уведомление.
+
+    :param recipients: контакты получателей с идентификаторами соответствующих пользователей.
+    """
+    handler_class = chunk_handlers.get(backend)
+    if handler_class is None:
+        logger.warning(f'Backend "{backend}" is not supported for broadcasting')
+        return
+
+    with sync_db_session_manager() as session:
+        failed = handler_class(notification_id).send_to_group(session, recipients)
+
+    if not failed:
+        return
+
+    if attempt >= AsyncActor.MAX_RETRIES:
+        logger.error(
+            f"Notification {notification_id} was not delivered to {len(failed)} recipients"
+        )
+        return
+
+    send_notification_chunk.send_with_options(
+        args=(
+            notification_id,
+            backend,
+            {contact: recipients[contact] for contact in failed},
+            attempt + 1,
+        ),
+        delay=AsyncActor.MIN_BACKOFF * attempt,
+    )
+
+
+@dramatiq.actor
+def send_emails(deliveries: list[Delivery], attempt: int = 1):
+    """
+    Отправка пачки писем одним вызовом отправителя (при ``SMTP_ENGINE=asyncio`` - конкурентно).
+
+    Сообщения отправленных писем сохраняются в транзакции задачи, а повторно отправляются только письма,
+    которые не удалось отправить.
+
+    :param deliveries: идентификаторы уведомлений с адресами получателей.
+    """
+    with sync_db_session_manager() as session:
+        failed = EmailNotificationHandler.send_batch(
+            session,
+            [(notification_id, send_to) for notification_id, send_to in deliveries],
+        )
+
+    if not failed:
+        return
+
+    if attempt >= AsyncActor.MAX_RETRIES:
+        logger.error(f"{len(failed)} emails were not delivered")
+        return
+
+    send_emails.send_with_options(
+        args=(failed, attempt + 1), delay=AsyncActor.MIN_BACKOFF * attempt
+    )
+
+
+@dramatiq.actor
+def send_email(notification_id: str, send_to: str):
+    """
+    Отправка одного письма (для задач, опубликованных до появления ``send_emails``)
+    """
+    send_emails([(notification_id, send_to)])
 
 
 @dramatiq.actor
@@ -0,0 +1,412 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import ssl
+import time
+from typing import AsyncIterator, Awaitable, Callable
+
+import aiosmtplib
+
+from tools.email_sender import (
+    UNDISCLOSED_RECIPIENTS,
+    ContentType,
+    MessageContent,
+    OutgoingMessage,
+    SendResult,
+    build_message,
+    serialize_message,
+)
+from utils.utils import chunked
+
+logger = logging.getLogger("async-email-sender")
+
+
+async def smtp_connect(
+    host: str,
+    port: int,
+    login: str | None,
+    password: str | None,
+    use_ssl=False,
+    starttls=False,
+) -> aiosmtplib.SMTP:
+    """
+    Асинхронное подключение к smtp серверу (см. ``tools.email_sender.smtp_connect``)
+
+    :param use_ssl: подключение по SSL/TLS
+    :param starttls: перевод открытого соединения на TLS командой STARTTLS (до авторизации)
+    :return: подключенный (и авторизованный) клиент aiosmtplib
+    """
+    connection = aiosmtplib.SMTP(
+        hostname=host,
+        port=int(port),
+        use_tls=use_ssl,
+        # без явного отключения aiosmtplib переходит на TLS, если сервер поддерживает STARTTLS
+        start_tls=starttls and not use_ssl,
+        tls_context=ssl.create_default_context(),
+        timeout=30,
+    )
+    await connection.connect()
+    try:
+        if login and password:
+            await connection.login(login, password)
+        else:
+            logger.debug("No password passed. Skipping authorization on smtp server")
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+
+# ошибки, после которых соединение не может быть переиспользовано
+# (разрывы соединения и таймауты aiosmtplib наследуются от OSError)
+BROKEN_CONNECTION_ERRORS = (aiosmtplib.SMTPSenderRefused, OSError)
+
+
+class AsyncSMTPConnectionPool:
+    """
+    Пул авторизованных асинхронных соединений (клиентов aiosmtplib) с SMTP сервером.
+
+    Поведение повторяет ``SMTPConnectionPool``: LIFO выдача соединений, закрытие простаивающих соединений
+    и проверка командой NOOP перед выдачей соединения, простаивавшего дольше ``check_after`` секунд.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        login: str | None = None,
+        password: str | None = None,
+        use_ssl: bool = False,
+        size: int = 8,
+        idle_timeout: float = 60,
+        check_after: float = 5,
+        starttls: bool = False,
+    ):
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+
+        self._idle: collections.deque[
+            tuple[aiosmtplib.SMTP, float]
+        ] = collections.deque()
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # создаётся лениво, чтобы пул можно было создать вне event loop'а
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        return self._semaphore
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        """
+        Получение соединения из пула.
+
+        При ошибках соединения (разрыв, отказ сервера) соединение закрывается, а не возвращается в пул.
+        """
+        async with self.semaphore:
+            connection = await self._acquire()
+            try:
+                yield connection
+            except BROKEN_CONNECTION_ERRORS:
+                await self._close_connection(connection)
+                raise
+            except BaseException:
+                self._idle.append((connection, time.monotonic()))
+                raise
+            else:
+                self._idle.append((connection, time.monotonic()))
+
+            await self.reap_idle()
+
+    async def reap_idle(self):
+        """
+        Закрытие соединений, простаивающих дольше ``idle_timeout``
+        """
+        border = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < border:
+            connection, _ = self._idle.popleft()
+            await self._close_connection(connection)
+
+    async def close(self):
+        """
+        Закрытие всех свободных соединений пула
+        """
+        idle, self._idle = self._idle, collections.deque()
+        for connection, _ in idle:
+            await self._close_connection(connection)
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            connection, last_used = self._idle.pop()
+            if await self._is_alive(connection, last_used):
+                return connection
+            await self._close_connection(connection)
+
+        return await smtp_connect(
+            self.host,
+            self.port,
+            self.login,
+            self.password,
+            self.use_ssl,
+            self.starttls,
+        )
+
+    async def _is_alive(self, connection: aiosmtplib.SMTP, last_used: float) -> bool:
+        idle_time = time.monotonic() - last_used
+        if idle_time > self.idle_timeout:
+            return False
+        if idle_time < self.check_after:
+            return True
+
+        try:
+            response = await connection.noop()
+        except (aiosmtplib.SMTPException, OSError):
+            return False
+        return response.code == 250
+
+    @staticmethod
+    async def _close_connection(connection: aiosmtplib.SMTP):
+        try:
+            await connection.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            connection.close()
+
+
+class AsyncEmailSender:
+    """
+    Асинхронный аналог ``EmailSender`` (с тем же набором методов отправки).
+
+    Письма пачки, письма нескольким получателям и части группы получателей отправляются конкурентно
+    через несколько соединений пула, поэтому однопоточный воркер (``--threads 1``) не ожидает отправки
+    каждого письма по отдельности.
+    """
+
+    DEFAULT_SMTP_PORT = 465  # for SSL connections
+
+    ContentType = ContentType
+
+    def __init__(
+        self,
+        smtp_host: str,
+        from_email: str,
+        login: str | None = None,
+        password: str | None = None,
+        smtp_port: int | None = DEFAULT_SMTP_PORT,
+        use_ssl: bool = False,
+        pool_size: int = 8,
+        pool_idle_timeout: float = 60,
+        pool_check_after: float = 5,
+        starttls: bool = False,
+    ):
+        self.smtp_port = smtp_port
+        self.smtp_host = smtp_host
+        self.login = login
+        self.password = password
+        self.from_email = from_email
+        self.use_ssl = use_ssl
+
+        self.pool = AsyncSMTPConnectionPool(
+            self.smtp_host,
+            self.smtp_port,
+            self.login,
+            self.password,
+            self.use_ssl,
+            size=pool_size,
+            idle_timeout=pool_idle_timeout,
+            check_after=pool_check_after,
+            starttls=starttls,
+        )
+
+    async def close(self):
+        """
+        Закрывает SMTP соединения с сервером
+        """
+        await self.pool.close()
+
+    async def send_message_safe(
+        self,
+        to_email: str | list[str],
+        content: MessageContent,
+        title: str,
+        content_type: ContentType = "plain",
+        event_data: str = None,
+    ):
+        """
+        Отправляет сообщение 1 или нескольким пользователям.
+
+        :raises ConnectionError при проблемах с отправкой.
+        """
+        # как и в EmailSender, неработоспособное соединение закрывается пулом, а остальные соединения
+        # используются конкурентными отправками и не закрываются
+        await self.send_message_fast(
+            to_email, content, title, content_type, event_data=event_data
+        )
+
+    async def send_message_fast(
+        self,
+        to_email: str | list[str],
+        content: MessageContent,
+        title: str,
+        content_type: ContentType = "plain",
+        event_data: str = None,
+    ):
+        """
+        Отправляет сообщение 1 или нескольким пользователям (каждому отдельным письмом).
+
+        Письма отправляются конкурентно, соединения возвращаются в пул для переиспользования.
+
+        :raises ConnectionError: при проблемах с отправкой хотя бы одного из писем.
+        """
+        if isinstance(to_email, str):
+            to_email = [to_email]
+
+        results = await asyncio.gather(
+            *[
+                self._send_message(email, content, title, content_type)
+                for email in to_email
+            ],
+            return_exceptions=True,
+        )
+
+        errors = [i for i in results if isinstance(i, BaseException)]
+        if errors:
+            logger.error("Unable to send %s of %s emails", len(errors), len(to_email))
+            raise ConnectionError(
+                "Невозможно отправить письмо."
+                " Отсутствует подключение к серверу почты"
+            ) from errors[0]
+
+    async def send_messages(
+        self, messages: list[OutgoingMessage], content_type: ContentType = "plain"
+    ) -> list[int]:
+        """
+        Отправляет пачку разных сообщений (см. ``EmailSender.send_messages``).
+
+        Письма отправляются конкурентно.
+
+        :return: номера сообщений, которые не удалось отправить.
+        """
+        results = await asyncio.gather(
+            *[
+                self._send_message(to_email, content, title, content_type)
+                for to_email, content, title in messages
+            ],
+            return_exceptions=True,
+        )
+        return [
+            number
+            for number, result in enumerate(results)
+            if isinstance(result, BaseException)
+        ]
+
+    async def send_message_grouped(
+        self,
+        to_email: list[str],
+        content: MessageContent,
+        title: str,
+        content_type: ContentType = "plain",
+        max_recipients: int = 100,
+    ) -> list[str]:
+        """
+        Отправляет одинаковое сообщение группе пользователей (см. ``EmailSender.send_message_grouped``).
+
+        SMTP транзакции для частей группы выполняются конкурентно.
+
+        :return: адреса, на которые не удалось отправить письмо.
+        """
+        message = build_message(
+            self.from_email, UNDISCLOSED_RECIPIENTS, content, title, content_type
+        )
+        serialized = serialize_message(message)
+
+        results = await asyncio.gather(
+            *[
+                self._send_group(recipients, serialized)
+                for recipients in chunked(to_email, max_recipients)
+            ]
+        )
+        return [email for refused in results for email in refused]
+
+    async def _send_group(self, recipients: list[str], serialized: bytes) -> list[str]:
+        try:
+            refused = await self._with_connection(
+                lambda connection: self._sendmail(connection, recipients, serialized)
+            )
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            logger.debug("All recipients were refused", exc_info=True)
+            refused = [i.recipient for i in e.recipients]
+        except Exception:
+            logger.error("Unable to send message to a group", exc_info=True)
+            refused = recipients
+
+        return list(refused)
+
+    async def _send_message(
+        self,
+        to_email: str,
+        content: MessageContent,
+        title: str,
+        content_type: ContentType = "plain",
+        max_retries: int = 5,
+    ):
+        """
+        :raises ConnectionError при проблемах с отправкой
+        """
+        message = build_message(self.from_email, to_email, content, title, content_type)
+        serialized = serialize_message(message)
+
+        try:
+            await self._with_connection(
+                lambda connection: self._sendmail(connection, [to_email], serialized),
+                max_retries=max_retries,
+            )
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            logger.debug("You probably was banned by recipient", exc_info=True)
+            raise ConnectionError("Пользователь отклонил письмо") from e
+        except Exception as e:
+            logger.error("Some troubles via sending", exc_info=True)
+            raise ConnectionError("Не удалось отправить письмо") from e
+
+    async def _sendmail(
+        self, connection: aiosmtplib.SMTP, recipients: list[str], serialized: bytes
+    ) -> dict[str, aiosmtplib.SMTPResponse]:
+        """
+        Отправка письма в одной SMTP транзакции
+
+        :return: получатели, которых отклонил сервер (как и в ``smtplib.SMTP.sendmail``).
+        """
+        refused, _ = await connection.sendmail(self.from_email, recipients, serialized)
+        return refused
+
+    async def _with_connection(
+        self,
+        send: Callable[[aiosmtplib.SMTP], Awaitable[SendResult]],
+        max_retries: int = 5,
+    ) -> SendResult:
+        """
+        Выполнение отправки через соединение из пула с повтором через новое соединение при разрыве
+        """
+        error = None
+        for retry in range(1, max_retries):
+            try:
+                async with self.pool.connection() as connection:
+                    return await send(connection)
+            except aiosmtplib.SMTPServerDisconnected as e:
+                error = e
+            except aiosmtplib.SMTPSenderRefused as e:
+                error = e
+                await asyncio.sleep(retry)
+
+        err = ConnectionError(
+            "Не удалось отправить письмо. Достигнуто максимально кол-во попыток"
+        )
+        raise (error or err)
@@ -1,17 +1,28 @@
+import collections
+import contextlib
 import logging
 import smtplib
 import socket
 import ssl
+import threading
 import time
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Literal
+from typing import Callable, Iterator, Literal, TypeVar
+
+from utils.utils import chunked
 
 logger = logging.getLogger("email-sender")
 
 
 def smtp_connect(
-    host: str, port: int, login: str | None, password: str | None, use_ssl=False
+    host: str,
+    port: int,
+    login: str | None,
+    password: str | None,
+    use_ssl=False,
+    starttls=False,
 ) -> smtplib.SMTP | smtplib.SMTP_SSL:
     """
     Контекстный менеджер для подключения к smtp серверу
@@ -19,6 +30,8 @@ def smtp_connect(
     :param port: порт для подключения к smtp серверу
     :param login: имя пользователя smtp сервера
     :param password: пароль от указанного почтового адреса
+    :param use_ssl: подключение по SSL/TLS
+    :param starttls: перевод открытого соединения на TLS командой STARTTLS (до авторизации)
     :return: контекстный менеджер для отправки сообщений
     """
     if use_ssl:
@@ -33,6 +46,8 @@ def smtp_connect(
         server = klass(host, port, **kwargs, timeout=30)
     except socket.gaierror:
         raise ConnectionError("Не удалось подключиться к почтовому серверу")
+    if starttls and not use_ssl:
+        server.starttls(context=ssl.create_default_context())
     if login and password:
         server.login(login, password)
     else:
@@ -40,13 +55,207 @@ def smtp_connect(
     return server
 
 
+# ошибки, после которых соединение не может быть переиспользовано
+BROKEN_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPSenderRefused,
+    OSError,
+)
+
+
+class SMTPConnectionPool:
+    """
+    Пул авторизованных соединений с SMTP сервером.
+
+    Соединения выдаются в порядке LIFO, чтобы активно используемые соединения оставались "тёплыми",
+    а редко используемые закрывались по истечении ``idle_timeout``. Перед выдачей соединения,
+    простаивавшего дольше ``check_after`` секунд, его работоспособность проверяется командой NOOP.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        login: str | None = None,
+        password: str | None = None,
+        use_ssl: bool = False,
+        size: int = 1,
+        idle_timeout: float = 60,
+        check_after: float = 5,
+        starttls: bool = False,
+    ):
+        """
+        :param size: максимальное количество одновременно используемых соединений
+        :param idle_timeout: время простоя (в секундах), после которого соединение закрывается
+        :param check_after: время простоя (в секундах), после которого соединение проверяется перед выдачей
+        """
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+
+        self._idle: collections.deque[tuple[smtplib.SMTP, float]] = collections.deque()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(size)
+
+    def acquire(self, timeout: float | None = None) -> smtplib.SMTP:
+        """
+        Получение соединения из пула (при отсутствии свободных соединений будет создано новое)
+
+        :param timeout: максимальное время ожидания свободного соединения
+        :raises ConnectionError: если свободное соединение не было получено за отведённое время
+        """
+        if not self._semaphore.acquire(timeout=timeout):
+            raise ConnectionError("Нет свободных соединений с почтовым сервером")
+
+        try:
+            # в порядке LIFO простаивающие соединения остаются в начале очереди и без очистки
+            # не закрылись бы, пока соединения выдаются
+            self.reap_idle()
+            while connection := self._pop_idle():
+                if self._is_alive(*connection):
+                    return connection[0]
+                self._close_connection(connection[0])
+
+            return smtp_connect(
+                self.host,
+                self.port,
+                self.login,
+                self.password,
+                self.use_ssl,
+                self.starttls,
+            )
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def release(self, connection: smtplib.SMTP, broken: bool = False):
+        """
+        Возврат соединения в пул
+
+        :param connection: соединение, полученное через ``acquire``
+        :param broken: соединение неработоспособно и должно быть закрыто
+        """
+        try:
+            if broken:
+                self._close_connection(connection)
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+            self.reap_idle()
+        finally:
+            self._semaphore.release()
+
+    @contextlib.contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[smtplib.SMTP]:
+        """
+        Контекстный менеджер для работы с соединением из пула.
+
+        При ошибках соединения (разрыв, отказ сервера) соединение закрывается, а не возвращается в пул.
+        """
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except BROKEN_CONNECTION_ERRORS:
+            self.release(connection, broken=True)
+            raise
+        except BaseException:
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    def reap_idle(self):
+        """
+        Закрытие соединений, простаивающих дольше ``idle_timeout``
+        """
+        expired = []
+        with self._lock:
+            border = time.monotonic() - self.idle_timeout
+            while self._idle and self._idle[0][1] < border:
+                expired.append(self._idle.popleft()[0])
+
+        for connection in expired:
+            self._close_connection(connection)
+
+    def close(self):
+        """
+        Закрытие всех свободных соединений пула
+        """
+        with self._lock:
+            idle, self._idle = self._idle, collections.deque()
+
+        for connection, _ in idle:
+            self._close_connection(connection)
+
+    def _pop_idle(self) -> tuple[smtplib.SMTP, float] | None:
+        with self._lock:
+            return self._idle.pop() if self._idle else None
+
+    def _is_alive(self, connection: smtplib.SMTP, last_used: float) -> bool:
+        idle_time = time.monotonic() - last_used
+        if idle_time > self.idle_timeout:
+            return False
+        if idle_time < self.check_after:
+            return True
+
+        try:
+            code, _ = connection.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    @staticmethod
+    def _close_connection(connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+
 MessageContent = str
+ContentType = Literal["html", "plain"]
+SendResult = TypeVar("SendResult")
+# адрес получателя, содержимое и заголовок письма
+OutgoingMessage = tuple[str, MessageContent, str]
+
+UNDISCLOSED_RECIPIENTS = "undisclosed-recipients:;"
+
+
+def build_message(
+    from_email: str,
+    to_email: str,
+    content: MessageContent,
+    title: str,
+    content_type: ContentType = "plain",
+) -> MIMEMultipart:
+    message = MIMEMultipart()
+    message["From"] = from_email
+    message["To"] = to_email
+    message["subject"] = title
+
+    mimed_content = MIMEText(content, content_type)
+    message.attach(mimed_content)
+
+    return message
+
+
+def serialize_message(message: Message) -> bytes:
+    """
+    Сериализация письма для передачи по SMTP (с переводами строк CRLF)
+    """
+    return message.as_bytes(policy=message.policy.clone(linesep="\r\n"))
 
 
 class EmailSender:
     DEFAULT_SMTP_PORT = 465  # for SSL connections
 
-    ContentType = Literal["html", "plain"]
+    ContentType = ContentType
 
     def __init__(
         self,
@@ -56,7 +265,15 @@ class EmailSender:
         password: str | None = None,
         smtp_port: int | None = DEFAULT_SMTP_PORT,
         use_ssl: bool = False,
+        pool_size: int = 1,
+        pool_idle_timeout: float = 60,
+        pool_check_after: float = 5,
+        starttls: bool = False,
     ):
+        """
+        Соединения с SMTP сервером устанавливаются по требованию и переиспользуются через пул
+        (см. ``SMTPConnectionPool``).
+        """
 
         self.smtp_port = smtp_port
         self.smtp_host = smtp_host
@@ -65,28 +282,29 @@ class EmailSender:
         self.from_email = from_email
         self.use_ssl = use_ssl
 
-        self.server: smtplib.SMTP = smtp_connect(
-            self.smtp_host, self.smtp_port, self.login, self.password, self.use_ssl
+        self.pool = SMTPConnectionPool(
+            self.smtp_host,
+            self.smtp_port,
+            self.login,
+            self.password,
+            self.use_ssl,
+            size=pool_size,
+            idle_timeout=pool_idle_timeout,
+            check_after=pool_check_after,
+            starttls=starttls,
         )
 
     def reconnect(self):
-        try:
-            self.close()
-        except smtplib.SMTPServerDisconnected:
-            pass
-
-        self.server = smtp_connect(
-            self.smtp_host, self.smtp_port, self.login, self.password, self.use_ssl
-        )
+        """
+        Сброс свободных соединений. Новые соединения будут установлены при следующей отправке
+        """
+        self.pool.close()
 
     def close(self):
         """
-        Закрывает SMTP соединение с сервером
+        Закрывает SMTP соединения с сервером
         """
-        try:
-            self.server.quit()
-        except smtplib.SMTPServerDisconnected:
-            pass
+        self.pool.close()
 
     def __enter__(self):
         return self
@@ -124,14 +342,11 @@ class EmailSender:
         :raises FileNotFoundError при отсутствии одного из вложений.
         :raises ConnectionError при проблемах с отправкой.
         """
-
-        try:
-            self.server.login(self.login, self.password)
-            self.send_message_fast(
-                to_email, content, title, content_type, attachments, event_data
-            )
-        finally:
-            self.server.close()
+        # неработоспособное соединение закрывается пулом (см. SMTPConnectionPool.connection),
+        # остальные соединения пула используются другими отправками и не закрываются
+        self.send_message_fast(
+            to_email, content, title, content_type, event_data=event_data
+        )
 
     def send_message_fast(
         self,
@@ -144,8 +359,8 @@ class EmailSender:
         """
         Отправляет сообщение 1 или нескольким пользователям.
 
-        В отличии от безопасного варианта, не закрывает соединение,
-        а требует вручную выполнять .close() метод.
+        В отличии от безопасного варианта, не закрывает соединения,
+        а возвращает их в пул для переиспользования (закрываются вручную через .close() метод).
 
         Сообщение может быть представлено в виде текста, либо html сообщения. Для корректной отправки
         необходимо выбрать соответствующий тип сообщения в поле `content_type`. Помимо этого, при
@@ -169,7 +384,6 @@ class EmailSender:
         try:
             for email in to_email:
                 self._send_message(
-                    self.server,
                     email,
                     content,
                     title,
@@ -183,69 +397,122 @@ class EmailSender:
                 " Отсутствует подключение к серверу почты"
             ) from e
 
+    def send_message_grouped(
+        self,
+        to_email: list[str],
+        content: MessageContent,
+        title: str,
+        content_type: ContentType = "plain",
+        max_recipients: int = 100,
+    ) -> list[str]:
+        """
+        Отправляет одинаковое сообщение группе пользователей.
+
+        Сообщение собирается и сериализуется один раз, а получатели объединяются в SMTP транзакции
+        по ``max_recipients`` адресов (одна команда DATA на множество команд RCPT TO).
+        Получатели не видят адреса друг друга.
+
+        :param to_email: адреса электронной почты, на которые будут отправлены письма.
+        :param content: содержимое письма.
+        :param title: заголовок для письма.
+        :param content_type: вид содержимого (обычный текст или html).
+        :param max_recipients: максимальное количество получателей в одной SMTP транзакции.
+        :return: адреса, на которые не удалось отправить письмо.
+        """
+        message = build_message(
+            self.from_email, UNDISCLOSED_RECIPIENTS, content, title, content_type
+        )
+        serialized = serialize_message(message)
+
+        failed = []
+        for recipients in chunked(to_email, max_recipients):
+            try:
+                refused = self._with_connection(
+                    lambda connection: connection.sendmail(
+                        self.from_email, recipients, serialized
+                    )
+                )
+            except smtplib.SMTPRecipientsRefused as e:
+                logger.debug("All recipients were refused", exc_info=True)
+                refused = e.recipients
+            except Exception:
+                logger.error("Unable to send message to a group", exc_info=True)
+                refused = recipients
+
+            failed.extend(refused)
+
+        return failed
+
+    def send_messages(
+        self, messages: list[OutgoingMessage], content_type: ContentType = "plain"
+    ) -> list[int]:
+        """
+        Отправляет пачку разных сообщений (каждое - своему получателю).
+
+        Ошибка отправки одного из писем не прерывает отправку остальных.
+
+        :param messages: адреса получателей с содержимым и заголовками писем.
+        :param content_type: вид содержимого (обычный текст или html).
+        :return: номера сообщений, которые не удалось отправить.
+        """
+        failed = []
+        for number, (to_email, content, title) in enumerate(messages):
+            try:
+                self._send_message(to_email, content, title, content_type)
+            except ConnectionError:
+                failed.append(number)
+
+        return failed
+
+    def _with_connection(
+        self, send: Callable[[smtplib.SMTP], SendResult], max_retries: int = 5
+    ) -> SendResult:
+        """
+        Выполнение отправки через соединение из пула.
+
+        При разрыве соединения (или отказе сервера принять письмо от отправителя) соединение закрывается,
+        а отправка повторяется через новое соединение.
+        """
+        error = None
+        for retry in range(1, max_retries):
+            try:
+                with self.pool.connection() as connection:
+                    return send(connection)
+            except smtplib.SMTPServerDisconnected as e:
+                error = e
+            except smtplib.SMTPSenderRefused as e:
+                error = e
+                time.sleep(retry)
+
+        err = ConnectionError(
+            "Не удалось отправить письмо. Достигнуто максимально кол-во попыток"
+        )
+        raise (error or err)
+
     def _send_message(
         self,
-        connection: smtplib.SMTP_SSL | smtplib.SMTP,
         to_email: str,
         content: MessageContent,
         title: str,
         content_type: ContentType = "plain",
         event_data: str = None,
         max_retries: int = 5,
-        retry: int = 1,
-        error=None,
     ):
         """
         :raises ConnectionError при проблемах с отправкой
         """
-        if retry == max_retries:
-            err = ConnectionError(
-                "Не удалось отправить письмо. Достигнуто максимально кол-во попыток"
-            )
-            raise (error or err)
-
-        message = MIMEMultipart()
-        message["From"] = self.from_email
-        message["To"] = to_email
-        message["subject"] = title
-
-        mimed_content = MIMEText(content, content_type)
-        message.attach(mimed_content)
+        message = build_message(self.from_email, to_email, content, title, content_type)
 
         try:
-            connection.send_message(message, self.from_email, to_email)
+            self._with_connection(
+                lambda connection: connection.send_message(
+                    message, self.from_email, to_email
+                ),
+                max_retries=max_retries,
+            )
         except smtplib.SMTPRecipientsRefused as e:
             logger.debug("You probably was banned by recipient", exc_info=True)
             raise ConnectionError("Пользователь отклонил письмо") from e
-        except smtplib.SMTPServerDisconnected as e:
-            self.reconnect()
-
-            self._send_message(
-                connection,
-                to_email,
-                content,
-                title,
-                content_type,
-                event_data,
-                max_retries=max_retries,
-                retry=retry + 1,
-                error=e,
-            )
-        except smtplib.SMTPSenderRefused as e:
-            self.reconnect()
-
-            self._send_message(
-                connection,
-                to_email,
-                content,
-                title,
-                content_type,
-                event_data,
-                max_retries=max_retries,
-                retry=retry + 1,
-                error=e,
-            )
-            time.sleep(retry)
         except Exception as e:
             logger.error("Some troubles via sending", exc_info=True)
             raise ConnectionError("Не удалось отправить письмо") from e
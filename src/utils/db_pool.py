@@ -0,0 +1,115 @@
+import functools
+import threading
+import time
+from typing import Any, Callable
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from core.config import DBPoolConfig
+from schemas.service import DBPoolStats
+
+
+class PoolStatsMixin:
+    """
+    Сбор статистики пула соединений: количество ожидающих соединения и время установки новых соединений
+    """
+
+    def __init__(self, creator: Callable[..., Any], *args, **kwargs):
+        # при пересоздании пула (engine.dispose) передаётся функция, обёрнутая предыдущим пулом
+        if getattr(creator, "timed", False):
+            creator = creator.__wrapped__
+
+        super().__init__(self._timed_creator(creator), *args, **kwargs)
+
+        # соединения выдаются из нескольких потоков воркера, поэтому счётчики изменяются под блокировкой
+        self._stats_lock = threading.Lock()
+        self.waiting = 0
+        self.connects = 0
+        self.connect_time_total = 0.0
+        self.connect_time_max = 0.0
+
+    def _timed_creator(self, creator: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(creator)
+        def timed_creator(connection_record=None):
+            started = time.monotonic()
+            connection = creator(connection_record)
+
+            elapsed = time.monotonic() - started
+            with self._stats_lock:
+                self.connects += 1
+                self.connect_time_total += elapsed
+                self.connect_time_max = max(self.connect_time_max, elapsed)
+            return connection
+
+        timed_creator.timed = True
+        return timed_creator
+
+    def _do_get(self):
+        if not self._must_wait():
+            return super()._do_get()
+
+        with self._stats_lock:
+            self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            with self._stats_lock:
+                self.waiting -= 1
+
+    def _must_wait(self) -> bool:
+        """
+        Соединение придётся ожидать: свободных соединений в пуле нет, а переполнение исчерпано
+        """
+        overflow_exhausted = -1 < self._max_overflow <= self._overflow
+        return overflow_exhausted and self._pool.empty()
+
+    def stats(self) -> DBPoolStats:
+        return DBPoolStats(
+            size=self.size(),
+            checked_out=self.checkedout(),
+            # до заполнения пула SQLAlchemy считает переполнение отрицательным
+            overflow=max(self.overflow(), 0),
+            waiting=self.waiting,
+            connects=self.connects,
+            connect_time_avg=self.connects and self.connect_time_total / self.connects,
+            connect_time_max=self.connect_time_max,
+        )
+
+
+class InstrumentedQueuePool(PoolStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(PoolStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_engine_params(
+    config: DBPoolConfig | None, poolclass: type[Pool]
+) -> dict[str, Any]:
+    """
+    Параметры пула соединений для создания engine'а
+
+    :param config: настройки пула (None - без пула).
+    :param poolclass: класс пула, используемый при включенном пуле.
+    """
+    if config is None or not config.enabled:
+        return {}
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": config.size,
+        "max_overflow": config.max_overflow,
+        "pool_recycle": config.recycle,
+        "pool_pre_ping": config.pre_ping,
+        "pool_timeout": config.timeout,
+    }
+
+
+def pool_stats(pool: Pool) -> DBPoolStats | None:
+    """
+    Статистика пула соединений (None, если пул не собирает статистику)
+    """
+    if isinstance(pool, PoolStatsMixin):
+        return pool.stats()
+    return None
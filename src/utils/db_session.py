@@ -1,15 +1,22 @@
 import contextlib
-from typing import AsyncContextManager, AsyncGenerator, Callable
+from typing import AsyncContextManager, AsyncGenerator, Callable, ContextManager
 
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import NullPool
 
-from core.config import envs
+from core.config import DBPoolConfig, envs
+from utils.db_pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    pool_engine_params,
+)
 
 
 def async_session_factory(
-    async_connection_string, **engine_params
+    async_connection_string, pool_config: DBPoolConfig | None = None, **engine_params
 ) -> tuple[
     AsyncGenerator[AsyncSession, None],
     Callable[[], AsyncContextManager[AsyncSession]],
@@ -19,12 +26,16 @@ def async_session_factory(
     Функция для создания асинхронной фабрики соединений с бд
 
     :param async_connection_string: connection url начинающийся с postgresql+asyncpg
+    :param pool_config: настройки пула соединений (без них соединения не переиспользуются)
     :param engine_params: параметры для AsyncEngine (настройки пула соединений)
     :return: генератор для использования в fastapi.Depends, контекстный менеджер
              бд для использования в любом ином месте, AsyncEngine для низкоуровнего взаимодействия
     """
     async_engine_default_params = {"poolclass": NullPool}
 
+    async_engine_default_params.update(
+        pool_engine_params(pool_config, InstrumentedAsyncQueuePool)
+    )
     async_engine_default_params.update(engine_params)
 
     engine = create_async_engine(async_connection_string, **async_engine_default_params)
@@ -45,6 +56,44 @@ def async_session_factory(
     return get_async_session, contextlib.asynccontextmanager(get_async_session), engine
 
 
+def sync_session_factory(
+    connection_string, pool_config: DBPoolConfig | None = None, **engine_params
+) -> tuple[Callable[[], ContextManager[Session]], Engine]:
+    """
+    Функция для создания синхронной фабрики соединений с бд (для акторов dramatiq и загрузчика шаблонов)
+
+    :param connection_string: connection url начинающийся с postgresql+psycopg2
+    :param pool_config: настройки пула соединений (без них соединения не переиспользуются)
+    :param engine_params: параметры для Engine (настройки пула соединений)
+    :return: контекстный менеджер бд (с фиксацией транзакции при успешном выходе), Engine
+    """
+    engine_default_params = {"poolclass": NullPool}
+
+    engine_default_params.update(pool_engine_params(pool_config, InstrumentedQueuePool))
+    engine_default_params.update(engine_params)
+
+    engine = create_engine(connection_string, **engine_default_params)
+    maker = sessionmaker(bind=engine, expire_on_commit=False)
+
+    @contextlib.contextmanager
+    def session_manager() -> Session:
+        sess: Session = maker()
+        try:
+            yield sess
+            sess.commit()
+        except Exception:
+            sess.rollback()
+            raise
+        finally:
+            sess.close()
+
+    return session_manager, engine
+
+
 get_db_session, db_session_manager, db_engine = async_session_factory(
-    envs.database.async_db_conn_str
+    envs.database.async_db_conn_str, envs.api_db_pool
+)
+
+sync_db_session_manager, sync_db_engine = sync_session_factory(
+    envs.database.sync_db_conn_str, envs.worker_db_pool
 )
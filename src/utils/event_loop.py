@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, TypeVar
+
+from utils.utils import SingletonMeta
+
+Result = TypeVar("Result")
+
+
+class WorkerEventLoop(metaclass=SingletonMeta):
+    """
+    Постоянный event loop процесса воркера.
+
+    Акторы dramatiq выполняются синхронно, поэтому асинхронные операции (http запросы и прочее)
+    выполняются в отдельном потоке с единым на весь процесс event loop'ом. Благодаря этому
+    соединения и прочие асинхронные ресурсы переиспользуются между сообщениями.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="worker-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro: Coroutine[Any, Any, Result], timeout: float = None) -> Result:
+        """
+        Выполнение корутины в event loop'е воркера с ожиданием результата
+
+        :param coro: выполняемая корутина
+        :param timeout: максимальное время ожидания результата (в секундах)
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+
+def run_async(coro: Coroutine[Any, Any, Result], timeout: float = None) -> Result:
+    """
+    Выполнение корутины из синхронного кода акторов
+    """
+    return WorkerEventLoop().run(coro, timeout)
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import time
+from typing import Any, NamedTuple
+
+import aiohttp
+from yarl import URL
+
+from core.config import envs
+from utils.utils import SingletonMeta
+
+logger = logging.getLogger("http-client")
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUSES = {502, 503, 504}
+
+
+class HttpClientError(Exception):
+    pass
+
+
+class ServiceUnavailable(HttpClientError):
+    """
+    Запрос не выполнен: сервис недоступен, перегружен или отключен circuit breaker'ом
+    """
+
+    def __init__(self, origin: str, reason: str):
+        self.origin = origin
+        self.reason = reason
+
+    def __str__(self):
+        return f"{self.origin} is unavailable: {self.reason}"
+
+
+class HttpStatusError(HttpClientError):
+    def __init__(self, status: int, data: Any):
+        self.status = status
+        self.data = data
+
+    def __str__(self):
+        return f"Unexpected response status {self.status}: {self.data}"
+
+
+class HttpResponse(NamedTuple):
+    status: int
+    # разобранный JSON, либо текст ответа
+    data: Any
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HttpStatusError(self.status, self.data)
+
+
+class CircuitBreaker:
+    """
+    Отключение запросов к хосту после серии ошибок.
+
+    После ``failure_threshold`` ошибок подряд запросы отклоняются в течение ``reset_timeout`` секунд,
+    после чего выполняется один пробный запрос: при его успехе запросы возобновляются,
+    а при ошибке снова отключаются.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._probing or time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(
+                    "Circuit of %s opened after %s failures", self.name, self.failures
+                )
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        # запрос прерван без результата (например, отменён)
+        self._probing = False
+
+
+class RetryBudget:
+    """
+    Ограничение количества повторов долей от количества запросов.
+
+    Каждый запрос пополняет бюджет на ``ratio``, а каждый повтор расходует единицу бюджета,
+    поэтому при отказе сервиса повторы не умножают нагрузку на него.
+    """
+
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.capacity = float(minimum)
+        self.balance = float(minimum)
+
+    def deposit(self):
+        self.balance = min(self.balance + self.ratio, self.capacity)
+
+    def withdraw(self) -> bool:
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+class _Host:
+    def __init__(self, breaker: CircuitBreaker, budget: RetryBudget):
+        self.breaker = breaker
+        self.budget = budget
+        self.pending = 0
+
+
+class HttpClient(metaclass=SingletonMeta):
+    """
+    Общий HTTP клиент процесса для запросов к внешним сервисам.
+
+    Соединения переиспользуются (keep-alive) в пределах общего и по-хостового лимитов, результаты DNS запросов
+    кэшируются. Для каждого хоста ограничивается количество ожидающих запросов, ведётся бюджет повторов
+    и circuit breaker: при недоступности сервиса запросы к нему сразу завершаются ошибкой ``ServiceUnavailable``,
+    а не копятся в ожидании таймаутов.
+
+    Клиент создаётся при запуске приложения/воркера и закрывается при их остановке.
+    Все методы должны вызываться из одного event loop'а (приложения или воркера).
+    """
+
+    def __init__(self):
+        self.config = envs.http
+        self._session: aiohttp.ClientSession | None = None
+        self._hosts: dict[str, _Host] = {}
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # при использовании до запуска (например, в тестах) сессия создаётся при первом запросе
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        idempotent: bool | None = None,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> HttpResponse:
+        """
+        Выполнение запроса с повторами при сетевых ошибках и ответах 502/503/504
+
+        :param method: HTTP метод.
+        :param url: адрес запроса.
+        :param idempotent: можно ли повторять запрос (по умолчанию определяется по методу).
+        :param timeout: общий таймаут запроса (в секундах), по умолчанию - из настроек.
+        :param kwargs: параметры запроса aiohttp (json, params, headers и прочие).
+        :raises ServiceUnavailable: если запрос не удалось выполнить.
+        :return: статус и данные ответа.
+        """
+        origin = str(URL(url).origin())
+        host = self._host(origin)
+        if host.pending >= self.config.max_pending_per_host:
+            raise ServiceUnavailable(origin, "too many pending requests")
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        client_timeout = aiohttp.ClientTimeout(
+            total=timeout or self.config.timeout, connect=self.config.connect_timeout
+        )
+
+        host.budget.deposit()
+        host.pending += 1
+        try:
+            attempt = 0
+            while True:
+                if not host.breaker.allow():
+                    raise ServiceUnavailable(origin, "circuit is open")
+
+                response, error = None, None
+                try:
+                    response = await self._send(method, url, client_timeout, **kwargs)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    host.breaker.record_failure()
+                    error = e
+                except BaseException:
+                    host.breaker.release()
+                    raise
+                else:
+                    if response.status >= 500:
+                        host.breaker.record_failure()
+                    else:
+                        host.breaker.record_success()
+                    if response.status not in RETRYABLE_STATUSES:
+                        return response
+
+                can_retry = idempotent and attempt < self.config.retries
+                if not (can_retry and host.budget.withdraw()):
+                    if response is not None:
+                        return response
+                    reason = f"{type(error).__name__}: {error}"
+                    raise ServiceUnavailable(origin, reason) from error
+
+                attempt += 1
+                logger.debug("Retrying %s %s (attempt %s)", method, url, attempt)
+                await asyncio.sleep(self.config.retry_backoff * 2 ** (attempt - 1))
+        finally:
+            host.pending -= 1
+
+    async def _send(
+        self, method: str, url: str, timeout: aiohttp.ClientTimeout, **kwargs: Any
+    ) -> HttpResponse:
+        async with self.session.request(
+            method, url, timeout=timeout, **kwargs
+        ) as response:
+            if response.content_type == "application/json":
+                data = await response.json()
+            else:
+                data = await response.text()
+            return HttpResponse(response.status, data)
+
+    def _host(self, origin: str) -> _Host:
+        host = self._hosts.get(origin)
+        if host is None:
+            config = self.config
+            host = _Host(
+                CircuitBreaker(
+                    origin,
+                    config.circuit_failure_threshold,
+                    config.circuit_reset_timeout,
+                ),
+                RetryBudget(config.retry_budget_ratio, config.retry_budget_min),
+            )
+            self._hosts[origin] = host
+        return host
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        config = self.config
+        connector = aiohttp.TCPConnector(
+            limit=config.connections_limit,
+            limit_per_host=config.connections_limit_per_host,
+            ttl_dns_cache=config.dns_cache_ttl,
+            keepalive_timeout=config.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector)
@@ -3,6 +3,7 @@ from datetime import datetime
 import sqlalchemy as sa
 from sqlalchemy import event
 from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+from sqlalchemy.sql import Executable
 
 
 class SoftDeleteMixin:
@@ -29,10 +30,17 @@ def before_compile(execute_state: ORMExecuteState):
                 )
 
     else:
-        execute_state.statement = execute_state.statement.options(
-            with_loader_criteria(
-                SoftDeleteMixin,
-                lambda cls: cls.deleted_at.is_(None),
-                include_aliases=True,
-            )
+        execute_state.statement = exclude_deleted(execute_state.statement)
+
+
+def exclude_deleted(statement: Executable) -> Executable:
+    """
+    Исключение удалённых записей всех сущностей запроса (в том числе для запросов, выполняемых не через ORM)
+    """
+    return statement.options(
+        with_loader_criteria(
+            SoftDeleteMixin,
+            lambda cls: cls.deleted_at.is_(None),
+            include_aliases=True,
         )
+    )
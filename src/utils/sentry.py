@@ -1,53 +1,35 @@
-import dataclasses
-from typing import ClassVar
-
 import fastapi
 import sentry_sdk
-import starlette
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    DispatchFunction,
-    RequestResponseEndpoint,
-)
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
-
-
-@dataclasses.dataclass
-class ReceiveProxy:
-    """
-    Кэширование тела запроса при его получении из объекта Request в HTTP Middleware.
+from starlette.datastructures import URL, Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-    Причина: при вызове метода await request.body() Stream, в который пришел
-    данный Request, очищается (как-будто он вернул результат) и ожидает
-    новую порцию информации (по сути уходя в вечный цикл)
-    Решение взято отсюда: https://github.com/tiangolo/fastapi/issues/394#issuecomment-994665859
-    """
+# тело запроса прикладывается к событию Sentry только в пределах этого размера
+REQUEST_BODY_MAX_SIZE = 64 * 1024
 
-    receive: starlette.types.Receive
-    cached_body: bytes
-    _is_first_call: ClassVar[bool] = True
 
-    async def __call__(self):
-        # First call will be for getting request body => returns cached result
-        if self._is_first_call:
-            self._is_first_call = False
-            return {
-                "type": "http.request",
-                "body": self.cached_body,
-                "more_body": False,
-            }
+class BodyTee:
+    """
+    Ограниченная по размеру копия тела запроса, накапливаемая по мере его чтения приложением
+    """
 
-        return await self.receive()
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._chunks: list[bytes] = []
 
+    def write(self, chunk: bytes):
+        remaining = self.max_size - self.size
+        if remaining > 0 and chunk:
+            self._chunks.append(chunk[:remaining])
+        self.size += len(chunk)
 
-async def get_request_body(request: Request) -> bytes:
-    body = await request.body()
+    @property
+    def truncated(self) -> bool:
+        return self.size > self.max_size
 
-    request._receive = ReceiveProxy(receive=request.receive, cached_body=body)
-    return body
+    def getvalue(self) -> bytes:
+        return b"".join(self._chunks)
 
 
 class SentryFullAsgiMiddleware:
@@ -55,66 +37,89 @@ class SentryFullAsgiMiddleware:
         """
         Промежуточный обработчик (всех HTTP-запросов к FastAPI) в результате которого
         в Sentry отправляется код результата выполнения запроса, а также
-        при выбрасывании исключения во время выполнения запроса дополнительно отправляется:
+        при ответе с кодом ошибки (или исключении) во время выполнения запроса дополнительно отправляется:
         * URL-адрес, по которому совершается запрос
         * HTTP-глагол
         * Заголовки запроса
         * Query-параметры запроса
-        * Тело запроса
-        * Форма запроса (при отправки файлов)
+        * Тело запроса (в пределах REQUEST_BODY_MAX_SIZE, в том числе формы)
         :param app:
         :param initial_status_code:
         """
         self.app = app
         app.add_middleware(
-            SentryResponseLoggerMiddleware,
-            dispatch=None,
-            initial_status_code=initial_status_code,
+            SentryRequestContextMiddleware, initial_status_code=initial_status_code
         )
         app.add_middleware(SentryAsgiMiddleware)
 
 
-class SentryResponseLoggerMiddleware(BaseHTTPMiddleware):
+class SentryRequestContextMiddleware:
     def __init__(
         self,
         app: ASGIApp,
-        dispatch: DispatchFunction = None,
         initial_status_code: int = 400,
+        body_max_size: int = REQUEST_BODY_MAX_SIZE,
     ) -> None:
         """
         Важно, чтобы данный Middleware выполнялся последним в цепочке (т.е. его регистрация в FastAPI должна быть
         первой). Причина: данный обработчик опирается на SentryAsgiMiddleware, в котором создается транзакция
         Sentry (именно к ней нужно добавлять информацию в данном Middleware) => необходимо
         чтобы SentryAsgiMiddleware обработал до данного Middleware
+
+        Тело запроса не читается middleware'ом: его копия накапливается по мере чтения приложением,
+        а информация о запросе собирается только для ответов с кодом ошибки.
+
         param: initial_status_code: код ответа, начиная с которого в sentry будет отсылаться тело запроса
+        param: body_max_size: максимальный размер сохраняемой части тела запроса (в байтах)
         """
+        self.app = app
         self.initial_status_code = initial_status_code
-        self.sentry_asgi_middleware = SentryAsgiMiddleware(app)
-        super().__init__(app, dispatch)
-
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        scope = sentry_sdk.Hub.current.scope
-        transaction = scope.transaction
-
-        body = await get_request_body(request)
-        form = await request.form()
-        response = await call_next(request)
-        status_code = response.status_code
-
-        if not await request.is_disconnected():
-            transaction.set_http_status(status_code)
-            if status_code >= self.initial_status_code:
-                scope.set_context(
-                    "Request Information",
-                    {
-                        "url": str(request.url),
-                        "method": request.method,
-                        "path_params": request.path_params,
-                        "headers": request.headers,
-                        "body": body,
-                        "form": form,
-                    },
-                )
-        return response
+        self.body_max_size = body_max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        body = BodyTee(self.body_max_size)
+        status_code = None
+
+        async def receive_tee() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                body.write(message.get("body", b""))
+            return message
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                self._set_status(scope, body, status_code)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_tee, send_with_status)
+        except Exception:
+            # ответ на необработанное исключение формируется выше по цепочке middleware'ов
+            if status_code is None:
+                self._set_status(scope, body, 500)
+            raise
+
+    def _set_status(self, scope: Scope, body: BodyTee, status_code: int):
+        sentry_scope = sentry_sdk.Hub.current.scope
+        if sentry_scope.transaction is not None:
+            sentry_scope.transaction.set_http_status(status_code)
+
+        if status_code >= self.initial_status_code:
+            sentry_scope.set_context(
+                "Request Information",
+                {
+                    "url": str(URL(scope=scope)),
+                    "method": scope["method"],
+                    "path_params": scope.get("path_params", {}),
+                    "headers": dict(Headers(scope=scope)),
+                    "body": body.getvalue().decode(errors="replace"),
+                    "body_size": body.size,
+                    "body_truncated": body.truncated,
+                },
+            )
@@ -1,5 +1,6 @@
+import itertools
 import threading
-from typing import Any, Optional, TypeVar
+from typing import Any, Iterable, Iterator, Optional, TypeVar
 
 import cachetools
 
@@ -30,3 +31,18 @@ class SingletonMeta(type):
                 instance = super().__call__(*args, **kwargs)
                 cls._instances[key] = instance
         return cls._instances[key]
+
+
+ChunkType = TypeVar("ChunkType")
+
+
+def chunked(values: Iterable[ChunkType], size: int) -> Iterator[list[ChunkType]]:
+    """
+    Разбиение коллекции на последовательные части фиксированного размера (последняя может быть меньше)
+
+    :param values: исходная коллекция (или итератор)
+    :param size: максимальный размер части
+    """
+    iterator = iter(values)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
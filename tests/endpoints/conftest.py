@@ -6,13 +6,14 @@ from uuid import uuid4
 import pytest
 from endpoints.utils.containers import run_alembic_migrations
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from starlette.testclient import TestClient
 from testcontainers.postgres import PostgresContainer
 
 from dependencies.auth import user_authorized
 from main import app
 from schemas.auth import UserInfo
-from utils.db_session import async_session_factory, get_db_session
+from utils.db_session import async_session_factory, get_db_session, sync_session_factory
 
 USER_ID = uuid4()
 
@@ -46,6 +47,22 @@ def raw_database_fixture() -> Callable[[], typing.AsyncContextManager[AsyncSessi
             raise ConnectionError("Failed to create postgres container") from e
 
 
+@pytest.fixture
+def sync_session_fixture(
+    raw_database_fixture,
+) -> Callable[[], typing.ContextManager[Session]]:
+    """
+    Синхронные сессии базы данных тестового контейнера (как у воркеров и планировщика)
+    """
+    session_manager, engine = sync_session_factory(
+        raw_database_fixture.container.get_connection_url()
+    )
+
+    yield session_manager
+
+    engine.dispose()
+
+
 @pytest.fixture
 def app_fixture(raw_database_fixture) -> TestClient:
     client = TestClient(app, base_url="http://localhost")
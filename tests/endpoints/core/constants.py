@@ -10,3 +10,4 @@ class RequestMethods(str, enum.Enum):
 
 class ApiRoutes(str, enum.Enum):
     templates = "v1/templates"
+    notifications = "v1/notifications"
@@ -0,0 +1,19 @@
+from endpoints.core.constants import ApiRoutes, RequestMethods
+from endpoints.core.types import RequestResult
+from endpoints.utils.requests import api_request
+from starlette.testclient import TestClient
+
+
+async def create_notifications_batch(
+    client: TestClient, notification_slug: str, notifications: list[dict]
+) -> RequestResult:
+    response, data = await api_request(
+        client,
+        RequestMethods.post,
+        ApiRoutes.notifications,
+        route_detail="/batch",
+        query_params={"notificationSlug": notification_slug},
+        data={"data": notifications},
+    )
+
+    return response, data
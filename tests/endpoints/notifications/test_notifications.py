@@ -0,0 +1,300 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+
+import pytest
+import sqlalchemy as sa
+from endpoints.notifications.requests import create_notifications_batch
+from endpoints.templates.requests import create_template
+
+from core.config import envs
+from internal.notifications.deferred import promote_scheduled_sends
+from internal.notifications.handlers import EmailNotificationHandler
+from internal.templates import wrapping
+from models import Notification, NotificationMessage, ScheduledSend
+from tasks import notifications as tasks
+from tasks.notifications import batch_notifications, send_emails, send_notifications
+from utils.time import now
+
+BROADCAST_NOTIFICATION = {"templateData": {}}
+RECURRENT_NOTIFICATION = {
+    **BROADCAST_NOTIFICATION,
+    "recurrence": {"frequency": 3, "startedAt": "2030-01-01T09:00:00", "count": 3},
+}
+
+
+def send_at(delay: timedelta) -> str:
+    # дата в часовом поясе, отличном от UTC (сохраняется в UTC)
+    return (datetime.now(timezone(timedelta(hours=3))) + delay).isoformat()
+
+
+async def create_deferred(client, delays: list[timedelta]) -> list[str]:
+    """
+    Создание отложенных уведомлений
+
+    :return: идентификаторы уведомлений.
+    """
+    await create_template(client, is_base=True, content=wrapping.content_block(""))
+    _, template = await create_template(client)
+
+    response, data = await create_notifications_batch(
+        client,
+        template["slug"],
+        [{**BROADCAST_NOTIFICATION, "sendAt": send_at(i)} for i in delays],
+    )
+    assert response.status_code == HTTPStatus.CREATED, data
+    return data["data"]
+
+
+@pytest.fixture
+def published_fixture(monkeypatch) -> list[tuple[str, int | None]]:
+    """
+    Задачи на отправку уведомлений, опубликованные в брокер (вместо публикации)
+    """
+    published = []
+
+    async def send_many_async(messages_args, delays=None):
+        delays = [None] * len(messages_args) if delays is None else delays
+        published.extend(
+            (notification_id, delay)
+            for args, delay in zip(messages_args, delays)
+            for notification_id in args[0]
+        )
+
+    monkeypatch.setattr(send_notifications, "send_many_async", send_many_async)
+    return published
+
+
+async def test_notifications_batch(app_fixture, published_fixture):
+    await create_template(app_fixture, is_base=True, content=wrapping.content_block(""))
+    _, template = await create_template(app_fixture)
+
+    response, data = await create_notifications_batch(
+        app_fixture,
+        template["slug"],
+        [BROADCAST_NOTIFICATION, RECURRENT_NOTIFICATION, BROADCAST_NOTIFICATION],
+    )
+
+    assert response.status_code == HTTPStatus.CREATED, data
+    assert data["total"] == 3
+    assert len(set(data["data"])) == 3
+    # регулярные уведомления отправляются планировщиком
+    assert published_fixture == [(data["data"][0], None), (data["data"][2], None)]
+
+
+async def test_notifications_batch_failed_no_base_template(app_fixture):
+    _, template = await create_template(app_fixture)
+
+    response, data = await create_notifications_batch(
+        app_fixture, template["slug"], [BROADCAST_NOTIFICATION]
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST, data
+
+
+async def test_notifications_batch_failed_unknown_template(app_fixture):
+    await create_template(app_fixture, is_base=True, content=wrapping.content_block(""))
+
+    response, data = await create_notifications_batch(
+        app_fixture, "unknown-template", [BROADCAST_NOTIFICATION]
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND, data
+
+
+async def test_notifications_batch_failed_empty(app_fixture):
+    _, template = await create_template(app_fixture)
+
+    response, data = await create_notifications_batch(app_fixture, template["slug"], [])
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, data
+
+
+async def test_notifications_batch_failed_send_at_with_recurrence(app_fixture):
+    _, template = await create_template(app_fixture)
+
+    response, data = await create_notifications_batch(
+        app_fixture,
+        template["slug"],
+        [{**RECURRENT_NOTIFICATION, "sendAt": "2030-01-01T09:00:00"}],
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, data
+
+
+async def test_notifications_batch_send_at(
+    app_fixture, published_fixture, sync_session_fixture
+):
+    (notification_id,) = await create_deferred(app_fixture, [timedelta(minutes=5)])
+
+    # отправка в пределах broker_delay_limit публикуется в брокер с задержкой
+    ((published_id, delay),) = published_fixture
+    assert published_id == notification_id
+    assert timedelta(minutes=4) < timedelta(milliseconds=delay) <= timedelta(minutes=5)
+
+    with sync_session_fixture() as session:
+        notification = session.get(Notification, uuid.UUID(notification_id))
+        assert abs(notification.send_at - now() - timedelta(minutes=5)) < timedelta(
+            minutes=1
+        )
+        assert session.get(ScheduledSend, notification.id) is None
+
+
+async def test_notifications_batch_send_at_scheduled(
+    app_fixture, published_fixture, sync_session_fixture
+):
+    (notification_id,) = await create_deferred(app_fixture, [timedelta(days=1)])
+
+    # отправка дальше broker_delay_limit сохраняется в базе данных до её наступления
+    assert published_fixture == []
+    with sync_session_fixture() as session:
+        scheduled = session.get(ScheduledSend, uuid.UUID(notification_id))
+        assert scheduled is not None
+        assert abs(scheduled.send_at - now() - timedelta(days=1)) < timedelta(minutes=1)
+
+
+async def test_promote_scheduled_sends(
+    app_fixture, published_fixture, sync_session_fixture
+):
+    first_id, second_id = await create_deferred(
+        app_fixture, [timedelta(days=1), timedelta(days=2)]
+    )
+    promoted = []
+
+    def enqueue(notification_ids: list[str], delays: list[int | None]):
+        promoted.extend(zip(notification_ids, delays))
+
+    with sync_session_fixture() as session:
+        assert promote_scheduled_sends(session, enqueue, batch_size=10) == 0
+
+        limit = timedelta(seconds=envs.notifications.broker_delay_limit)
+        moment = now() + timedelta(days=1) - limit / 2
+        assert promote_scheduled_sends(session, enqueue, 10, moment) == 1
+
+    ((promoted_id, delay),) = promoted
+    assert promoted_id == first_id
+    assert limit / 4 < timedelta(milliseconds=delay) <= limit / 2
+
+    with sync_session_fixture() as session:
+        assert session.get(ScheduledSend, uuid.UUID(first_id)) is None
+        assert session.get(ScheduledSend, uuid.UUID(second_id)) is not None
+
+
+def test_batch_notifications(monkeypatch):
+    monkeypatch.setattr(envs.notifications, "send_batch_size", 2)
+
+    messages_args, delays = batch_notifications(
+        ["first", "second", "third", "fourth"], [None, 1000, None, None]
+    )
+
+    # отправки с одинаковой задержкой объединяются в пачки не больше send_batch_size
+    assert messages_args == [(["first", "third"],), (["fourth"],), (["second"],)]
+    assert delays == [None, None, 1000]
+
+
+class FakeEmailSender:
+    def __init__(self):
+        # адреса, письма на которые не удаётся отправить
+        self.failing: set[str] = set()
+        self.sent: list[str] = []
+
+    def send_message_fast(self, to_email: str, content: str, title: str, **kwargs):
+        if to_email in self.failing:
+            raise ConnectionError("Не удалось отправить письмо")
+        self.sent.append(to_email)
+
+    def send_messages(
+        self, messages: list[tuple[str, str, str]], **kwargs
+    ) -> list[int]:
+        failed = []
+        for number, (to_email, content, title) in enumerate(messages):
+            try:
+                self.send_message_fast(to_email, content, title)
+            except ConnectionError:
+                failed.append(number)
+        return failed
+
+
+@pytest.fixture
+def email_sender_fixture(monkeypatch, sync_session_fixture) -> FakeEmailSender:
+    """
+    Отправитель писем (вместо SMTP сервера) для акторов, работающих с базой данных тестового контейнера
+    """
+    sender = FakeEmailSender()
+    monkeypatch.setattr(
+        EmailNotificationHandler, "get_email_sender", classmethod(lambda cls: sender)
+    )
+    monkeypatch.setattr(tasks, "sync_db_session_manager", sync_session_fixture)
+    return sender
+
+
+@pytest.fixture
+def retried_fixture(monkeypatch) -> list[tuple]:
+    """
+    Аргументы повторных отправок писем (вместо публикации в брокер)
+    """
+    retried = []
+
+    def send_with_options(args, **options):
+        retried.append(args)
+
+    monkeypatch.setattr(send_emails, "send_with_options", send_with_options)
+    return retried
+
+
+def get_messages(session_manager, notification_id: str) -> list[NotificationMessage]:
+    with session_manager() as session:
+        query = sa.select(NotificationMessage).where(
+            NotificationMessage.notification_id == notification_id
+        )
+        return list(session.scalars(query))
+
+
+async def create_contacts_notifications(client, emails: list[str]) -> list[str]:
+    """
+    Создание уведомлений с явно указанными контактами (без пользователей)
+    """
+    await create_template(client, is_base=True, content=wrapping.content_block(""))
+    _, template = await create_template(client)
+
+    response, data = await create_notifications_batch(
+        client,
+        template["slug"],
+        [{"contacts": {"email": email}, "templateData": {}} for email in emails],
+    )
+    assert response.status_code == HTTPStatus.CREATED, data
+    return data["data"]
+
+
+async def test_send_emails_without_user(
+    app_fixture, published_fixture, email_sender_fixture, sync_session_fixture
+):
+    email = "user@example.com"
+    (notification_id,) = await create_contacts_notifications(app_fixture, [email])
+
+    send_emails([(notification_id, email)])
+
+    assert email_sender_fixture.sent == [email]
+    (message,) = get_messages(sync_session_fixture, notification_id)
+    assert message.user_id is None
+    assert message.send_to == email
+
+
+async def test_send_emails_retries_failed(
+    app_fixture,
+    published_fixture,
+    email_sender_fixture,
+    retried_fixture,
+    sync_session_fixture,
+):
+    emails = ["first@example.com", "second@example.com"]
+    first_id, second_id = await create_contacts_notifications(app_fixture, emails)
+    email_sender_fixture.failing.add(emails[1])
+
+    send_emails([(first_id, emails[0]), (second_id, emails[1])])
+
+    # сообщение неотправленного письма не сохраняется, а повторно отправляется только это письмо
+    assert email_sender_fixture.sent == [emails[0]]
+    assert len(get_messages(sync_session_fixture, first_id)) == 1
+    assert get_messages(sync_session_fixture, second_id) == []
+    assert retried_fixture == [([(second_id, emails[1])], 2)]
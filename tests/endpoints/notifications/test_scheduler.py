@@ -0,0 +1,195 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, ContextManager
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from internal.notifications import scheduler
+from internal.notifications.recurrences import RuleCache
+from internal.notifications.scheduler import RecurrenceScheduler, schedule_rows
+from models import (
+    Notification,
+    NotificationRecurrence,
+    NotificationRecurrenceFrequency,
+    RecurrenceSchedule,
+    Template,
+)
+from utils.time import now
+
+SessionManager = Callable[[], ContextManager[Session]]
+
+
+@pytest.fixture
+def sync_session_fixture(sync_session_fixture, monkeypatch) -> SessionManager:
+    """
+    Сессии базы данных тестового контейнера, которыми пользуется планировщик
+    """
+    monkeypatch.setattr(scheduler, "sync_db_session_manager", sync_session_fixture)
+    RuleCache().clear()
+
+    yield sync_session_fixture
+
+    RuleCache().clear()
+
+
+@pytest.fixture
+def enqueued_fixture() -> list[str]:
+    """
+    Идентификаторы уведомлений, опубликованных планировщиком (вместо публикации в брокер)
+    """
+    return []
+
+
+def create_scheduler(enqueued: list[str], **options) -> RecurrenceScheduler:
+    def enqueue(notification_ids: list[str], delays: list[int | None] = None):
+        enqueued.extend(notification_ids)
+
+    instance = RecurrenceScheduler(enqueue)
+    for name, value in options.items():
+        setattr(instance, name, value)
+    return instance
+
+
+def create_recurrences(
+    session_manager: SessionManager, count: int = 1, **rule
+) -> list[int]:
+    """
+    Создание регулярных уведомлений с расписанием срабатываний
+
+    :param rule: значения правила повторения.
+    :return: идентификаторы правил повторения.
+    """
+    with session_manager() as session:
+        template = Template(
+            slug=f"template-{uuid.uuid4()}", name="Template", title="Title", content=""
+        )
+        session.add(template)
+        session.flush()
+
+        recurrences = []
+        for _ in range(count):
+            recurrence = NotificationRecurrence(interval=1, **rule)
+            notification = Notification(
+                template_id=template.id, template_data={}, recurrence=recurrence
+            )
+            session.add(notification)
+            session.flush()
+            recurrences.append((recurrence.id, notification.id, recurrence))
+
+        session.execute(sa.insert(RecurrenceSchedule), schedule_rows(recurrences))
+        return [recurrence_id for recurrence_id, _, _ in recurrences]
+
+
+def get_schedule(session_manager: SessionManager) -> dict[int, RecurrenceSchedule]:
+    with session_manager() as session:
+        return {
+            i.recurrence_id: i for i in session.scalars(sa.select(RecurrenceSchedule))
+        }
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+async def test_schedulers_lease_disjoint(sync_session_fixture, enqueued_fixture):
+    recurrence_ids = create_recurrences(
+        sync_session_fixture,
+        count=10,
+        frequency=NotificationRecurrenceFrequency.MINUTELY,
+        started_at=now() + timedelta(seconds=30),
+    )
+    first = create_scheduler(enqueued_fixture, batch_size=3)
+    second = create_scheduler(enqueued_fixture, batch_size=3)
+
+    # строки, заблокированные арендующим их экземпляром, пропускаются другими экземплярами
+    with sync_session_fixture() as session:
+        locked = recurrence_ids[:4]
+        session.execute(
+            sa.select(RecurrenceSchedule)
+            .where(RecurrenceSchedule.recurrence_id.in_(locked))
+            .with_for_update()
+        ).all()
+        second.poll()
+    first.poll()
+
+    assert set(second._leased) == set(recurrence_ids[4:])
+    assert set(first._leased) == set(locked)
+
+    schedule = get_schedule(sync_session_fixture)
+    for recurrence_id in recurrence_ids:
+        owner = first if recurrence_id in locked else second
+        assert schedule[recurrence_id].leased_by == owner.owner
+        assert schedule[recurrence_id].leased_until is not None
+
+
+async def test_scheduler_stop_saves_progress(sync_session_fixture, enqueued_fixture):
+    started_at = hour_start(now()) - timedelta(hours=1)
+    (recurrence_id,) = create_recurrences(
+        sync_session_fixture,
+        frequency=NotificationRecurrenceFrequency.HOURLY,
+        started_at=started_at,
+    )
+    instance = create_scheduler(
+        enqueued_fixture,
+        lease_window=timedelta(hours=2),
+        lease_timeout=timedelta(hours=2),
+    )
+
+    instance.poll()
+    fire_at = started_at + timedelta(hours=2)
+    assert instance.fire_due(fire_at) == 1
+    assert len(enqueued_fixture) == 1
+
+    instance.stop()
+    instance.run()
+
+    assert not instance._leased
+    schedule = get_schedule(sync_session_fixture)[recurrence_id]
+    assert schedule.next_fire_at == fire_at + timedelta(hours=1)
+    assert schedule.cursor_at is not None
+    assert schedule.leased_by is None
+    assert schedule.leased_until is None
+
+
+async def test_scheduler_drops_expired_leases(sync_session_fixture, enqueued_fixture):
+    started_at = now().replace(microsecond=0) + timedelta(minutes=30)
+    create_recurrences(
+        sync_session_fixture,
+        frequency=NotificationRecurrenceFrequency.HOURLY,
+        started_at=started_at,
+    )
+    instance = create_scheduler(
+        enqueued_fixture,
+        lease_window=timedelta(hours=1),
+        lease_timeout=timedelta(seconds=60),
+    )
+
+    instance.poll()
+    assert instance._leased
+
+    # аренда не была продлена и могла перейти к другому экземпляру, поэтому повторение не срабатывает
+    assert instance.fire_due(started_at + timedelta(minutes=1)) == 0
+    assert not enqueued_fixture
+    assert not instance._leased
+
+
+async def test_scheduler_deletes_exhausted(sync_session_fixture, enqueued_fixture):
+    started_at = now().replace(microsecond=0) + timedelta(minutes=1)
+    (recurrence_id,) = create_recurrences(
+        sync_session_fixture,
+        frequency=NotificationRecurrenceFrequency.DAILY,
+        started_at=started_at,
+        count=1,
+    )
+    instance = create_scheduler(enqueued_fixture, lease_timeout=timedelta(hours=1))
+
+    instance.poll()
+    assert instance.fire_due(started_at) == 1
+    assert instance._leased[recurrence_id].next_fire_at is None
+
+    instance.poll()
+
+    assert recurrence_id not in get_schedule(sync_session_fixture)
+    assert not instance._leased
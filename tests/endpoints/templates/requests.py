@@ -6,11 +6,14 @@ from endpoints.utils.requests import api_request
 from starlette.testclient import TestClient
 
 
-async def get_templates(client: TestClient, with_check: bool = True) -> RequestResult:
+async def get_templates(
+    client: TestClient, with_check: bool = True, query_params: dict | None = None
+) -> RequestResult:
     response, data = await api_request(
         client,
         RequestMethods.get,
         ApiRoutes.templates,
+        query_params=query_params,
     )
 
     return response, data
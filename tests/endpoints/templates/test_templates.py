@@ -36,6 +36,40 @@ async def test_get_templates(app_fixture):
     assert len(data["data"]) != 0
 
 
+async def test_get_templates_by_cursor(app_fixture):
+    for _ in range(3):
+        await create_template(app_fixture)
+
+    params = {"useCursor": True, "rowsPerPage": 2}
+    response, first_page = await get_templates(app_fixture, query_params=params)
+    assert response.status_code == HTTPStatus.OK, first_page
+    assert first_page["cursor"]["next"], first_page
+    assert first_page["cursor"]["prev"] is None, first_page
+
+    params = {"cursor": first_page["cursor"]["next"], "rowsPerPage": 2}
+    response, second_page = await get_templates(app_fixture, query_params=params)
+    assert response.status_code == HTTPStatus.OK, second_page
+
+    first_ids = {i["id"] for i in first_page["data"]}
+    second_ids = {i["id"] for i in second_page["data"]}
+    assert second_ids and not first_ids & second_ids
+    assert second_page["cursor"]["prev"], second_page
+
+
+async def test_get_templates_cached_count(app_fixture):
+    await create_template(app_fixture)
+
+    params = {"countStrategy": "cached"}
+    response, data = await get_templates(app_fixture, query_params=params)
+    assert response.status_code == HTTPStatus.OK, data
+    total = data["total"]
+
+    # создание шаблона сбрасывает сохранённое количество
+    await create_template(app_fixture)
+    response, data = await get_templates(app_fixture, query_params=params)
+    assert data["total"] == total + 1, data
+
+
 async def test_get_template(app_fixture):
     _, template = await create_template(app_fixture)
 
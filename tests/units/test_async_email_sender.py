@@ -0,0 +1,157 @@
+import asyncio
+
+import aiosmtplib
+import pytest
+from units.utils import FakeClock
+
+from tools import async_email_sender
+from tools.async_email_sender import AsyncEmailSender, AsyncSMTPConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, fail: bool = False, refused: list[str] | None = None):
+        self.fail = fail
+        self.refused = refused or []
+        self.closed = False
+        self.sent = []
+
+    async def noop(self):
+        return aiosmtplib.SMTPResponse(250, "OK")
+
+    async def sendmail(self, from_email, recipients, message):
+        if self.fail:
+            raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+        refused = [i for i in recipients if i in self.refused]
+        if len(refused) == len(recipients):
+            raise aiosmtplib.SMTPRecipientsRefused(
+                [aiosmtplib.SMTPRecipientRefused(550, "Refused", i) for i in refused]
+            )
+
+        self.sent.extend(i for i in recipients if i not in refused)
+        return {i: aiosmtplib.SMTPResponse(550, "Refused") for i in refused}, "OK"
+
+    async def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock_fixture(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(async_email_sender, "time", clock)
+    return clock
+
+
+class FakeServer:
+    def __init__(self):
+        # соединения, которые будут выданы при подключении (в порядке подключения)
+        self.queued: list[FakeConnection] = []
+        self.created: list[FakeConnection] = []
+
+    async def connect(self, *args, **kwargs) -> FakeConnection:
+        connection = self.queued.pop(0) if self.queued else FakeConnection()
+        self.created.append(connection)
+        return connection
+
+
+@pytest.fixture
+def server_fixture(monkeypatch) -> FakeServer:
+    server = FakeServer()
+    monkeypatch.setattr(async_email_sender, "smtp_connect", server.connect)
+    return server
+
+
+async def fill_pool(pool: AsyncSMTPConnectionPool, count: int) -> list[FakeConnection]:
+    """
+    Установка соединений пула (последнее соединение будет выдано первым)
+    """
+    connections = [await pool._acquire() for _ in range(count)]
+    for connection in connections:
+        pool._idle.append((connection, async_email_sender.time.monotonic()))
+    return connections
+
+
+def test_pool_reuses_last_released(clock_fixture, server_fixture):
+    pool = AsyncSMTPConnectionPool("localhost", 25, size=2)
+
+    async def acquire_twice():
+        async with pool.connection() as first:
+            pass
+        async with pool.connection() as second:
+            pass
+        return first, second
+
+    first, second = asyncio.run(acquire_twice())
+
+    assert first is second
+    assert len(server_fixture.created) == 1
+
+
+def test_pool_closes_broken_connection(clock_fixture, server_fixture):
+    pool = AsyncSMTPConnectionPool("localhost", 25, size=1)
+
+    async def break_connection():
+        async with pool.connection():
+            raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+    with pytest.raises(aiosmtplib.SMTPServerDisconnected):
+        asyncio.run(break_connection())
+
+    (connection,) = server_fixture.created
+    assert connection.closed
+    assert not pool._idle
+
+
+def test_send_message_safe_keeps_pool(clock_fixture, server_fixture):
+    healthy, broken = FakeConnection(), FakeConnection(fail=True)
+    server_fixture.queued.extend([healthy, broken])
+    sender = AsyncEmailSender("localhost", "noreply@example.com", pool_size=2)
+
+    async def send():
+        await fill_pool(sender.pool, 2)
+        await sender.send_message_safe("user@example.com", "content", "title")
+
+    asyncio.run(send())
+
+    # отправка через разорванное соединение повторяется через свободное соединение пула
+    assert broken.closed
+    assert not healthy.closed
+    assert healthy.sent == ["user@example.com"]
+    assert [connection for connection, _ in sender.pool._idle] == [healthy]
+
+
+def test_send_message_grouped_returns_refused(clock_fixture, server_fixture):
+    refused = ["first@example.com", "second@example.com", "third@example.com"]
+    server_fixture.queued.append(FakeConnection(refused=refused))
+    sender = AsyncEmailSender("localhost", "noreply@example.com", pool_size=1)
+    recipients = ["user@example.com", *refused]
+
+    failed = asyncio.run(
+        sender.send_message_grouped(recipients, "content", "title", max_recipients=2)
+    )
+
+    # сервер отклонил часть получателей одной транзакции и всех получателей другой
+    assert sorted(failed) == sorted(refused)
+    assert server_fixture.created[0].sent == ["user@example.com"]
+
+
+def test_send_messages_returns_failed(clock_fixture, server_fixture):
+    server_fixture.queued.append(FakeConnection(refused=["refused@example.com"]))
+    sender = AsyncEmailSender("localhost", "noreply@example.com", pool_size=1)
+    messages = [
+        ("user@example.com", "first", "title"),
+        ("refused@example.com", "second", "title"),
+        ("other@example.com", "third", "title"),
+    ]
+
+    failed = asyncio.run(sender.send_messages(messages))
+
+    # отказ в одном письме не прерывает отправку остальных писем пачки
+    assert failed == [1]
+    assert sorted(server_fixture.created[0].sent) == [
+        "other@example.com",
+        "user@example.com",
+    ]
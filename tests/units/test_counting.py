@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from core.crud.counting import CountCache, CountStrategy, Explain, count_query_rows
+from models import Template
+
+PLAN = [{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 42}}]
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one(self):
+        return self.value
+
+
+class FakeSession:
+    """
+    Сессия, возвращающая одинаковый результат на все запросы (с сохранением выполненных запросов)
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.value)
+
+
+@pytest.fixture
+def count_cache_fixture() -> CountCache:
+    cache = CountCache()
+    cache.clear_cache()
+    yield cache
+    cache.clear_cache()
+
+
+def templates_query(is_base: bool = False):
+    return select(Template).where(Template.is_base == is_base).order_by(Template.id)
+
+
+def count(session: FakeSession, query, strategy: CountStrategy) -> int:
+    return asyncio.run(count_query_rows(session, query, strategy))
+
+
+@pytest.mark.parametrize("plan", [PLAN, json.dumps(PLAN)])
+def test_count_estimate(plan):
+    session = FakeSession(plan)
+
+    assert count(session, templates_query(), CountStrategy.estimate) == 42
+
+    (statement,) = session.statements
+    assert isinstance(statement, Explain)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "ORDER BY" not in sql
+
+
+def test_count_exact(count_cache_fixture):
+    session = FakeSession(10)
+
+    assert count(session, templates_query(), CountStrategy.exact) == 10
+    assert count(session, templates_query(), CountStrategy.exact) == 10
+    assert len(session.statements) == 2
+
+
+def test_count_cached(count_cache_fixture):
+    session = FakeSession(10)
+
+    assert count(session, templates_query(), CountStrategy.cached) == 10
+    session.value = 11
+    # сортировка не влияет на количество записей и ключ кэша
+    query = templates_query().order_by(Template.created_at)
+    assert count(session, query, CountStrategy.cached) == 10
+    assert len(session.statements) == 1
+
+    # другие фильтры и удалённые записи подсчитываются отдельно
+    assert count(session, templates_query(is_base=True), CountStrategy.cached) == 11
+    query = templates_query().execution_options(include_deleted=True)
+    assert count(session, query, CountStrategy.cached) == 11
+    assert len(session.statements) == 3
+
+
+def test_count_cached_invalidation(count_cache_fixture):
+    session = FakeSession(10)
+    assert count(session, templates_query(), CountStrategy.cached) == 10
+
+    session.value = 11
+    count_cache_fixture.invalidate({"notifications"})
+    assert count(session, templates_query(), CountStrategy.cached) == 10
+
+    count_cache_fixture.invalidate({Template.__tablename__})
+    assert count(session, templates_query(), CountStrategy.cached) == 11
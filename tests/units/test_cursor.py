@@ -0,0 +1,56 @@
+import datetime
+import enum
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from core.crud.cursor import CursorPosition, decode_cursor, encode_cursor
+from core.crud.exceptions import LogicException
+
+
+class Color(enum.Enum):
+    red = "red"
+
+
+@pytest.mark.parametrize(
+    "sort_value",
+    [
+        datetime.datetime(2026, 10, 17, 12, 30, 15, 123456),
+        datetime.date(2026, 10, 17),
+        uuid.uuid4(),
+        Decimal("10.50"),
+        "Шаблон",
+        42,
+        None,
+    ],
+)
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("backwards", [True, False])
+def test_cursor_round_trip(sort_value, descending, backwards):
+    position = CursorPosition(
+        sort_by="created_at",
+        descending=descending,
+        values=(sort_value, uuid.uuid4()),
+        backwards=backwards,
+    )
+
+    token = encode_cursor(position)
+
+    assert "=" not in token
+    assert decode_cursor(token) == position
+
+
+def test_cursor_enum_value():
+    position = CursorPosition("color", False, (Color.red, 1), False)
+
+    assert decode_cursor(encode_cursor(position)).values == ("red", 1)
+
+
+@pytest.mark.parametrize(
+    "token",
+    ["", "not a cursor", "e30", "eyJ2IjpbeyJ4IjoxfSwxXX0", "W10"],
+)
+def test_cursor_invalid(token):
+    with pytest.raises(LogicException):
+        decode_cursor(token)
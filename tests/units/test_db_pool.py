@@ -0,0 +1,70 @@
+import threading
+import time
+
+from utils.db_pool import InstrumentedQueuePool
+
+
+class FakeDBAPIConnection:
+    def __init__(self, connection_record=None):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_pool(**options) -> InstrumentedQueuePool:
+    return InstrumentedQueuePool(FakeDBAPIConnection, **options)
+
+
+def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_pool_counts_only_blocked_checkouts():
+    pool = create_pool(pool_size=1, max_overflow=1, timeout=5)
+
+    first = pool.connect()
+    second = pool.connect()
+    assert pool.stats().waiting == 0
+    assert pool.stats().connects == 2
+
+    checked_out = []
+    thread = threading.Thread(target=lambda: checked_out.append(pool.connect()))
+    thread.start()
+    wait_for(lambda: pool.stats().waiting == 1)
+
+    first.close()
+    thread.join(5)
+    assert checked_out
+    assert pool.stats().waiting == 0
+
+    second.close()
+    checked_out[0].close()
+    assert pool.stats().connects == 2
+
+
+def test_pool_connecting_checkout_is_not_waiting():
+    connecting, connected = threading.Event(), threading.Event()
+
+    def connect(connection_record=None):
+        connecting.set()
+        connected.wait(5)
+        return FakeDBAPIConnection()
+
+    pool = InstrumentedQueuePool(connect, pool_size=1, max_overflow=0, timeout=5)
+    thread = threading.Thread(target=lambda: pool.connect().close())
+    thread.start()
+
+    # новое соединение устанавливается, а не ожидается из пула
+    connecting.wait(5)
+    assert pool.stats().waiting == 0
+
+    connected.set()
+    thread.join(5)
+    assert pool.stats().connects == 1
@@ -0,0 +1,111 @@
+import smtplib
+
+import pytest
+from units.utils import FakeClock
+
+from tools import email_sender
+from tools.email_sender import EmailSender, SMTPConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.closed = False
+        self.sent = []
+
+    def noop(self):
+        return 250, b"OK"
+
+    def send_message(self, message, from_email, to_email):
+        if self.fail:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.sent.append(to_email)
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock_fixture(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(email_sender, "time", clock)
+    return clock
+
+
+class FakeServer:
+    def __init__(self):
+        # соединения, которые будут выданы при подключении (в порядке подключения)
+        self.queued: list[FakeConnection] = []
+        self.created: list[FakeConnection] = []
+
+    def connect(self, *args, **kwargs) -> FakeConnection:
+        connection = self.queued.pop(0) if self.queued else FakeConnection()
+        self.created.append(connection)
+        return connection
+
+
+@pytest.fixture
+def server_fixture(monkeypatch) -> FakeServer:
+    server = FakeServer()
+    monkeypatch.setattr(email_sender, "smtp_connect", server.connect)
+    return server
+
+
+def test_pool_reuses_last_released(clock_fixture, server_fixture):
+    pool = SMTPConnectionPool("localhost", 25, size=2)
+
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+
+    assert pool.acquire() is second
+    assert pool.acquire() is first
+    assert len(server_fixture.created) == 2
+
+
+def test_pool_reaps_idle_on_acquire(clock_fixture, server_fixture):
+    pool = SMTPConnectionPool("localhost", 25, size=2, idle_timeout=60)
+
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    clock_fixture.sleep(50)
+    pool.release(second)
+    clock_fixture.sleep(20)
+
+    # последнее освобождённое соединение выдаётся, а простаивающее дольше idle_timeout закрывается
+    assert pool.acquire() is second
+    assert first.closed
+    assert not second.closed
+
+
+def test_pool_closes_broken_connection(clock_fixture, server_fixture):
+    pool = SMTPConnectionPool("localhost", 25, size=1)
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        with pool.connection() as connection:
+            raise smtplib.SMTPServerDisconnected()
+
+    assert connection.closed
+    assert pool.acquire() is not connection
+
+
+def test_send_message_safe_keeps_pool(clock_fixture, server_fixture):
+    healthy, broken = FakeConnection(), FakeConnection(fail=True)
+    server_fixture.queued.extend([healthy, broken])
+    sender = EmailSender("localhost", "noreply@example.com", pool_size=2)
+
+    first, second = sender.pool.acquire(), sender.pool.acquire()
+    sender.pool.release(first)
+    sender.pool.release(second)
+
+    sender.send_message_safe("user@example.com", "content", "title")
+
+    # отправка через разорванное соединение повторяется через свободное соединение пула
+    assert broken.closed
+    assert not healthy.closed
+    assert healthy.sent == ["user@example.com"]
+    assert sender.pool.acquire() is healthy
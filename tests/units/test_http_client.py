@@ -0,0 +1,79 @@
+import pytest
+from units.utils import FakeClock
+
+from utils import http_client
+from utils.http_client import CircuitBreaker, RetryBudget
+
+
+@pytest.fixture
+def clock_fixture(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(http_client, "time", clock)
+    return clock
+
+
+def test_circuit_opens_after_threshold(clock_fixture):
+    breaker = CircuitBreaker("auth", failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    # успешный запрос сбрасывает серию ошибок
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock_fixture.sleep(29)
+    assert not breaker.allow()
+
+
+def test_circuit_probe(clock_fixture):
+    breaker = CircuitBreaker("auth", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    # после reset_timeout пропускается только один пробный запрос
+    clock_fixture.sleep(30)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # ошибка пробного запроса снова отключает запросы на reset_timeout
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock_fixture.sleep(30)
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_circuit_probe_released(clock_fixture):
+    breaker = CircuitBreaker("auth", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock_fixture.sleep(30)
+
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, minimum=2)
+
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+    # каждый запрос пополняет бюджет на ratio
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+    # бюджет не превышает минимального запаса
+    for _ in range(10):
+        budget.deposit()
+    assert budget.balance == 2
@@ -0,0 +1,182 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from dateutil import rrule
+
+from internal.notifications import recurrences
+from internal.notifications.recurrences import (
+    CompiledRule,
+    Occurrence,
+    RuleCache,
+    next_occurrences,
+)
+
+RULES = {
+    "weekly": {
+        "frequency": rrule.WEEKLY,
+        "started_at": datetime(2026, 1, 7, 10, 15, 30),
+        "interval": 1,
+    },
+    "weekly-days": {
+        "frequency": rrule.WEEKLY,
+        "started_at": datetime(2026, 1, 7, 10, 15, 30),
+        "interval": 2,
+        "week_days": [0, 2, 4],
+    },
+    "daily-days": {
+        "frequency": rrule.DAILY,
+        "started_at": datetime(2026, 1, 1, 8),
+        "interval": 1,
+        "week_days": [5, 6],
+    },
+    "daily-days-interval": {
+        "frequency": rrule.DAILY,
+        "started_at": datetime(2026, 1, 1, 8),
+        "interval": 3,
+        "week_days": [1, 5],
+    },
+    "hourly": {
+        "frequency": rrule.HOURLY,
+        "started_at": datetime(2026, 1, 1, 0, 30, 15, 250000),
+        "interval": 5,
+    },
+}
+LIMITS = {
+    "infinite": {},
+    "count": {"count": 7},
+    "until": {"until": datetime(2026, 2, 10, 12)},
+}
+
+
+@pytest.fixture(params=list(RULES))
+def rule_name_fixture(request) -> str:
+    return request.param
+
+
+@pytest.fixture(params=list(LIMITS))
+def recurrence_fixture(request, rule_name_fixture) -> dict:
+    return {**RULES[rule_name_fixture], **LIMITS[request.param]}
+
+
+def reference(recurrence: dict) -> rrule.rrule:
+    """
+    Правило dateutil, перебирающее серию от начала
+    """
+    return rrule.rrule(
+        recurrence["frequency"],
+        dtstart=recurrence["started_at"],
+        interval=recurrence["interval"],
+        count=recurrence.get("count"),
+        until=recurrence.get("until"),
+        byweekday=recurrence.get("week_days"),
+    )
+
+
+def moments(recurrence: dict) -> list[datetime]:
+    """
+    Даты поиска срабатываний: случайные даты и даты самих срабатываний (с соседними микросекундами)
+    """
+    started_at = recurrence["started_at"]
+    generator = random.Random(started_at.toordinal())
+    span = timedelta(days=90) // timedelta(seconds=1)
+    result = [
+        started_at + timedelta(seconds=generator.randrange(-86400, span))
+        for _ in range(50)
+    ]
+
+    for occurrence in reference(recurrence).between(
+        started_at, started_at + timedelta(days=20), inc=True
+    ):
+        delta = timedelta(microseconds=1)
+        result.extend([occurrence - delta, occurrence, occurrence + delta])
+    return result
+
+
+@pytest.mark.parametrize("inclusive", [False, True])
+def test_next_occurrences(recurrence_fixture, inclusive):
+    expected = reference(recurrence_fixture)
+
+    for moment in moments(recurrence_fixture):
+        (occurrence,) = next_occurrences([recurrence_fixture], moment, inclusive)
+        fire_at = expected.after(moment, inc=inclusive)
+
+        if fire_at is None:
+            assert occurrence is None, moment
+        else:
+            assert occurrence is not None, moment
+            assert occurrence.fire_at == fire_at, moment
+
+
+def test_resume_from_cursor(recurrence_fixture):
+    expected = list(itertools.islice(reference(recurrence_fixture), 60))
+
+    fired = []
+    since = recurrence_fixture["started_at"] - timedelta(days=1)
+    (occurrence,) = next_occurrences([recurrence_fixture], since, inclusive=True)
+    while occurrence is not None and len(fired) < len(expected):
+        fired.append(occurrence.fire_at)
+        # после каждого срабатывания правило восстанавливается по курсору, сохранённому в расписании
+        rule = CompiledRule(
+            recurrence_fixture, occurrence.cursor_at, occurrence.cursor_index
+        )
+        fire_at = rule.after(occurrence.fire_at)
+        occurrence = fire_at and Occurrence(fire_at, rule.cursor_at, rule.cursor_index)
+
+    assert fired == expected
+
+
+@pytest.fixture
+def rule_cache_fixture(monkeypatch) -> list[CompiledRule]:
+    """
+    Пустой кэш правил и правила, скомпилированные во время теста
+    """
+    compiled = []
+
+    class TrackedRule(CompiledRule):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            compiled.append(self)
+
+    monkeypatch.setattr(recurrences, "CompiledRule", TrackedRule)
+    RuleCache().clear()
+
+    yield compiled
+
+    RuleCache().clear()
+
+
+def test_rule_cache_hit_does_not_compile(rule_cache_fixture):
+    recurrence = RULES["weekly-days"]
+    rule = RuleCache().get(1, recurrence)
+    fire_at = rule.after(recurrence["started_at"] + timedelta(days=30))
+
+    # расписание хранит курсор, отстающий от закэшированного
+    assert RuleCache().get(1, dict(recurrence), rule.started_at) is rule
+    assert rule_cache_fixture == [rule]
+    assert rule.after(fire_at, inclusive=True) == fire_at
+
+
+def test_rule_cache_recompiles_changed(rule_cache_fixture):
+    recurrence = RULES["weekly"]
+    rule = RuleCache().get(1, recurrence)
+
+    changed = RuleCache().get(1, {**recurrence, "interval": 2})
+
+    assert changed is not rule
+    assert changed.interval == 2
+    assert RuleCache().get(1, {**recurrence, "interval": 2}) is changed
+    assert len(rule_cache_fixture) == 2
+
+
+def test_rule_cache_seeks_stored_cursor(rule_cache_fixture):
+    recurrence = RULES["daily-days"]
+    expected = list(itertools.islice(reference(recurrence), 12))
+    rule = RuleCache().get(1, recurrence)
+
+    # расписание продвинулось дальше закэшированного правила (например, в другом экземпляре)
+    assert RuleCache().get(1, recurrence, expected[9], 9) is rule
+    assert (rule.cursor_at, rule.cursor_index) == (expected[9], 9)
+    assert rule.after(expected[9]) == expected[10]
+    assert rule_cache_fixture == [rule]
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from internal.notifications.render_cache import RenderCache, render_key
+from models import Template
+
+UPDATED_AT = datetime(2026, 10, 17, 12)
+TEMPLATE_DATA = {"name": "Иван", "order": {"id": 1, "items": [1, 2]}}
+
+
+@pytest.fixture
+def render_cache_fixture() -> RenderCache:
+    cache = RenderCache()
+    cache.clear_cache()
+    yield cache
+    cache.clear_cache()
+
+
+def test_render_key_ignores_data_order():
+    template = Template(id=1, updated_at=UPDATED_AT)
+    reordered = {"order": {"items": [1, 2], "id": 1}, "name": "Иван"}
+
+    assert render_key(template, TEMPLATE_DATA, True) == render_key(
+        template, reordered, True
+    )
+    assert render_key(template, None, True) == render_key(template, {}, True)
+
+
+def test_render_key_changes():
+    template = Template(id=1, updated_at=UPDATED_AT)
+    key = render_key(template, TEMPLATE_DATA, True)
+
+    assert key != render_key(Template(id=2, updated_at=UPDATED_AT), TEMPLATE_DATA, True)
+    assert key != render_key(
+        Template(id=1, updated_at=datetime(2026, 10, 17, 13)), TEMPLATE_DATA, True
+    )
+    assert key != render_key(template, {**TEMPLATE_DATA, "name": "Пётр"}, True)
+    assert key != render_key(template, TEMPLATE_DATA, False)
+
+
+def test_render_cache_renders_once(render_cache_fixture):
+    template = Template(id=1, updated_at=UPDATED_AT)
+    rendered = []
+
+    def render():
+        rendered.append(1)
+        return "title", f"content {len(rendered)}"
+
+    key = render_key(template, TEMPLATE_DATA, True)
+    assert render_cache_fixture.get_or_render(key, render) == ("title", "content 1")
+    assert render_cache_fixture.get_or_render(key, render) == ("title", "content 1")
+
+    # изменение шаблона меняет ключ, поэтому уведомление рендерится заново
+    template.updated_at = datetime(2026, 10, 17, 13)
+    key = render_key(template, TEMPLATE_DATA, True)
+    assert render_cache_fixture.get_or_render(key, render) == ("title", "content 2")
+    assert len(rendered) == 2
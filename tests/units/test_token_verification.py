@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from core.config import envs
+from internal.auth import verification
+from main import check_token_verification
+from utils.http_client import HttpResponse
+from utils.utils import SingletonMeta
+
+KEY = {"kty": "oct", "kid": "key", "k": "c2VjcmV0"}
+
+
+@pytest.fixture
+def local_mode_fixture(monkeypatch):
+    monkeypatch.setattr(envs.auth, "mode", "local")
+    monkeypatch.setattr(envs.auth, "public_key", "public key")
+    # проверка выполняется при создании TokenVerifier, поэтому созданные экземпляры не используются
+    monkeypatch.setattr(SingletonMeta, "_instances", {})
+
+
+def test_local_mode_without_keys(local_mode_fixture, monkeypatch):
+    monkeypatch.setattr(envs.auth, "public_key", None)
+    monkeypatch.setattr(envs.auth, "jwks_url", None)
+
+    with pytest.raises(RuntimeError, match="AUTH_JWKS_URL"):
+        asyncio.run(check_token_verification())
+
+
+def test_remote_mode(monkeypatch):
+    monkeypatch.setattr(envs.auth, "mode", "remote")
+    monkeypatch.setattr(SingletonMeta, "_instances", {})
+
+    asyncio.run(check_token_verification())
+
+
+class FakeHttpClient:
+    def __init__(self):
+        # ответы на запросы JWKS (в порядке запросов)
+        self.responses: list[HttpResponse] = []
+
+    async def request(self, method: str, url: str, **kwargs) -> HttpResponse:
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def jwks_fixture(local_mode_fixture, monkeypatch) -> FakeHttpClient:
+    client = FakeHttpClient()
+    monkeypatch.setattr(verification, "HttpClient", lambda: client)
+    monkeypatch.setattr(envs.auth, "public_key", None)
+    monkeypatch.setattr(envs.auth, "jwks_url", "http://auth/jwks.json")
+    return client
+
+
+def test_malformed_jwks_keeps_loaded_keys(jwks_fixture):
+    verifier = verification.TokenVerifier()
+    jwks_fixture.responses = [
+        HttpResponse(200, {"keys": [KEY]}),
+        HttpResponse(200, {"keys": []}),
+        HttpResponse(200, "not found"),
+    ]
+
+    keys = asyncio.run(verifier._load_keys())
+    verifier._keys = keys
+
+    assert list(keys) == ["key"]
+    assert asyncio.run(verifier._load_keys()) is keys
+    assert asyncio.run(verifier._load_keys()) is keys
+
+
+def test_malformed_jwks_without_loaded_keys(jwks_fixture):
+    verifier = verification.TokenVerifier()
+    jwks_fixture.responses = [HttpResponse(200, {"keys": [{"kty": "unknown"}]})]
+
+    with pytest.raises(verification.AuthUnavailable):
+        asyncio.run(verifier._load_keys())
@@ -0,0 +1,13 @@
+class FakeClock:
+    """
+    Заменяемый модуль time: время меняется только вызовами sleep
+    """
+
+    def __init__(self):
+        self.value = 0.0
+
+    def monotonic(self) -> float:
+        return self.value
+
+    def sleep(self, seconds: float):
+        self.value += seconds